@@ -0,0 +1,56 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.config import settings
+from app.models import Base
+from app.models.assignment import Assignment  # noqa: F401
+from app.models.decision_audit import DecisionAudit  # noqa: F401
+from app.models.event import Event  # noqa: F401
+from app.models.experiment import Experiment  # noqa: F401
+from app.models.metric import Metric  # noqa: F401
+from app.models.report_snapshot import ReportSnapshot  # noqa: F401
+from app.models.rollup import UnitRollup, VariantRollup  # noqa: F401
+from app.models.sequential_state import SequentialTestState  # noqa: F401
+from app.models.variant import Variant  # noqa: F401
+
+config = context.config
+# Programmatic callers (the test suite) keep their own logging setup.
+if config.config_file_name is not None and config.attributes.get('configure_logger', True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _database_url() -> str:
+    # `alembic -x database_url=...` overrides DATABASE_URL, e.g. to upgrade a copy first.
+    return context.get_x_argument(as_dictionary=True).get('database_url') or settings.database_url
+
+
+def run_migrations_offline() -> None:
+    context.configure(url=_database_url(), target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    engine = create_engine(_database_url())
+    try:
+        with engine.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                # SQLite cannot ALTER constraints in place; batch mode rebuilds the table instead.
+                render_as_batch=connection.dialect.name == 'sqlite',
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
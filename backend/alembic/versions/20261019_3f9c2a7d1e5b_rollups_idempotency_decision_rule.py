@@ -0,0 +1,87 @@
+"""Idempotency keys, decision rules and rollup tables for databases created by earlier releases
+
+init_db only creates missing tables, so a database from before rollups existed keeps its old
+``events`` and ``experiments`` tables and has empty rollups. This revision adds the new columns
+and the idempotency constraint, creates any missing tables, then rebuilds the unit and variant
+rollups of every experiment from its raw events. Every step checks the live schema first, so it
+is safe on a database init_db already brought fully up to date.
+
+Revision ID: 3f9c2a7d1e5b
+Revises:
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.orm import Session
+
+from app.models import Base
+from app.models.experiment import DecisionRule
+from app.models.rollup import UnitRollup, VariantRollup  # noqa: F401
+from app.models.sequential_state import SequentialTestState  # noqa: F401
+from app.services.rollup_service import RollupService
+
+revision = '3f9c2a7d1e5b'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+NEW_TABLES = ('unit_rollups', 'variant_rollups', 'sequential_test_states')
+IDEMPOTENCY_CONSTRAINT = 'uq_events_experiment_idempotency_key'
+
+
+def _columns(inspector, table: str) -> set[str]:
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table in NEW_TABLES:
+        Base.metadata.tables[table].create(bind, checkfirst=True)
+
+    if 'decision_rule' not in _columns(inspector, 'experiments'):
+        decision_rule = sa.Enum(DecisionRule, name='decisionrule')
+        decision_rule.create(bind, checkfirst=True)
+        with op.batch_alter_table('experiments') as batch:
+            batch.add_column(
+                sa.Column(
+                    'decision_rule',
+                    decision_rule,
+                    nullable=False,
+                    server_default=DecisionRule.fixed_horizon.name,
+                )
+            )
+
+    has_key = 'idempotency_key' in _columns(inspector, 'events')
+    has_constraint = IDEMPOTENCY_CONSTRAINT in {
+        constraint['name'] for constraint in inspector.get_unique_constraints('events')
+    }
+    if not (has_key and has_constraint):
+        with op.batch_alter_table('events') as batch:
+            if not has_key:
+                batch.add_column(sa.Column('idempotency_key', sa.String(120), nullable=True))
+            if not has_constraint:
+                batch.create_unique_constraint(IDEMPOTENCY_CONSTRAINT, ['experiment_id', 'idempotency_key'])
+
+    # Reports and automatic decisions read only the rollups, so they must hold every pre-upgrade event
+    # before the new release serves traffic. Rebuilding is exact, so rerunning this is harmless.
+    db = Session(bind=bind)
+    try:
+        experiment_ids = db.scalars(sa.text('SELECT DISTINCT experiment_id FROM events')).all()
+        for experiment_id in experiment_ids:
+            RollupService.rebuild_experiment(db, experiment_id)
+    finally:
+        db.close()
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('events') as batch:
+        batch.drop_constraint(IDEMPOTENCY_CONSTRAINT, type_='unique')
+        batch.drop_column('idempotency_key')
+    with op.batch_alter_table('experiments') as batch:
+        batch.drop_column('decision_rule')
+    sa.Enum(name='decisionrule').drop(op.get_bind(), checkfirst=True)
+    for table in reversed(NEW_TABLES):
+        op.drop_table(table)
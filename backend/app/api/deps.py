@@ -1,11 +1,17 @@
-from collections.abc import Generator
+import hashlib
+from collections import Counter
+from collections.abc import AsyncGenerator, Generator
 
 from fastapi import HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.core.rate_limit import QuotaCharge, RateLimitDecision, more_constrained, rate_limit_headers
 from app.core.security import is_token_authorized, parse_bearer_token
 
+INGESTION_QUOTA_WINDOW_SECONDS = 60
+
 
 def get_db(request: Request) -> Generator[Session, None, None]:
     session_maker = request.app.state.session_maker
@@ -16,6 +22,29 @@ def get_db(request: Request) -> Generator[Session, None, None]:
         db.close()
 
 
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    # Read-only analytics routes (reports, results, exports, snapshots, listings). Writes and sticky
+    # assignment lookups stay on get_db so replica lag can never hand out a second variant.
+    session_maker = request.app.state.db_router.read_session_maker()
+    db = session_maker()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session_maker = request.app.state.async_session_maker
+    async with session_maker() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session_maker = request.app.state.db_router.async_read_session_maker()
+    async with session_maker() as db:
+        yield db
+
+
 def require_write_access(request: Request) -> None:
     tokens = [item.strip() for item in settings.admin_api_tokens.split(',') if item.strip()]
     if not tokens and settings.environment == 'development':
@@ -28,3 +57,51 @@ def require_write_access(request: Request) -> None:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Unauthorized write access',
         )
+
+
+def rate_limit_identity(request: Request) -> str:
+    """Who a request is charged to: its API token when it carries one, otherwise the client address."""
+    token = parse_bearer_token(request.headers.get('Authorization'))
+    if token:
+        # Hashed so raw credentials never end up in limiter keys (or in Redis).
+        return f"token:{hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]}"
+    client_host = request.headers.get('x-forwarded-for') or (request.client.host if request.client else 'unknown')
+    return f'ip:{client_host.split(",")[0].strip()}'
+
+
+def _ingestion_charges(request: Request, experiment_ids: list[str]) -> list[QuotaCharge]:
+    # Batches are charged by item count: once against the caller and once per experiment they touch.
+    charges = [(f'items:{rate_limit_identity(request)}', settings.ingestion_items_per_minute, len(experiment_ids))]
+    for experiment_id, count in Counter(experiment_ids).items():
+        charges.append((f'experiment:{experiment_id}', settings.experiment_events_per_minute, count))
+    return [charge for charge in charges if charge[1] > 0]
+
+
+def _apply_quota_decisions(request: Request, decisions: list[RateLimitDecision]) -> None:
+    # The rate-limit middleware turns the most constrained decision into response headers.
+    decision = getattr(request.state, 'rate_limit_decision', None)
+    for candidate in decisions:
+        decision = more_constrained(decision, candidate)
+    request.state.rate_limit_decision = decision
+    if not all(candidate.allowed for candidate in decisions):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail='Ingestion quota exceeded',
+            headers=rate_limit_headers(decision),
+        )
+
+
+# The caller and experiment buckets are checked in one all-or-nothing call, so a batch denied by one
+# experiment's quota never spends the caller's items.
+def enforce_ingestion_quota(request: Request, experiment_ids: list[str]) -> None:
+    limiter = getattr(request.app.state, 'rate_limiter', None)
+    charges = _ingestion_charges(request, experiment_ids) if limiter is not None and experiment_ids else []
+    if charges:
+        _apply_quota_decisions(request, limiter.check_all(charges, INGESTION_QUOTA_WINDOW_SECONDS))
+
+
+async def enforce_ingestion_quota_async(request: Request, experiment_ids: list[str]) -> None:
+    limiter = getattr(request.app.state, 'rate_limiter', None)
+    charges = _ingestion_charges(request, experiment_ids) if limiter is not None and experiment_ids else []
+    if charges:
+        _apply_quota_decisions(request, await limiter.acheck_all(charges, INGESTION_QUOTA_WINDOW_SECONDS))
@@ -2,18 +2,24 @@ import json
 
 from fastapi import APIRouter, Depends
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_write_access
+from app.api.deps import get_async_db, get_db, require_write_access
 from app.models.variant import Variant
 from app.schemas.analysis import AssignmentRequest, AssignmentResponse
 from app.services.assignment_service import AssignmentService
 
 router = APIRouter(prefix='/assignments', tags=['assignments'])
+async_router = APIRouter(prefix='/assignments', tags=['assignments'])
 
 
 def _build_response(db: Session, assignment, experiment_version: int) -> AssignmentResponse:
     variant = db.scalar(select(Variant).where(Variant.id == assignment.variant_id))
+    return _response_for_variant(assignment, variant, experiment_version)
+
+
+def _response_for_variant(assignment, variant: Variant | None, experiment_version: int) -> AssignmentResponse:
     config_payload: dict = {}
     variant_key = 'control'
     if variant is not None:
@@ -63,3 +69,29 @@ def assign_user_legacy(
         attributes=payload.attributes or {},
     )
     return _build_response(db, assignment, experiment_version)
+
+
+@async_router.post('', response_model=AssignmentResponse)
+async def assign_variant_async(
+    payload: AssignmentRequest,
+    db: AsyncSession = Depends(get_async_db),
+    _auth: None = Depends(require_write_access),
+):
+    assignment, experiment_version = await AssignmentService.assign_unit_async(
+        db=db,
+        experiment_id=payload.experiment_id,
+        unit_id=payload.unit_id,
+        attributes=payload.attributes or {},
+    )
+    # Variants were loaded while choosing, so this is normally an identity-map hit.
+    variant = await db.get(Variant, assignment.variant_id)
+    return _response_for_variant(assignment, variant, experiment_version)
+
+
+@async_router.post('/assign', response_model=AssignmentResponse)
+async def assign_user_legacy_async(
+    payload: AssignmentRequest,
+    db: AsyncSession = Depends(get_async_db),
+    _auth: None = Depends(require_write_access),
+):
+    return await assign_variant_async(payload, db)
@@ -1,48 +1,299 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import re
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.api.deps import get_db, require_write_access
+from app.api.deps import (
+    enforce_ingestion_quota,
+    enforce_ingestion_quota_async,
+    get_async_db,
+    get_db,
+    require_write_access,
+)
+from app.core.realtime import FIREHOSE_ACTIVE_REFRESH_SECONDS, TailFilter
+from app.core.serialization import dumps_str
+from app.models.event import Event
 from app.schemas.event import (
+    COLUMNAR_CONTENT_TYPE,
     BatchIngestResponse,
     EventCreate,
     EventResponse,
+    ExposureColumnBatch,
     ExposureEventCreate,
+    ExposureEventRow,
+    MetricColumnBatch,
     MetricEventCreate,
+    MetricEventRow,
 )
 from app.services.event_service import EventService
 
 router = APIRouter(prefix='/events', tags=['events'])
+async_router = APIRouter(prefix='/events', tags=['events'])
+
+
+TAIL_KEEPALIVE_SECONDS = 15.0
+
+
+def _publish_ingested(notifier, experiment_ids: set[str]) -> set[str]:
+    """Announce the ingestion and return the experiments somebody is tailing. Blocking Redis round trips."""
+    notifier.publish(experiment_ids)
+    return {experiment_id for experiment_id in experiment_ids if notifier.is_tailed(experiment_id)}
+
+
+def _firehose_records(events: list[Event], tailed: set[str]) -> list[dict]:
+    return [EventService.firehose_record(event) for event in events if event.experiment_id in tailed]
+
+
+def _notify_ingested(request: Request, events: list[Event]) -> None:
+    notifier = getattr(request.app.state, 'ingestion_notifier', None)
+    if notifier is None or not events:
+        return
+    tailed = _publish_ingested(notifier, {event.experiment_id for event in events})
+    if tailed:
+        notifier.publish_events(_firehose_records(events, tailed))
+
+
+def _experiment_ids(payload) -> list[str]:
+    if isinstance(payload, (ExposureColumnBatch, MetricColumnBatch)):
+        return payload.experiment_ids()
+    return [item['experiment_id'] for item in payload] if isinstance(payload, list) else [payload.experiment_id]
+
+
+# One adapter per body shape, picked up front, so a batch is never validated against a union per item.
+# JSON batches validate into plain dicts (ExposureEventRow/MetricEventRow) that map straight onto rows.
+_EXPOSURE_SINGLE = TypeAdapter(ExposureEventCreate)
+_METRIC_SINGLE = TypeAdapter(MetricEventCreate)
+_EXPOSURE_ROWS = TypeAdapter(list[ExposureEventRow])
+_METRIC_ROWS = TypeAdapter(list[MetricEventRow])
+_EXPOSURE_COLUMNS = TypeAdapter(ExposureColumnBatch)
+_METRIC_COLUMNS = TypeAdapter(MetricColumnBatch)
+_JSON_ARRAY = re.compile(rb'\s*\[')
+
+
+def _parse_body(request: Request, body: bytes, single: TypeAdapter, rows: TypeAdapter, columns: TypeAdapter):
+    # Batch endpoints take one JSON event, a JSON array, or the columnar layout (chosen by Content-Type).
+    content_type = request.headers.get('content-type', '').split(';', 1)[0].strip().lower()
+    if content_type == COLUMNAR_CONTENT_TYPE:
+        adapter = columns
+    else:
+        adapter = rows if _JSON_ARRAY.match(body) else single
+    try:
+        return adapter.validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**error, 'loc': ('body', *error['loc'])} for error in exc.errors(include_url=False)]
+        ) from exc
+
+
+def _inline_refs(node, definitions: dict):
+    if isinstance(node, dict):
+        if '$ref' in node:
+            return _inline_refs(definitions[node['$ref'].rsplit('/', 1)[-1]], definitions)
+        return {key: _inline_refs(value, definitions) for key, value in node.items() if key != '$defs'}
+    if isinstance(node, list):
+        return [_inline_refs(item, definitions) for item in node]
+    return node
+
+
+def _inline_schema(adapter: TypeAdapter) -> dict:
+    schema = adapter.json_schema()
+    return _inline_refs(schema, schema.get('$defs', {}))
+
+
+def _batch_request_body(single: TypeAdapter, rows: TypeAdapter, columns: TypeAdapter) -> dict:
+    # The body is parsed by a dependency (two content types), so its schema is declared by hand for /docs.
+    content = {
+        'application/json': {'schema': {'anyOf': [_inline_schema(single), _inline_schema(rows)]}},
+        COLUMNAR_CONTENT_TYPE: {'schema': _inline_schema(columns)},
+    }
+    return {'requestBody': {'required': True, 'content': content}}
+
+
+_EXPOSURE_BODY = _batch_request_body(_EXPOSURE_SINGLE, _EXPOSURE_ROWS, _EXPOSURE_COLUMNS)
+_METRIC_BODY = _batch_request_body(_METRIC_SINGLE, _METRIC_ROWS, _METRIC_COLUMNS)
+
+
+async def exposure_payload(request: Request) -> ExposureEventCreate | list[ExposureEventRow] | ExposureColumnBatch:
+    return _parse_body(request, await request.body(), _EXPOSURE_SINGLE, _EXPOSURE_ROWS, _EXPOSURE_COLUMNS)
+
+
+async def metric_payload(request: Request) -> MetricEventCreate | list[MetricEventRow] | MetricColumnBatch:
+    return _parse_body(request, await request.body(), _METRIC_SINGLE, _METRIC_ROWS, _METRIC_COLUMNS)
 
 
 @router.post('', response_model=EventResponse)
 def create_event(
     payload: EventCreate,
+    request: Request,
     db: Session = Depends(get_db),
     _auth: None = Depends(require_write_access),
 ):
-    event = EventService.ingest_event(db, payload)
+    enforce_ingestion_quota(request, [payload.experiment_id])
+    event, created = EventService.record_event(db, payload)
+    if created:
+        _notify_ingested(request, [event])
     return EventService.serialize_event(event)
 
 
-@router.post('/exposure', response_model=BatchIngestResponse)
+@router.post('/exposure', response_model=BatchIngestResponse, openapi_extra=_EXPOSURE_BODY)
 def create_exposure(
-    payload: ExposureEventCreate | list[ExposureEventCreate],
+    request: Request,
     db: Session = Depends(get_db),
     _auth: None = Depends(require_write_access),
+    payload: ExposureEventCreate | list[ExposureEventRow] | ExposureColumnBatch = Depends(exposure_payload),
 ):
-    if isinstance(payload, list):
-        return BatchIngestResponse(ingested=EventService.ingest_exposure_batch(db, payload))
-    EventService.ingest_exposure(db, payload)
-    return BatchIngestResponse(ingested=1)
+    experiment_ids = _experiment_ids(payload)
+    enforce_ingestion_quota(request, experiment_ids)
+    if isinstance(payload, ExposureEventCreate):
+        events = EventService.ingest_exposure_events(db, [payload])
+    elif isinstance(payload, ExposureColumnBatch):
+        events = EventService.ingest_exposure_columns(db, payload)
+    else:
+        events = EventService.ingest_exposure_rows(db, payload)
+    _notify_ingested(request, events)
+    return BatchIngestResponse(ingested=len(events), duplicates=len(experiment_ids) - len(events))
 
 
-@router.post('/metric', response_model=BatchIngestResponse)
+@router.post('/metric', response_model=BatchIngestResponse, openapi_extra=_METRIC_BODY)
 def create_metric(
-    payload: MetricEventCreate | list[MetricEventCreate],
+    request: Request,
     db: Session = Depends(get_db),
     _auth: None = Depends(require_write_access),
+    payload: MetricEventCreate | list[MetricEventRow] | MetricColumnBatch = Depends(metric_payload),
+):
+    experiment_ids = _experiment_ids(payload)
+    enforce_ingestion_quota(request, experiment_ids)
+    if isinstance(payload, MetricEventCreate):
+        events = EventService.ingest_metric_events(db, [payload])
+    elif isinstance(payload, MetricColumnBatch):
+        events = EventService.ingest_metric_columns(db, payload)
+    else:
+        events = EventService.ingest_metric_rows(db, payload)
+    _notify_ingested(request, events)
+    return BatchIngestResponse(ingested=len(events), duplicates=len(experiment_ids) - len(events))
+
+
+async def _notify_ingested_async(db: AsyncSession, request: Request, events: list[Event]) -> None:
+    notifier = getattr(request.app.state, 'ingestion_notifier', None)
+    if notifier is None or not events:
+        return
+    # The notifier talks to Redis synchronously, so it runs on the threadpool rather than the event loop.
+    tailed = await run_in_threadpool(_publish_ingested, notifier, {event.experiment_id for event in events})
+    if tailed:
+        # Firehose records may touch lazy relationships, which an AsyncSession only allows inside run_sync.
+        records = await db.run_sync(lambda _: _firehose_records(events, tailed))
+        await run_in_threadpool(notifier.publish_events, records)
+
+
+@async_router.post('', response_model=EventResponse)
+async def create_event_async(
+    payload: EventCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    _auth: None = Depends(require_write_access),
+):
+    await enforce_ingestion_quota_async(request, [payload.experiment_id])
+    event, created = await EventService.record_event_async(db, payload)
+    if created:
+        await _notify_ingested_async(db, request, [event])
+    return EventService.serialize_event(event)
+
+
+@async_router.post('/exposure', response_model=BatchIngestResponse, openapi_extra=_EXPOSURE_BODY)
+async def create_exposure_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    _auth: None = Depends(require_write_access),
+    payload: ExposureEventCreate | list[ExposureEventRow] | ExposureColumnBatch = Depends(exposure_payload),
 ):
-    if isinstance(payload, list):
-        return BatchIngestResponse(ingested=EventService.ingest_metric_batch(db, payload))
-    EventService.ingest_metric(db, payload)
-    return BatchIngestResponse(ingested=1)
+    experiment_ids = _experiment_ids(payload)
+    await enforce_ingestion_quota_async(request, experiment_ids)
+    if isinstance(payload, ExposureEventCreate):
+        events = await EventService.ingest_exposure_events_async(db, [payload])
+    elif isinstance(payload, ExposureColumnBatch):
+        events = await EventService.ingest_exposure_columns_async(db, payload)
+    else:
+        events = await EventService.ingest_exposure_rows_async(db, payload)
+    await _notify_ingested_async(db, request, events)
+    return BatchIngestResponse(ingested=len(events), duplicates=len(experiment_ids) - len(events))
+
+
+@async_router.post('/metric', response_model=BatchIngestResponse, openapi_extra=_METRIC_BODY)
+async def create_metric_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    _auth: None = Depends(require_write_access),
+    payload: MetricEventCreate | list[MetricEventRow] | MetricColumnBatch = Depends(metric_payload),
+):
+    experiment_ids = _experiment_ids(payload)
+    await enforce_ingestion_quota_async(request, experiment_ids)
+    if isinstance(payload, MetricEventCreate):
+        events = await EventService.ingest_metric_events_async(db, [payload])
+    elif isinstance(payload, MetricColumnBatch):
+        events = await EventService.ingest_metric_columns_async(db, payload)
+    else:
+        events = await EventService.ingest_metric_rows_async(db, payload)
+    await _notify_ingested_async(db, request, events)
+    return BatchIngestResponse(ingested=len(events), duplicates=len(experiment_ids) - len(events))
+
+
+@router.get('/tail/{experiment_id}')
+async def tail_events(
+    experiment_id: str,
+    request: Request,
+    variant: str | None = Query(default=None, description='Variant key or id'),
+    event_type: str | None = None,
+    metric_name: str | None = None,
+    sample_rate: float = Query(default=1.0, gt=0, le=1),
+    _auth: None = Depends(require_write_access),
+):
+    """Server-Sent Events stream of events as they are ingested; never reads the events table.
+
+    The records carry raw unit ids and contexts, so the stream needs the same token as ingestion.
+    """
+    firehose = request.app.state.event_firehose
+    notifier = request.app.state.ingestion_notifier
+    subscription = firehose.subscribe(
+        experiment_id,
+        TailFilter(variant=variant, event_type=event_type, metric_name=metric_name, sample_rate=sample_rate),
+    )
+
+    async def keep_marked():
+        # Busy streams never hit the keepalive timeout, so the activity key is refreshed on its own timer.
+        while True:
+            await asyncio.sleep(FIREHOSE_ACTIVE_REFRESH_SECONDS)
+            await run_in_threadpool(notifier.mark_tailed, experiment_id)
+
+    async def stream():
+        reported_drops = 0
+        refresher = None
+        try:
+            await run_in_threadpool(notifier.mark_tailed, experiment_id)
+            refresher = asyncio.create_task(keep_marked())
+            yield ': tailing\n\n'
+            while True:
+                try:
+                    record = await asyncio.wait_for(subscription.queue.get(), timeout=TAIL_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                if subscription.dropped != reported_drops:
+                    reported_drops = subscription.dropped
+                    yield f'event: dropped\ndata: {dumps_str({"dropped": reported_drops})}\n\n'
+                yield f'event: {record["event_type"]}\ndata: {dumps_str(record)}\n\n'
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+            firehose.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
@@ -1,9 +1,9 @@
-import json
-
 from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_write_access
+from app.api.deps import get_async_db, get_async_read_db, get_db, get_read_db, require_write_access
+from app.core.serialization import loads
 from app.schemas.experiment import (
     CondensedPerformance,
     ExecutiveSummary,
@@ -15,11 +15,14 @@ from app.schemas.experiment import (
 )
 from app.schemas.decision import DecisionAuditResponse, DecisionOverrideRequest
 from app.schemas.snapshot import ReportSnapshotResponse
+from app.services.analysis_service import AnalysisService
 from app.services.decision_service import DecisionService
 from app.services.experiment_service import ExperimentService
 from app.services.snapshot_service import SnapshotService
 
 router = APIRouter(prefix='/experiments', tags=['experiments'])
+# Async handlers that replace their sync counterparts when ASYNC_DB_ENABLED is set.
+async_router = APIRouter(prefix='/experiments', tags=['experiments'])
 
 
 @router.post('', response_model=ExperimentResponse)
@@ -33,18 +36,18 @@ def create_experiment(
 
 
 @router.get('', response_model=list[ExperimentResponse])
-def list_experiments(db: Session = Depends(get_db)):
+def list_experiments(db: Session = Depends(get_read_db)):
     experiments = ExperimentService.list_experiments(db)
     return [ExperimentService.serialize_experiment(item) for item in experiments]
 
 
 @router.get('/running', response_model=list[CondensedPerformance])
-def running_experiments(db: Session = Depends(get_db)):
+def running_experiments(db: Session = Depends(get_read_db)):
     return ExperimentService.condensed_running_reports(db)
 
 
 @router.get('/executive-summary', response_model=ExecutiveSummary)
-def executive_summary(db: Session = Depends(get_db)):
+def executive_summary(db: Session = Depends(get_read_db)):
     return ExperimentService.executive_summary(db)
 
 
@@ -131,20 +134,28 @@ def decision_history(experiment_id: str, db: Session = Depends(get_db)):
 
 
 @router.get('/{experiment_id}/report', response_model=ExperimentReport)
-def experiment_report(experiment_id: str, db: Session = Depends(get_db)):
-    experiment = ExperimentService.get_experiment(db, experiment_id)
-    report = ExperimentService.build_report(db, experiment)
-    experiment = ExperimentService.apply_outcome_transition(db, experiment, report)
-    report['status'] = experiment.status
-    SnapshotService.create_snapshot(db, experiment_id, report)
-    return report
+def experiment_report(
+    experiment_id: str,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+):
+    return AnalysisService.refresh_report(db, experiment_id, read_db=read_db)
+
+
+@async_router.get('/{experiment_id}/report', response_model=ExperimentReport)
+async def experiment_report_async(
+    experiment_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db),
+):
+    return await AnalysisService.refresh_report_async(db, experiment_id, read_db=read_db)
 
 
 @router.get('/{experiment_id}/export')
 def export_experiment_report(
     experiment_id: str,
     format: str = Query(default='json'),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     experiment = ExperimentService.get_experiment(db, experiment_id)
     report = ExperimentService.build_report(db, experiment)
@@ -154,13 +165,13 @@ def export_experiment_report(
 
 
 @router.get('/{experiment_id}/snapshots', response_model=list[ReportSnapshotResponse])
-def experiment_snapshots(experiment_id: str, db: Session = Depends(get_db)):
+def experiment_snapshots(experiment_id: str, db: Session = Depends(get_read_db)):
     snapshots = SnapshotService.list_snapshots(db, experiment_id)
     return [
         ReportSnapshotResponse(
             id=snapshot.id,
             experiment_id=snapshot.experiment_id,
-            snapshot=json.loads(snapshot.snapshot_json),
+            snapshot=loads(snapshot.snapshot_json),
             created_at=snapshot.created_at,
         )
         for snapshot in snapshots
@@ -1,17 +1,44 @@
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db
+from app.api.deps import get_async_read_db, get_read_db
 from app.schemas.results import ExperimentResultsResponse
 from app.services.results_service import ResultsService
 
 router = APIRouter(prefix='/results', tags=['results'])
+async_router = APIRouter(prefix='/results', tags=['results'])
 
 
 @router.get('/{experiment_id}', response_model=ExperimentResultsResponse)
 def get_results(
     experiment_id: str,
     interval: str = Query(default='hour'),
-    db: Session = Depends(get_db),
+    correction: str | None = Query(default=None),
+    all_pairs: bool = Query(default=False),
+    db: Session = Depends(get_read_db),
 ):
-    return ResultsService.build_results(db=db, experiment_id=experiment_id, interval=interval)
+    return ResultsService.build_results(
+        db=db,
+        experiment_id=experiment_id,
+        interval=interval,
+        correction=correction,
+        all_pairs=all_pairs,
+    )
+
+
+@async_router.get('/{experiment_id}', response_model=ExperimentResultsResponse)
+async def get_results_async(
+    experiment_id: str,
+    interval: str = Query(default='hour'),
+    correction: str | None = Query(default=None),
+    all_pairs: bool = Query(default=False),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await ResultsService.build_results_async(
+        db=db,
+        experiment_id=experiment_id,
+        interval=interval,
+        correction=correction,
+        all_pairs=all_pairs,
+    )
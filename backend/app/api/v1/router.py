@@ -1,14 +1,49 @@
 from fastapi import APIRouter
 
+from app.api.v1.assignments import async_router as assignments_async_router
 from app.api.v1.assignments import router as assignments_router
+from app.api.v1.events import async_router as events_async_router
 from app.api.v1.events import router as events_router
+from app.api.v1.experiments import async_router as experiments_async_router
 from app.api.v1.experiments import router as experiments_router
+from app.api.v1.results import async_router as results_async_router
 from app.api.v1.results import router as results_router
 from app.api.v1.websocket import router as websocket_router
 
-api_router = APIRouter()
-api_router.include_router(experiments_router)
-api_router.include_router(assignments_router)
-api_router.include_router(events_router)
-api_router.include_router(results_router)
-api_router.include_router(websocket_router)
+_ASYNC_ROUTERS = (
+    experiments_async_router,
+    assignments_async_router,
+    events_async_router,
+    results_async_router,
+)
+
+
+def _route_key(route) -> tuple[str, frozenset]:
+    return route.path, frozenset(getattr(route, 'methods', None) or ())
+
+
+def _without_routes(router: APIRouter, shadowed: set[tuple[str, frozenset]]) -> APIRouter:
+    filtered = APIRouter()
+    filtered.routes.extend(route for route in router.routes if _route_key(route) not in shadowed)
+    return filtered
+
+
+def build_api_router(async_db: bool = False) -> APIRouter:
+    routers = [experiments_router, assignments_router, events_router, results_router, websocket_router]
+    api = APIRouter()
+    if not async_db:
+        for router in routers:
+            api.include_router(router)
+        return api
+
+    # Async handlers are registered first and their sync twins dropped, so each path has exactly one handler.
+    shadowed: set[tuple[str, frozenset]] = set()
+    for router in _ASYNC_ROUTERS:
+        shadowed |= {_route_key(route) for route in router.routes}
+        api.include_router(router)
+    for router in routers:
+        api.include_router(_without_routes(router, shadowed))
+    return api
+
+
+api_router = build_api_router()
@@ -1,26 +1,155 @@
 import asyncio
-import json
+from collections.abc import Awaitable, Callable
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 
-from app.services.analysis_service import AnalysisService
+from app.core.realtime import RUNNING_CHANNEL, ExperimentBroadcaster, LiveFrame, LiveSubscription
+from app.core.serialization import loads
+from app.services.experiment_service import ExperimentService
 
 router = APIRouter(prefix='/ws', tags=['websocket'])
 
+MAX_CHANNELS_PER_SOCKET = 200
+
+
+def _experiment_exists(session_maker, experiment_id: str) -> bool:
+    db = session_maker()
+    try:
+        ExperimentService.get_experiment(db, experiment_id)
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+def _parse_message(text: str | None) -> dict:
+    if not text:
+        return {}
+    try:
+        message = loads(text)
+    except ValueError:
+        return {}
+    return message if isinstance(message, dict) else {}
+
+
+def _requested_channels(message: dict) -> list[str]:
+    channels = message.get('channels')
+    if channels is None:
+        channels = [message['channel']] if 'channel' in message else []
+    if not isinstance(channels, list):
+        return []
+    return [channel for channel in channels if isinstance(channel, str) and channel]
+
+
+class _LiveConnection:
+    """One socket's view of the broadcaster: the channels it follows and the last version sent for each."""
+
+    def __init__(self, websocket: WebSocket, broadcaster: ExperimentBroadcaster) -> None:
+        self.websocket = websocket
+        self.broadcaster = broadcaster
+        self.subscription = LiveSubscription()
+        self.channels: set[str] = set()
+        self.last_seq: dict[str, int] = {}
+
+    def subscribe(self, channel: str) -> None:
+        if channel in self.channels:
+            return
+        self.channels.add(channel)
+        self.broadcaster.subscribe(channel, self.subscription)
+
+    def unsubscribe(self, channel: str) -> None:
+        if channel not in self.channels:
+            return
+        self.channels.discard(channel)
+        self.last_seq.pop(channel, None)
+        self.broadcaster.unsubscribe(channel, self.subscription)
+
+    async def send_frame(self, frame: LiveFrame) -> None:
+        if frame.channel not in self.channels:
+            return
+        await self.websocket.send_text(frame.message_after(self.last_seq.get(frame.channel)))
+        self.last_seq[frame.channel] = frame.seq
+
+    async def resync(self, channel: str) -> None:
+        frame = self.broadcaster.latest(channel)
+        if channel in self.channels and frame is not None:
+            await self.websocket.send_text(frame.snapshot)
+            self.last_seq[channel] = frame.seq
+
+    async def run(self, on_message: Callable[[dict], Awaitable[None]]) -> None:
+        # Watching the receive side notices disconnects and control messages while no updates are flowing.
+        receiver = asyncio.create_task(self.websocket.receive())
+        try:
+            while True:
+                update = asyncio.create_task(self.subscription.get())
+                done, _ = await asyncio.wait({update, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if update in done:
+                    await self.send_frame(update.result())
+                else:
+                    update.cancel()
+                if receiver in done:
+                    message = receiver.result()
+                    if message['type'] == 'websocket.disconnect':
+                        return
+                    await on_message(_parse_message(message.get('text')))
+                    receiver = asyncio.create_task(self.websocket.receive())
+        except WebSocketDisconnect:
+            return
+        finally:
+            receiver.cancel()
+            for channel in list(self.channels):
+                self.unsubscribe(channel)
+
 
 @router.websocket('/experiments/{experiment_id}/live')
 async def experiment_live(websocket: WebSocket, experiment_id: str):
     await websocket.accept()
-    try:
-        while True:
-            db = websocket.app.state.session_maker()
-            try:
-                report = AnalysisService.report(db, experiment_id)
-                report['status'] = report['status'].value
-                report['last_updated_at'] = report['last_updated_at'].isoformat()
-                await websocket.send_text(json.dumps(report))
-            finally:
-                db.close()
-            await asyncio.sleep(2)
-    except WebSocketDisconnect:
+    if not await run_in_threadpool(_experiment_exists, websocket.app.state.session_maker, experiment_id):
+        await websocket.close(code=1008, reason='Experiment not found')
         return
+
+    connection = _LiveConnection(websocket, websocket.app.state.live_broadcaster)
+    connection.subscribe(experiment_id)
+
+    async def on_message(message: dict) -> None:
+        # Clients that detect a sequence gap ask for a fresh snapshot with {"type": "resync"}.
+        if message.get('type') == 'resync':
+            await connection.resync(experiment_id)
+
+    await connection.run(on_message)
+
+
+@router.websocket('/live')
+async def multiplexed_live(websocket: WebSocket):
+    await websocket.accept()
+    connection = _LiveConnection(websocket, websocket.app.state.live_broadcaster)
+    session_maker = websocket.app.state.session_maker
+
+    async def on_message(message: dict) -> None:
+        action = message.get('type')
+        channels = _requested_channels(message)
+        if action == 'subscribe':
+            for channel in channels:
+                if channel in connection.channels:
+                    continue
+                if len(connection.channels) >= MAX_CHANNELS_PER_SOCKET:
+                    await websocket.send_json(
+                        {'type': 'error', 'channel': channel, 'detail': 'Too many subscriptions on this socket'}
+                    )
+                    continue
+                if channel != RUNNING_CHANNEL and not await run_in_threadpool(
+                    _experiment_exists, session_maker, channel
+                ):
+                    await websocket.send_json({'type': 'error', 'channel': channel, 'detail': 'Experiment not found'})
+                    continue
+                connection.subscribe(channel)
+        elif action == 'unsubscribe':
+            for channel in channels:
+                connection.unsubscribe(channel)
+        elif action == 'resync':
+            for channel in channels or list(connection.channels):
+                await connection.resync(channel)
+
+    await connection.run(on_message)
@@ -7,10 +7,55 @@ class Settings(BaseSettings):
     app_name: str = 'Litmus Platform'
     api_v1_prefix: str = '/api/v1'
     database_url: str = 'sqlite:///./litmus.db'
+    # Serve assignment, ingestion, report and results routes from async handlers on an asyncpg/aiosqlite engine.
+    async_db_enabled: bool = False
+    # Replica used by read-only report, results and listing routes; empty means read from the primary.
+    read_database_url: str = ''
+    # Analytics reads fall back to the primary while the replica is further behind than this.
+    read_replica_max_lag_seconds: float = 5.0
+    read_replica_check_interval_seconds: float = 1.0
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    # Per-statement timeout on Postgres connections; 0 disables it.
+    db_statement_timeout_ms: int = 0
+    # Transaction-pooling PgBouncer: no server-side prepared statement caching, timeouts set per transaction.
+    db_pgbouncer_mode: bool = False
+    redis_url: str = ''
     environment: str = 'development'
     admin_api_tokens: str = ''
+    # Per caller, per minute: RATE_LIMIT_PER_MINUTE covers admin/experiment writes, the assignment limit
+    # covers the user-facing assignment path; 0 disables a class. Ingestion is limited per item below.
     rate_limit_per_minute: int = 120
+    rate_limit_assignment_per_minute: int = 6000
+    # Upper bound on tracked client/route rate-limit keys; least recently seen keys are evicted first.
+    rate_limit_max_keys: int = 100_000
+    # 'memory' keeps token buckets per process; 'redis' shares them across workers through REDIS_URL.
+    rate_limit_backend: str = 'memory'
+    # Ingestion quotas charged per event (a batch of N costs N); 0 disables a quota.
+    ingestion_items_per_minute: int = 60_000
+    experiment_events_per_minute: int = 300_000
+    multiple_testing_correction: str = 'holm'
+    live_report_min_interval_seconds: float = 1.0
+    live_report_refresh_seconds: float = 30.0
+    live_report_workers: int = 4
+    live_running_min_interval_seconds: float = 5.0
+    event_tail_queue_size: int = 1000
     log_level: str = 'INFO'
+    # Opt-in per-statement SQL profiling for a sample of requests; sampled requests slower than the
+    # threshold are logged with their top queries and query plans.
+    sql_profiling_enabled: bool = False
+    sql_profiling_sample_rate: float = 0.05
+    slow_request_threshold_ms: float = 1000.0
+    slow_request_top_queries: int = 5
+    slow_request_explain: bool = True
+    server_timing_enabled: bool = True
+    # Upper bounds, in seconds, of the request latency histogram buckets exposed at /metrics/prometheus.
+    metrics_latency_buckets: str = '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10'
+    # Upper bound on a gzip-encoded request body once inflated (SDK batch flushes are compressed).
+    max_decompressed_body_bytes: int = 32 * 1024 * 1024
     cors_allowed_origins: str = 'http://localhost:3000,http://127.0.0.1:3000'
 
 
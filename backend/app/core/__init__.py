@@ -2,18 +2,24 @@ from app.core.assignment import deterministic_bucket
 from app.core.observability import InMemoryRequestMetrics
 from app.core.statistics import (
     calculate_sample_size,
+    calculate_sample_size_array,
     confidence_from_p_value,
     diff_in_diff,
     two_proportion_z_test,
+    two_proportion_z_test_array,
     uplift_confidence_interval,
+    uplift_confidence_interval_array,
 )
 
 __all__ = [
     'deterministic_bucket',
     'InMemoryRequestMetrics',
     'calculate_sample_size',
+    'calculate_sample_size_array',
     'two_proportion_z_test',
+    'two_proportion_z_test_array',
     'uplift_confidence_interval',
+    'uplift_confidence_interval_array',
     'confidence_from_p_value',
     'diff_in_diff',
 ]
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from time import monotonic
+from typing import Generic, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class LruTtlMap(Generic[K, V]):
+    """Dict-like map that keeps at most ``max_entries`` keys and forgets keys idle for ``ttl_seconds``.
+
+    Entries are ordered by last access, so both the LRU victim and the expired entries sit at the
+    front and are dropped in amortized O(1) per operation. With ``touch_on_read=False`` reads leave
+    the entry's age alone, which turns the TTL into expire-after-write for caches of remote state.
+    Callers with an injectable clock pass ``now`` explicitly.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float | None = None,
+        now_fn: Callable[[], float] = monotonic,
+        touch_on_read: bool = True,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError('max_entries must be positive')
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._now_fn = now_fn
+        self.touch_on_read = touch_on_read
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        cutoff = now - self.ttl_seconds
+        while self._entries:
+            key, (touched_at, _) = next(iter(self._entries.items()))
+            if touched_at >= cutoff:
+                return
+            del self._entries[key]
+            self.expirations += 1
+
+    def get(self, key: K, default: V | None = None, now: float | None = None) -> V | None:
+        now = self._now_fn() if now is None else now
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if self.touch_on_read:
+                self._entries[key] = (now, entry[1])
+                self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: K, value: V, now: float | None = None) -> None:
+        now = self._now_fn() if now is None else now
+        with self._lock:
+            self._expire(now)
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key: K, factory: Callable[[], V], now: float | None = None) -> V:
+        now = self._now_fn() if now is None else now
+        value = self.get(key, now=now)
+        if value is None:
+            value = factory()
+            self.set(key, value, now=now)
+        return value
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
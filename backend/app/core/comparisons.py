@@ -0,0 +1,172 @@
+from functools import lru_cache
+from itertools import combinations
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+from scipy.optimize import brentq
+from scipy.stats import norm
+
+from app.core.statistics import two_proportion_z_test_array, two_sided_critical_value
+
+CORRECTION_METHODS = ('none', 'bonferroni', 'holm', 'bh')
+
+_HERMITE_NODES, _HERMITE_WEIGHTS = np.polynomial.hermite_e.hermegauss(64)
+_HERMITE_WEIGHTS = _HERMITE_WEIGHTS / np.sqrt(2 * np.pi)
+
+
+class ArmComparisons(NamedTuple):
+    treatment_index: np.ndarray
+    reference_index: np.ndarray
+    uplift: np.ndarray
+    z_score: np.ndarray
+    p_value: np.ndarray
+    adjusted_p_value: np.ndarray
+    ci_lower: np.ndarray
+    ci_upper: np.ndarray
+    critical_value: np.ndarray
+
+    def matrix(self, field: str, arms: int) -> np.ndarray:
+        # Scatter one comparison field into an (..., arms, arms) grid indexed [treatment, reference].
+        values = getattr(self, field)
+        grid = np.full(values.shape[:-1] + (arms, arms), np.nan)
+        grid[..., self.treatment_index, self.reference_index] = values
+        return grid
+
+
+def comparison_pairs(arms: int, control_index: int = 0, all_pairs: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    if all_pairs:
+        pairs = [(treatment, reference) for reference, treatment in combinations(range(arms), 2)]
+    else:
+        pairs = [(index, control_index) for index in range(arms) if index != control_index]
+    if not pairs:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    treatment_index, reference_index = zip(*pairs)
+    return np.array(treatment_index, dtype=int), np.array(reference_index, dtype=int)
+
+
+def adjust_p_values(p_values: ArrayLike, method: str = 'holm') -> np.ndarray:
+    # Adjusts along the last axis so each row (metric) is its own family of tests.
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f'Unknown correction method: {method}')
+    p = np.asarray(p_values, dtype=float)
+    tests = p.shape[-1] if p.ndim else 1
+    if method == 'none' or tests <= 1:
+        return p.copy()
+    if method == 'bonferroni':
+        return np.minimum(p * tests, 1.0)
+
+    order = np.argsort(p, axis=-1)
+    sorted_p = np.take_along_axis(p, order, axis=-1)
+    ranks = np.arange(1, tests + 1)
+    if method == 'holm':
+        adjusted = np.maximum.accumulate(sorted_p * (tests - ranks + 1), axis=-1)
+    else:
+        adjusted = np.minimum.accumulate((sorted_p * tests / ranks)[..., ::-1], axis=-1)[..., ::-1]
+    result = np.empty_like(adjusted)
+    np.put_along_axis(result, order, np.minimum(adjusted, 1.0), axis=-1)
+    return result
+
+
+@lru_cache(maxsize=512)
+def _dunnett_critical_value(comparisons: int, correlation: float, alpha: float) -> float:
+    marginal = float(two_sided_critical_value(alpha))
+    if comparisons <= 1:
+        return marginal
+
+    # Equicorrelated normals reduce P(max |Z_i| <= c) to a one-dimensional integral over a shared factor.
+    rho = min(max(correlation, 0.0), 0.999)
+    shared = np.sqrt(rho) * _HERMITE_NODES
+    scale = np.sqrt(1 - rho)
+
+    def coverage_gap(critical: float) -> float:
+        inner = norm.cdf((critical + shared) / scale) - norm.cdf((-critical + shared) / scale)
+        return float(np.sum(_HERMITE_WEIGHTS * inner**comparisons)) - (1 - alpha)
+
+    bonferroni = float(two_sided_critical_value(alpha / comparisons))
+    if coverage_gap(bonferroni) <= 0:
+        return bonferroni
+    return brentq(coverage_gap, marginal, bonferroni, xtol=1e-6)
+
+
+def dunnett_critical_value(comparisons: int, correlation: float, alpha: float = 0.05) -> float:
+    return _dunnett_critical_value(int(comparisons), round(float(correlation), 3), round(float(alpha), 6))
+
+
+def compare_arms(
+    conversions: ArrayLike,
+    exposures: ArrayLike,
+    control_index: int = 0,
+    all_pairs: bool = False,
+    correction: str = 'holm',
+    alpha: float = 0.05,
+) -> ArmComparisons:
+    # Arms live on the last axis; any leading axes (for example metrics) are evaluated in the same pass.
+    # Intervals match the correction: marginal for 'none', simultaneous for the family-wise methods
+    # (Dunnett against a shared control, Bonferroni across all pairs) and FCR-adjusted for 'bh'.
+    if correction not in CORRECTION_METHODS:
+        raise ValueError(f'Unknown correction method: {correction}')
+    conversions_arr, exposures_arr = np.broadcast_arrays(
+        np.asarray(conversions, dtype=float), np.asarray(exposures, dtype=float)
+    )
+    arms = conversions_arr.shape[-1]
+    treatment_index, reference_index = comparison_pairs(arms, control_index, all_pairs)
+    tests = treatment_index.size
+
+    rates = np.divide(conversions_arr, exposures_arr, out=np.zeros_like(conversions_arr), where=exposures_arr > 0)
+    arm_variance = np.divide(
+        rates * (1 - rates), exposures_arr, out=np.zeros_like(rates), where=exposures_arr > 0
+    )
+    valid = (exposures_arr[..., treatment_index] > 0) & (exposures_arr[..., reference_index] > 0)
+
+    z_result = two_proportion_z_test_array(
+        conversions_arr[..., reference_index],
+        exposures_arr[..., reference_index],
+        conversions_arr[..., treatment_index],
+        exposures_arr[..., treatment_index],
+    )
+    uplift = np.where(valid, rates[..., treatment_index] - rates[..., reference_index], 0.0)
+    std_error = np.sqrt(
+        np.maximum(arm_variance[..., treatment_index] + arm_variance[..., reference_index], 1e-12)
+    )
+
+    adjusted_p_value = adjust_p_values(z_result.p_value, correction)
+    leading_shape = conversions_arr.shape[:-1]
+    if correction == 'none' or tests <= 1:
+        critical = np.full(leading_shape, float(two_sided_critical_value(alpha)))
+    elif correction == 'bh':
+        # BH controls the false discovery rate, not the family-wise error rate, so its intervals are
+        # false-coverage-rate adjusted to match (Benjamini & Yekutieli, 2005): level alpha * R / m for
+        # R rejections among m tests, which is the Bonferroni level when nothing is rejected.
+        rejections = np.maximum((adjusted_p_value <= alpha).sum(axis=-1), 1)
+        critical = np.asarray(two_sided_critical_value(alpha * rejections / tests), dtype=float)
+    elif all_pairs:
+        critical = np.full(leading_shape, float(two_sided_critical_value(alpha / tests)))
+    else:
+        # Dunnett-style simultaneous intervals: comparisons sharing the control are positively correlated.
+        reference_variance = arm_variance[..., control_index][..., None]
+        loading = np.sqrt(
+            np.divide(
+                reference_variance,
+                reference_variance + arm_variance[..., treatment_index],
+                out=np.full(uplift.shape, 0.5),
+                where=(reference_variance + arm_variance[..., treatment_index]) > 0,
+            )
+        )
+        mean_correlation = (loading.sum(axis=-1) ** 2 - (loading**2).sum(axis=-1)) / (tests * (tests - 1))
+        critical = np.vectorize(lambda rho: dunnett_critical_value(tests, rho, alpha), otypes=[float])(
+            mean_correlation
+        )
+
+    margin = critical[..., None] * std_error
+    return ArmComparisons(
+        treatment_index=treatment_index,
+        reference_index=reference_index,
+        uplift=uplift,
+        z_score=z_result.z_score,
+        p_value=z_result.p_value,
+        adjusted_p_value=adjusted_p_value,
+        ci_lower=np.where(valid, uplift - margin, 0.0),
+        ci_upper=np.where(valid, uplift + margin, 0.0),
+        critical_value=critical,
+    )
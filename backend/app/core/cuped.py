@@ -0,0 +1,93 @@
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+from scipy.stats import norm
+
+from app.core.statistics import two_sided_critical_value
+
+
+class CupedArrays(NamedTuple):
+    theta: np.ndarray
+    mean: np.ndarray
+    adjusted_mean: np.ndarray
+    variance: np.ndarray
+    adjusted_variance: np.ndarray
+
+
+class CupedComparison(NamedTuple):
+    adjusted_lift: np.ndarray
+    ci_lower: np.ndarray
+    ci_upper: np.ndarray
+    p_value: np.ndarray
+    variance_reduction: np.ndarray
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def cuped_from_sums(
+    units: ArrayLike,
+    sum_y: ArrayLike,
+    sum_y2: ArrayLike,
+    sum_x: ArrayLike,
+    sum_x2: ArrayLike,
+    sum_xy: ArrayLike,
+) -> CupedArrays:
+    # Works from per-arm sufficient statistics of (pre covariate x, post outcome y); arms are the last axis.
+    n, sy, syy, sx, sxx, sxy = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (units, sum_y, sum_y2, sum_x, sum_x2, sum_xy))
+    )
+    mean_y = _safe_divide(sy, n)
+    mean_x = _safe_divide(sx, n)
+    # Theta pools within-arm covariance so a real treatment effect on y does not leak into the slope.
+    within_cov = (sxy - n * mean_x * mean_y).sum(axis=-1, keepdims=True)
+    within_var_x = (sxx - n * mean_x**2).sum(axis=-1, keepdims=True)
+    theta = np.where(within_var_x > 1e-12, _safe_divide(within_cov, within_var_x), 0.0)
+
+    overall_mean_x = _safe_divide(sx.sum(axis=-1, keepdims=True), n.sum(axis=-1, keepdims=True))
+    adjusted_mean = mean_y - theta * (mean_x - overall_mean_x)
+
+    dof = np.maximum(n - 1, 1)
+    var_y = np.maximum((syy - n * mean_y**2) / dof, 0.0)
+    var_x = np.maximum((sxx - n * mean_x**2) / dof, 0.0)
+    cov_xy = (sxy - n * mean_x * mean_y) / dof
+    adjusted_variance = np.maximum(var_y - 2 * theta * cov_xy + theta**2 * var_x, 0.0)
+    return CupedArrays(
+        theta=theta[..., 0],
+        mean=mean_y,
+        adjusted_mean=adjusted_mean,
+        variance=var_y,
+        adjusted_variance=adjusted_variance,
+    )
+
+
+def compare_cuped_to_control(
+    cuped: CupedArrays,
+    units: ArrayLike,
+    control_index: int = 0,
+    alpha: float = 0.05,
+) -> CupedComparison:
+    # Returns arm-vs-control results for every arm; the control column is zeroed.
+    n = np.asarray(units, dtype=float)
+    control = (slice(None),) * (n.ndim - 1) + (slice(control_index, control_index + 1),)
+    valid = (n > 0) & (n[control] > 0)
+    valid[control] = False
+
+    adjusted_lift = np.where(valid, cuped.adjusted_mean - cuped.adjusted_mean[control], 0.0)
+    adjusted_se2 = _safe_divide(cuped.adjusted_variance, n) + _safe_divide(
+        cuped.adjusted_variance[control], n[control]
+    )
+    raw_se2 = _safe_divide(cuped.variance, n) + _safe_divide(cuped.variance[control], n[control])
+    adjusted_se = np.sqrt(np.maximum(adjusted_se2, 1e-12))
+    margin = float(two_sided_critical_value(alpha)) * adjusted_se
+    p_value = np.where(valid, 2 * norm.sf(np.abs(adjusted_lift) / adjusted_se), 1.0)
+    variance_reduction = np.where(valid & (raw_se2 > 0), 1 - _safe_divide(adjusted_se2, raw_se2), 0.0)
+    return CupedComparison(
+        adjusted_lift=adjusted_lift,
+        ci_lower=np.where(valid, adjusted_lift - margin, 0.0),
+        ci_upper=np.where(valid, adjusted_lift + margin, 0.0),
+        p_value=p_value,
+        variance_reduction=variance_reduction,
+    )
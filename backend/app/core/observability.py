@@ -1,42 +1,304 @@
 from __future__ import annotations
 
+import os
 import threading
 import time
+from bisect import bisect_left
 from collections import defaultdict
+from collections.abc import Iterable
+from contextvars import ContextVar, Token
 
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.profiling import QueryProfile
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int) -> None:
+        # One slot per bucket plus +Inf; counts are per bucket and made cumulative on export.
+        self.counts = [0] * (size + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, buckets: tuple[float, ...], value: float) -> None:
+        self.counts[bisect_left(buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: Histogram) -> None:
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.sum += other.sum
+        self.count += other.count
+
+
+class _MetricsShard:
+    __slots__ = (
+        'requests',
+        'server_errors',
+        'duration_ms',
+        'status_counts',
+        'endpoint_counts',
+        'route_requests',
+        'latency',
+        'db_queries',
+        'db_latency',
+        'in_flight',
+    )
 
-class InMemoryRequestMetrics:
     def __init__(self) -> None:
-        self._lock = threading.Lock()
+        self.requests = 0
+        self.server_errors = 0
+        self.duration_ms = 0.0
+        self.status_counts: dict[str, int] = defaultdict(int)
+        self.endpoint_counts: dict[str, int] = defaultdict(int)
+        self.route_requests: dict[tuple[str, str, str], int] = defaultdict(int)
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.db_queries: dict[tuple[str, str], Histogram] = {}
+        self.db_latency: dict[tuple[str, str], Histogram] = {}
+        self.in_flight: dict[tuple[str, str], int] = defaultdict(int)
+
+
+class RequestDbStats:
+    __slots__ = ('queries', 'duration_seconds', 'profile')
+
+    def __init__(self, profile: QueryProfile | None = None) -> None:
+        self.queries = 0
+        self.duration_seconds = 0.0
+        # Only sampled requests carry a profile; the rest pay for two counters.
+        self.profile = profile
+
+
+# Set by the request middleware; copied into threadpool workers and async tasks spawned for the request.
+_request_db_stats: ContextVar[RequestDbStats | None] = ContextVar('litmus_request_db_stats', default=None)
+current_request_id: ContextVar[str | None] = ContextVar('litmus_request_id', default=None)
+
+
+def track_request_db(profile: bool = False) -> tuple[RequestDbStats, Token]:
+    stats = RequestDbStats(QueryProfile() if profile else None)
+    return stats, _request_db_stats.set(stats)
+
+
+def stop_tracking_request_db(token: Token) -> None:
+    _request_db_stats.reset(token)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute query count and cursor time (and, for sampled requests, per-statement timings) to the
+    request being served, if any."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None and _request_db_stats.get() is not None:
+            context._litmus_query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        stats = _request_db_stats.get()
+        started = getattr(context, '_litmus_query_started', None)
+        if stats is None or started is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.duration_seconds += elapsed
+        if stats.profile is not None:
+            stats.profile.add(conn.engine, statement, parameters, executemany, elapsed)
+
+
+def process_resident_memory_bytes() -> int | None:
+    try:
+        with open('/proc/self/statm', encoding='ascii') as handle:
+            resident_pages = int(handle.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class InMemoryRequestMetrics:
+    """Request metrics kept in per-thread shards.
+
+    Writers only touch their own thread's shard, so recording never takes a lock; readers merge
+    all shards when building the JSON snapshot or the Prometheus exposition.
+    """
+
+    def __init__(self, latency_buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> None:
         self._started_at = time.time()
-        self._total_requests = 0
-        self._total_server_errors = 0
-        self._total_duration_ms = 0
-        self._status_counts: dict[str, int] = defaultdict(int)
-        self._endpoint_counts: dict[str, int] = defaultdict(int)
-
-    def record(self, method: str, path: str, status_code: int, duration_ms: int) -> None:
-        endpoint_key = f'{method} {path}'
-        status_key = str(status_code)
-        with self._lock:
-            self._total_requests += 1
-            self._total_duration_ms += max(0, duration_ms)
-            self._status_counts[status_key] += 1
-            self._endpoint_counts[endpoint_key] += 1
-            if status_code >= 500:
-                self._total_server_errors += 1
+        self.latency_buckets = tuple(sorted(latency_buckets))
+        self._local = threading.local()
+        self._shards: list[_MetricsShard] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _MetricsShard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _MetricsShard()
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _all_shards(self) -> list[_MetricsShard]:
+        with self._shards_lock:
+            return list(self._shards)
+
+    def request_started(self, method: str, route: str) -> None:
+        self._shard().in_flight[(method, route)] += 1
+
+    def request_finished(self, method: str, route: str) -> None:
+        self._shard().in_flight[(method, route)] -= 1
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        status_code: int,
+        duration_ms: float,
+        route: str | None = None,
+        db_queries: int = 0,
+        db_duration_ms: float = 0.0,
+    ) -> None:
+        shard = self._shard()
+        # Key by route template when the caller resolved one, so IDs in paths cannot grow the maps.
+        shard.endpoint_counts[f'{method} {route or path}'] += 1
+        route = route or UNMATCHED_ROUTE
+        shard.requests += 1
+        shard.duration_ms += max(0, duration_ms)
+        shard.status_counts[str(status_code)] += 1
+        if status_code >= 500:
+            shard.server_errors += 1
+        key = (method, route)
+        shard.route_requests[(method, route, str(status_code))] += 1
+        for histograms, buckets, value in (
+            (shard.latency, self.latency_buckets, max(0.0, duration_ms) / 1000),
+            (shard.db_queries, DB_QUERY_BUCKETS, db_queries),
+            (shard.db_latency, self.latency_buckets, max(0.0, db_duration_ms) / 1000),
+        ):
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(len(buckets))
+            histogram.observe(buckets, value)
+
+    def _merged_counts(self, attribute: str) -> dict:
+        merged: dict = defaultdict(int)
+        for shard in self._all_shards():
+            for key, value in getattr(shard, attribute).copy().items():
+                merged[key] += value
+        return merged
+
+    def _merged_histograms(self, attribute: str, size: int) -> dict[tuple[str, str], Histogram]:
+        merged: dict[tuple[str, str], Histogram] = {}
+        for shard in self._all_shards():
+            for key, histogram in getattr(shard, attribute).copy().items():
+                merged.setdefault(key, Histogram(size)).merge(histogram)
+        return merged
 
     def snapshot(self) -> dict:
-        with self._lock:
-            average_duration_ms = 0.0
-            if self._total_requests:
-                average_duration_ms = round(self._total_duration_ms / self._total_requests, 2)
-            top_endpoints = sorted(self._endpoint_counts.items(), key=lambda item: item[1], reverse=True)[:10]
-            return {
-                'uptime_seconds': int(max(0, time.time() - self._started_at)),
-                'total_requests': self._total_requests,
-                'total_server_errors': self._total_server_errors,
-                'average_duration_ms': average_duration_ms,
-                'status_counts': dict(self._status_counts),
-                'top_endpoints': [{'endpoint': key, 'count': count} for key, count in top_endpoints],
-            }
+        shards = self._all_shards()
+        total_requests = sum(shard.requests for shard in shards)
+        total_duration_ms = sum(shard.duration_ms for shard in shards)
+        average_duration_ms = round(total_duration_ms / total_requests, 2) if total_requests else 0.0
+        endpoint_counts = self._merged_counts('endpoint_counts')
+        top_endpoints = sorted(endpoint_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+        return {
+            'uptime_seconds': int(max(0, time.time() - self._started_at)),
+            'total_requests': total_requests,
+            'total_server_errors': sum(shard.server_errors for shard in shards),
+            'average_duration_ms': average_duration_ms,
+            'status_counts': dict(self._merged_counts('status_counts')),
+            'top_endpoints': [{'endpoint': key, 'count': count} for key, count in top_endpoints],
+            'in_flight': sum(self._merged_counts('in_flight').values()),
+        }
+
+    def render_prometheus(self) -> list[str]:
+        lines = [
+            '# HELP litmus_process_uptime_seconds Seconds since the API process started.',
+            '# TYPE litmus_process_uptime_seconds gauge',
+            f'litmus_process_uptime_seconds {max(0.0, time.time() - self._started_at):.3f}',
+        ]
+        lines += counter_lines(
+            'litmus_http_requests_total',
+            'HTTP requests by route template and status code.',
+            {
+                (('method', method), ('route', route), ('status', status)): value
+                for (method, route, status), value in self._merged_counts('route_requests').items()
+            },
+        )
+        lines += gauge_lines(
+            'litmus_http_requests_in_flight',
+            'HTTP requests currently being served.',
+            {
+                (('method', method), ('route', route)): value
+                for (method, route), value in self._merged_counts('in_flight').items()
+            },
+        )
+        lines += histogram_lines(
+            'litmus_http_request_duration_seconds',
+            'HTTP request latency by route template.',
+            self.latency_buckets,
+            self._merged_histograms('latency', len(self.latency_buckets)),
+        )
+        lines += histogram_lines(
+            'litmus_http_request_db_queries',
+            'Database queries issued per HTTP request.',
+            DB_QUERY_BUCKETS,
+            self._merged_histograms('db_queries', len(DB_QUERY_BUCKETS)),
+        )
+        lines += histogram_lines(
+            'litmus_http_request_db_duration_seconds',
+            'Database cursor time per HTTP request.',
+            self.latency_buckets,
+            self._merged_histograms('db_latency', len(self.latency_buckets)),
+        )
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[tuple[str, str]]) -> str:
+    rendered = ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs)
+    return f'{{{rendered}}}' if rendered else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _sample_lines(name: str, help_text: str, kind: str, samples: dict) -> list[str]:
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    for labels, value in sorted(samples.items()):
+        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    return lines
+
+
+def counter_lines(name: str, help_text: str, samples: dict) -> list[str]:
+    return _sample_lines(name, help_text, 'counter', samples)
+
+
+def gauge_lines(name: str, help_text: str, samples: dict) -> list[str]:
+    return _sample_lines(name, help_text, 'gauge', samples)
+
+
+def histogram_lines(
+    name: str, help_text: str, buckets: tuple[float, ...], histograms: dict[tuple[str, str], Histogram]
+) -> list[str]:
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (method, route), histogram in sorted(histograms.items()):
+        base = (('method', method), ('route', route))
+        cumulative = 0
+        for bound, count in zip((*buckets, float('inf')), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels((*base, ("le", _number(float(bound)))))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(base)} {_number(float(histogram.sum))}')
+        lines.append(f'{name}_count{_labels(base)} {histogram.count}')
+    return lines
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger('litmus.profiling')
+
+MAX_LOGGED_STATEMENT_CHARS = 2000
+
+
+class QueryStats:
+    __slots__ = ('count', 'total_seconds', 'max_seconds', 'slowest_parameters', 'engine')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slowest_parameters = None
+        self.engine: Engine | None = None
+
+
+class QueryProfile:
+    """Per-statement timings for one sampled request, grouped by SQL text."""
+
+    def __init__(self) -> None:
+        self.statements: dict[str, QueryStats] = {}
+
+    def add(self, engine: Engine, statement: str, parameters, executemany: bool, seconds: float) -> None:
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = QueryStats()
+            stats.engine = engine
+        stats.count += 1
+        stats.total_seconds += seconds
+        if seconds >= stats.max_seconds:
+            stats.max_seconds = seconds
+            # executemany batches cannot be explained as a single statement.
+            stats.slowest_parameters = None if executemany else parameters
+
+    def top(self, limit: int) -> list[tuple[str, QueryStats]]:
+        return sorted(self.statements.items(), key=lambda item: item[1].total_seconds, reverse=True)[:limit]
+
+
+def explain_statement(engine: Engine | None, statement: str, parameters) -> list[str] | None:
+    """Plan for a captured SELECT, re-planned (never re-executed) on the engine that ran it."""
+    if engine is None or engine.dialect.is_async or not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    try:
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql(prefix + statement, parameters or ()).all()
+    except SQLAlchemyError:
+        logger.debug('EXPLAIN failed for profiled statement', exc_info=True)
+        return None
+    return [' '.join(str(column) for column in row) for row in rows]
+
+
+def slow_request_report(profile: QueryProfile, top_queries: int, explain: bool) -> list[dict]:
+    report = []
+    for statement, stats in profile.top(top_queries):
+        entry = {
+            'statement': statement[:MAX_LOGGED_STATEMENT_CHARS],
+            'count': stats.count,
+            'total_ms': round(stats.total_seconds * 1000, 2),
+            'max_ms': round(stats.max_seconds * 1000, 2),
+        }
+        if explain:
+            entry['plan'] = explain_statement(stats.engine, statement, stats.slowest_parameters)
+        report.append(entry)
+    return report
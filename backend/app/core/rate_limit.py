@@ -1,11 +1,169 @@
-from collections import defaultdict, deque
+import logging
+import math
+import threading
 from collections.abc import Callable
+from dataclasses import dataclass
 from time import monotonic
 
+from app.core.bounded import LruTtlMap
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = 'litmus:ratelimit:'
+
+# Token buckets over one Redis hash per key: {tokens, ts}. Redis' own clock keeps every worker on
+# the same timeline, and each key expires once its bucket would be full again. ARGV holds four values
+# per key (capacity, window_ms, cost, required). Admission needs ``required`` tokens in every bucket
+# and then charges each its ``cost``, which may leave a bucket in debt (see _required_tokens). One
+# denied bucket denies the call and none is charged.
+_TOKEN_BUCKET_LUA = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local buckets = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+  local base = (i - 1) * 4
+  local capacity = tonumber(ARGV[base + 1])
+  local rate = capacity / tonumber(ARGV[base + 2])
+  local required = tonumber(ARGV[base + 4])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(state[1])
+  local updated = tonumber(state[2])
+  if tokens == nil or updated == nil then
+    tokens = capacity
+    updated = now
+  end
+  tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+  if tokens < required then
+    allowed = 0
+  end
+  buckets[i] = {capacity, rate, tonumber(ARGV[base + 3]), required, tokens}
+end
+local results = {}
+for i, key in ipairs(KEYS) do
+  local capacity, rate, cost, required, tokens = unpack(buckets[i])
+  local retry_ms = 0
+  if allowed == 1 then
+    tokens = tokens - cost
+  elseif tokens < required then
+    retry_ms = math.ceil((required - tokens) / rate)
+  end
+  redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', now)
+  local reset_ms = math.ceil((capacity - tokens) / rate)
+  redis.call('PEXPIRE', key, reset_ms + 1000)
+  results[i] = {allowed, tostring(tokens), retry_ms, reset_ms}
+end
+return results
+"""
+
+# (key, limit, cost) for one bucket of an all-or-nothing check.
+QuotaCharge = tuple[str, int, float]
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after_seconds: float
+    reset_after_seconds: float
+
+
+def rate_limit_headers(decision: RateLimitDecision) -> dict[str, str]:
+    """Standard X-RateLimit-* headers (plus Retry-After when denied) so clients can back off exactly."""
+    headers = {
+        'X-RateLimit-Limit': str(decision.limit),
+        'X-RateLimit-Remaining': str(max(0, decision.remaining)),
+        'X-RateLimit-Reset': str(math.ceil(decision.reset_after_seconds)),
+    }
+    if not decision.allowed:
+        headers['Retry-After'] = str(max(1, math.ceil(decision.retry_after_seconds)))
+    return headers
+
+
+def more_constrained(current: RateLimitDecision | None, candidate: RateLimitDecision) -> RateLimitDecision:
+    """The decision a client should see when one request was checked against several buckets."""
+    if current is None:
+        return candidate
+    if current.allowed != candidate.allowed:
+        return current if not current.allowed else candidate
+    if not candidate.allowed:
+        return candidate if candidate.retry_after_seconds > current.retry_after_seconds else current
+    return candidate if candidate.remaining / candidate.limit < current.remaining / current.limit else current
+
+
+def _required_tokens(cost: float, limit: int) -> float:
+    # Tokens a request must find in the bucket to be admitted. A batch larger than the whole bucket
+    # only needs a full one, or it could never pass, but it is still charged its true cost: the
+    # bucket goes into debt, and the refill wait of later requests pays that debt back.
+    return min(cost, float(limit))
+
 
 class InMemoryRateLimiter:
-    def __init__(self):
-        self._events: dict[str, deque[float]] = defaultdict(deque)
+    """Per-process token buckets: capacity ``limit``, refilled evenly over ``window_seconds``.
+
+    Each key stores two numbers (tokens left and the time they were computed), so memory per key
+    is constant regardless of the limit.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        # Keys are caller x route class, so the caller dimension is unbounded; least recently
+        # seen clients are evicted first and idle keys expire once their window has passed.
+        self._buckets: LruTtlMap[str, tuple[float, float]] = LruTtlMap(max_keys, ttl_seconds=0.0)
+        self._lock = threading.Lock()
+
+    def check(
+        self,
+        key: str,
+        limit: int,
+        window_seconds: float,
+        cost: float = 1,
+        now: float | None = None,
+    ) -> RateLimitDecision:
+        return self.check_all([(key, limit, cost)], window_seconds, now=now)[0]
+
+    def check_all(
+        self,
+        charges: list[QuotaCharge],
+        window_seconds: float,
+        now: float | None = None,
+    ) -> list[RateLimitDecision]:
+        """Charge every bucket or none: one bucket short of its required tokens denies them all."""
+        now = monotonic() if now is None else now
+        with self._lock:
+            buckets = []
+            for key, limit, cost in charges:
+                capacity = float(limit)
+                tokens, updated = self._buckets.get(key, (capacity, now), now=now)
+                rate = capacity / window_seconds
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                cost = max(float(cost), 0.0)
+                buckets.append((key, limit, rate, cost, _required_tokens(cost, limit), tokens))
+            allowed = all(tokens >= required for *_, required, tokens in buckets)
+            decisions = []
+            for key, limit, rate, cost, required, tokens in buckets:
+                if allowed:
+                    tokens -= cost
+                # A bucket idle for longer than the slowest refill in use (a window, or paying off a debt)
+                # is full again; forget it.
+                self._buckets.ttl_seconds = max(self._buckets.ttl_seconds, window_seconds, (limit - tokens) / rate)
+                self._buckets.set(key, (tokens, now), now=now)
+                decisions.append(
+                    RateLimitDecision(
+                        allowed=allowed,
+                        limit=limit,
+                        remaining=int(tokens),
+                        retry_after_seconds=0.0 if allowed else max(0.0, (required - tokens) / rate),
+                        reset_after_seconds=(limit - tokens) / rate,
+                    )
+                )
+        return decisions
+
+    async def acheck(self, key: str, limit: int, window_seconds: float, cost: float = 1) -> RateLimitDecision:
+        return self.check(key, limit, window_seconds, cost=cost)
+
+    async def acheck_all(self, charges: list[QuotaCharge], window_seconds: float) -> list[RateLimitDecision]:
+        return self.check_all(charges, window_seconds)
 
     def allow(
         self,
@@ -13,16 +171,100 @@ class InMemoryRateLimiter:
         limit: int,
         window_seconds: int,
         now_fn: Callable[[], float] = monotonic,
+        cost: float = 1,
     ) -> bool:
-        now = now_fn()
-        window_start = now - window_seconds
-        bucket = self._events[key]
+        return self.check(key, limit, window_seconds, cost=cost, now=now_fn()).allowed
+
+    def stats(self) -> dict:
+        return {'backend': 'memory', **self._buckets.stats()}
+
+
+class RedisRateLimiter:
+    """Cluster-wide token buckets shared by every API worker through Redis.
+
+    Each check is one atomic Lua call. If Redis is unreachable the limiter degrades to per-process
+    buckets rather than failing requests.
+    """
+
+    def __init__(self, redis_url: str, fallback: InMemoryRateLimiter | None = None) -> None:
+        import redis
+        import redis.asyncio as redis_async
+
+        self._client = redis.Redis.from_url(redis_url)
+        self._async_client = redis_async.Redis.from_url(redis_url)
+        self._script = self._client.register_script(_TOKEN_BUCKET_LUA)
+        self._async_script = self._async_client.register_script(_TOKEN_BUCKET_LUA)
+        self._fallback = fallback or InMemoryRateLimiter()
+        self._degraded = False
+
+    @staticmethod
+    def _decision(limit: int, result) -> RateLimitDecision:
+        allowed, tokens, retry_ms, reset_ms = result
+        return RateLimitDecision(
+            allowed=bool(int(allowed)),
+            limit=limit,
+            remaining=int(float(tokens)),
+            retry_after_seconds=int(retry_ms) / 1000,
+            reset_after_seconds=int(reset_ms) / 1000,
+        )
+
+    @staticmethod
+    def _keys(charges: list[QuotaCharge]) -> list[str]:
+        return [f'{REDIS_KEY_PREFIX}{key}' for key, _, _ in charges]
+
+    @staticmethod
+    def _args(charges: list[QuotaCharge], window_seconds: float) -> list:
+        args = []
+        for _, limit, cost in charges:
+            cost = max(float(cost), 0.0)
+            args.extend([limit, max(1, int(window_seconds * 1000)), cost, _required_tokens(cost, limit)])
+        return args
+
+    def _mark(self, degraded: bool) -> None:
+        if degraded and not self._degraded:
+            logger.warning('Redis rate limiter unavailable, falling back to per-process limits', exc_info=True)
+        elif not degraded and self._degraded:
+            logger.info('Redis rate limiter recovered')
+        self._degraded = degraded
 
-        while bucket and bucket[0] < window_start:
-            bucket.popleft()
+    def check(self, key: str, limit: int, window_seconds: float, cost: float = 1) -> RateLimitDecision:
+        return self.check_all([(key, limit, cost)], window_seconds)[0]
+
+    def check_all(self, charges: list[QuotaCharge], window_seconds: float) -> list[RateLimitDecision]:
+        try:
+            results = self._script(keys=self._keys(charges), args=self._args(charges, window_seconds))
+        except Exception:
+            self._mark(True)
+            return self._fallback.check_all(charges, window_seconds)
+        self._mark(False)
+        return [self._decision(limit, result) for (_, limit, _), result in zip(charges, results)]
+
+    async def acheck(self, key: str, limit: int, window_seconds: float, cost: float = 1) -> RateLimitDecision:
+        return (await self.acheck_all([(key, limit, cost)], window_seconds))[0]
+
+    async def acheck_all(self, charges: list[QuotaCharge], window_seconds: float) -> list[RateLimitDecision]:
+        try:
+            results = await self._async_script(keys=self._keys(charges), args=self._args(charges, window_seconds))
+        except Exception:
+            self._mark(True)
+            return self._fallback.check_all(charges, window_seconds)
+        self._mark(False)
+        return [self._decision(limit, result) for (_, limit, _), result in zip(charges, results)]
+
+    def allow(
+        self,
+        key: str,
+        limit: int,
+        window_seconds: int,
+        now_fn: Callable[[], float] = monotonic,
+        cost: float = 1,
+    ) -> bool:
+        # Redis keeps its own clock; now_fn only exists for interface parity with the local limiter.
+        return self.check(key, limit, window_seconds, cost=cost).allowed
 
-        if len(bucket) >= limit:
-            return False
+    def stats(self) -> dict:
+        return {**self._fallback.stats(), 'backend': 'redis', 'degraded': self._degraded}
 
-        bucket.append(now)
-        return True
+    async def aclose(self) -> None:
+        self._client.close()
+        await self._async_client.aclose()
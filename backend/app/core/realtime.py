@@ -1,7 +1,489 @@
+from __future__ import annotations
+
 import asyncio
+import hashlib
+import logging
+import random
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.bounded import LruTtlMap
+from app.core.serialization import dumps, dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+INGESTION_CHANNEL = 'litmus:ingestion'
+# Condensed view of every running experiment; dirtied by ingestion for any experiment.
+RUNNING_CHANNEL = 'running'
+FIREHOSE_CHANNEL_PREFIX = 'litmus:firehose:'
+# Set (with a TTL) by any replica currently tailing an experiment, so others skip publishing when nobody listens.
+FIREHOSE_ACTIVE_PREFIX = 'litmus:firehose-active:'
+FIREHOSE_ACTIVE_TTL_SECONDS = 30
+# Open tails re-set the key this often whether or not events are flowing, well inside the TTL.
+FIREHOSE_ACTIVE_REFRESH_SECONDS = 10.0
+# How long a worker trusts its last answer to "is anyone tailing this experiment?".
+TAIL_ACTIVITY_CACHE_SECONDS = 5.0
+# Reconnect delays of the Redis listener: doubled after each failed attempt, with jitter, up to the cap.
+LISTENER_RETRY_INITIAL_SECONDS = 0.5
+LISTENER_RETRY_MAX_SECONDS = 30.0
+# Fields that change on every computation without the underlying data changing.
+VOLATILE_FIELDS = frozenset({'last_updated_at'})
 
 
 async def heartbeat(seconds: int = 2):
     while True:
         await asyncio.sleep(seconds)
         yield
+
+
+def _escape_pointer(key: str) -> str:
+    return key.replace('~', '~0').replace('/', '~1')
+
+
+def json_patch(old: Any, new: Any, path: str = '') -> list[dict]:
+    """RFC 6902 operations turning ``old`` into ``new``; lists of unequal length are replaced whole."""
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: list[dict] = []
+        for key in old.keys() - new.keys():
+            ops.append({'op': 'remove', 'path': f'{path}/{_escape_pointer(str(key))}'})
+        for key, value in new.items():
+            child = f'{path}/{_escape_pointer(str(key))}'
+            if key not in old:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                ops.extend(json_patch(old[key], value, child))
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            ops.extend(json_patch(old_item, new_item, f'{path}/{index}'))
+        return ops
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def report_digest(document: dict) -> str:
+    stable = {key: value for key, value in document.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha256(dumps(stable, sort_keys=True)).hexdigest()
+
+
+@dataclass(frozen=True)
+class LiveFrame:
+    """One published version of a live report, serialized once and shared by every socket."""
+
+    channel: str
+    seq: int
+    digest: str
+    document: dict
+    snapshot: str
+    patch: str | None
+
+    def message_after(self, last_seq: int | None) -> str:
+        # Patches only apply on top of the immediately preceding version; anything else needs a snapshot.
+        if self.patch is not None and last_seq == self.seq - 1:
+            return self.patch
+        return self.snapshot
+
+
+def build_frame(channel: str, previous: LiveFrame | None, document: dict) -> LiveFrame | None:
+    """Returns the next frame, or ``None`` when nothing but volatile fields changed."""
+    digest = report_digest(document)
+    if previous is not None and previous.digest == digest:
+        return None
+    seq = previous.seq + 1 if previous is not None else 1
+    snapshot = dumps_str({'type': 'snapshot', 'channel': channel, 'seq': seq, 'data': document})
+    patch = None
+    if previous is not None:
+        patch = dumps_str(
+            {
+                'type': 'patch',
+                'channel': channel,
+                'seq': seq,
+                'base_seq': previous.seq,
+                'ops': json_patch(previous.document, document),
+            }
+        )
+    return LiveFrame(channel=channel, seq=seq, digest=digest, document=document, snapshot=snapshot, patch=patch)
+
+
+class LiveSubscription:
+    """Per-socket inbox holding only the newest unsent frame of each channel, so slow sockets never queue up."""
+
+    def __init__(self) -> None:
+        self._pending: dict[str, LiveFrame] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, frame: LiveFrame) -> None:
+        self._pending.pop(frame.channel, None)
+        self._pending[frame.channel] = frame
+        self._ready.set()
+
+    def discard(self, channel: str) -> None:
+        self._pending.pop(channel, None)
+        if not self._pending:
+            self._ready.clear()
+
+    def empty(self) -> bool:
+        return not self._pending
+
+    def get_nowait(self) -> LiveFrame:
+        if not self._pending:
+            raise asyncio.QueueEmpty
+        channel = next(iter(self._pending))
+        frame = self._pending.pop(channel)
+        if not self._pending:
+            self._ready.clear()
+        return frame
+
+    async def get(self) -> LiveFrame:
+        while not self._pending:
+            await self._ready.wait()
+        return self.get_nowait()
+
+
+class _LiveChannel:
+    def __init__(self) -> None:
+        self.subscribers: set[LiveSubscription] = set()
+        self.dirty = asyncio.Event()
+        self.latest: LiveFrame | None = None
+        self.task: asyncio.Task | None = None
+
+
+class ExperimentBroadcaster:
+    """Fans one computation per channel (an experiment id or ``RUNNING_CHANNEL``) out to every subscribed socket."""
+
+    def __init__(
+        self,
+        compute: Callable[[str], dict],
+        min_interval_seconds: float = 1.0,
+        refresh_seconds: float = 30.0,
+        max_workers: int = 4,
+        running_min_interval_seconds: float = 5.0,
+    ) -> None:
+        self._compute = compute
+        self._min_interval_seconds = min_interval_seconds
+        self._running_min_interval_seconds = running_min_interval_seconds
+        self._refresh_seconds = refresh_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='live-report')
+        self._channels: dict[str, _LiveChannel] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.computations = 0
+        self.skipped_unchanged = 0
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        tasks = [channel.task for channel in self._channels.values() if channel.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._channels.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def subscribe(self, channel_name: str, subscription: LiveSubscription | None = None) -> LiveSubscription:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        channel = self._channels.get(channel_name)
+        if channel is None:
+            channel = self._channels[channel_name] = _LiveChannel()
+            channel.dirty.set()
+            channel.task = asyncio.create_task(self._produce(channel_name, channel))
+        subscription = subscription or LiveSubscription()
+        channel.subscribers.add(subscription)
+        if channel.latest is not None:
+            subscription.offer(channel.latest)
+        return subscription
+
+    def unsubscribe(self, channel_name: str, subscription: LiveSubscription) -> None:
+        subscription.discard(channel_name)
+        channel = self._channels.get(channel_name)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscription)
+        if not channel.subscribers:
+            del self._channels[channel_name]
+            if channel.task is not None:
+                channel.task.cancel()
+
+    def latest(self, channel_name: str) -> LiveFrame | None:
+        channel = self._channels.get(channel_name)
+        return channel.latest if channel else None
+
+    def subscriber_count(self, channel_name: str) -> int:
+        channel = self._channels.get(channel_name)
+        return len(channel.subscribers) if channel else 0
+
+    def notify(self, experiment_ids: Iterable[str]) -> None:
+        # Safe to call from request worker threads; the dirty flag coalesces bursts into one recompute.
+        if self._loop is None or self._loop.is_closed():
+            return
+        ids = set(experiment_ids)
+        if ids and self._channels:
+            self._loop.call_soon_threadsafe(self._mark_dirty, ids)
+
+    def _next_frame(self, channel_name: str, previous: LiveFrame | None) -> LiveFrame | None:
+        # Hashing, diffing and serialization stay on the worker thread alongside the report query.
+        return build_frame(channel_name, previous, self._compute(channel_name))
+
+    def _mark_dirty(self, experiment_ids: set[str]) -> None:
+        for channel_name in experiment_ids:
+            channel = self._channels.get(channel_name)
+            if channel is not None:
+                channel.dirty.set()
+        # Every ingestion touches the running view, so it is only dirtied while somebody watches it, and
+        # _produce recomputes it at most once per running_min_interval_seconds.
+        running = self._channels.get(RUNNING_CHANNEL)
+        if running is not None and running.subscribers:
+            running.dirty.set()
+
+    async def _produce(self, channel_name: str, channel: _LiveChannel) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(channel.dirty.wait(), timeout=self._refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            channel.dirty.clear()
+            try:
+                frame = await loop.run_in_executor(self._executor, self._next_frame, channel_name, channel.latest)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Live computation failed for channel %s', channel_name)
+            else:
+                self.computations += 1
+                if frame is None:
+                    self.skipped_unchanged += 1
+                else:
+                    channel.latest = frame
+                    for subscription in list(channel.subscribers):
+                        subscription.offer(frame)
+            if channel_name == RUNNING_CHANNEL:
+                await asyncio.sleep(self._running_min_interval_seconds)
+            else:
+                await asyncio.sleep(self._min_interval_seconds)
+
+
+@dataclass(frozen=True)
+class TailFilter:
+    variant: str | None = None
+    event_type: str | None = None
+    metric_name: str | None = None
+    sample_rate: float = 1.0
+
+    def matches(self, record: dict) -> bool:
+        if self.variant is not None and self.variant not in (record.get('variant_key'), record.get('variant_id')):
+            return False
+        if self.event_type is not None and record.get('event_type') != self.event_type:
+            return False
+        if self.metric_name is not None and record.get('metric_name') != self.metric_name:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+
+class TailSubscription:
+    def __init__(self, experiment_id: str, filters: TailFilter, max_queue_size: int) -> None:
+        self.experiment_id = experiment_id
+        self.filters = filters
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, record: dict) -> None:
+        # Never wait on a slow reader: ingestion must not block on a debugging client.
+        if not self.filters.matches(record):
+            return
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+        else:
+            self.delivered += 1
+
+
+class EventFirehose:
+    """In-process fan-out of freshly ingested events to per-experiment tail subscribers."""
+
+    def __init__(self, max_queue_size: int = 1000) -> None:
+        self._max_queue_size = max_queue_size
+        self._subscribers: dict[str, set[TailSubscription]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    def subscribe(self, experiment_id: str, filters: TailFilter | None = None) -> TailSubscription:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = TailSubscription(experiment_id, filters or TailFilter(), self._max_queue_size)
+        self._subscribers.setdefault(experiment_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: TailSubscription) -> None:
+        subscribers = self._subscribers.get(subscription.experiment_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.experiment_id]
+
+    def has_subscribers(self, experiment_id: str) -> bool:
+        return experiment_id in self._subscribers
+
+    def publish(self, records: list[dict]) -> None:
+        # Called from request worker threads; delivery itself happens on the event loop.
+        if not records or self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, records)
+
+    def _dispatch(self, records: list[dict]) -> None:
+        for record in records:
+            for subscription in list(self._subscribers.get(record.get('experiment_id'), ())):
+                subscription.offer(record)
+
+
+class IngestionNotifier:
+    """Signals "experiment data changed" locally and, when Redis is configured, to every API replica."""
+
+    def __init__(
+        self,
+        broadcaster: ExperimentBroadcaster,
+        redis_url: str = '',
+        firehose: EventFirehose | None = None,
+    ) -> None:
+        self._broadcaster = broadcaster
+        self._firehose = firehose
+        self._redis_url = redis_url
+        self._publisher = None
+        self._tail_activity: LruTtlMap[str, bool] = LruTtlMap(
+            10_000, ttl_seconds=TAIL_ACTIVITY_CACHE_SECONDS, touch_on_read=False
+        )
+        self._listener_connected = False
+        self._listener_reconnects = 0
+        self._listener_failures = 0
+        self._listener_last_error: str | None = None
+        if redis_url:
+            import redis
+
+            self._publisher = redis.Redis.from_url(redis_url)
+
+    def publish(self, experiment_ids: Iterable[str]) -> None:
+        ids = sorted(set(experiment_ids))
+        if not ids:
+            return
+        if self._publisher is None:
+            self._broadcaster.notify(ids)
+            return
+        try:
+            self._publisher.publish(INGESTION_CHANNEL, ','.join(ids))
+        except Exception:
+            logger.warning('Redis publish failed, notifying local subscribers only', exc_info=True)
+            self._broadcaster.notify(ids)
+
+    def is_tailed(self, experiment_id: str) -> bool:
+        """Cheap check callers use to skip building firehose records nobody will read."""
+        if self._firehose is None:
+            return False
+        if self._publisher is None:
+            return self._firehose.has_subscribers(experiment_id)
+        cached = self._tail_activity.get(experiment_id)
+        if cached is not None:
+            return cached
+        try:
+            active = bool(self._publisher.exists(f'{FIREHOSE_ACTIVE_PREFIX}{experiment_id}'))
+        except Exception:
+            active = self._firehose.has_subscribers(experiment_id)
+        self._tail_activity.set(experiment_id, active)
+        return active
+
+    def publish_events(self, records: list[dict]) -> None:
+        if self._firehose is None or not records:
+            return
+        if self._publisher is None:
+            self._firehose.publish(records)
+            return
+        by_experiment: dict[str, list[dict]] = {}
+        for record in records:
+            by_experiment.setdefault(record['experiment_id'], []).append(record)
+        for experiment_id, batch in by_experiment.items():
+            try:
+                self._publisher.publish(f'{FIREHOSE_CHANNEL_PREFIX}{experiment_id}', dumps(batch))
+            except Exception:
+                logger.warning('Redis firehose publish failed, delivering locally only', exc_info=True)
+                self._firehose.publish(batch)
+
+    def mark_tailed(self, experiment_id: str) -> None:
+        # Refreshed periodically by open tails; expiry cleans up after replicas that die mid-stream.
+        if self._publisher is None:
+            return
+        try:
+            self._publisher.set(f'{FIREHOSE_ACTIVE_PREFIX}{experiment_id}', '1', ex=FIREHOSE_ACTIVE_TTL_SECONDS)
+        except Exception:
+            logger.warning('Redis tail registration failed', exc_info=True)
+
+    def listener_status(self) -> dict:
+        """Health of the cross-replica listener for /metrics; ``connected`` is false while it retries."""
+        return {
+            'enabled': bool(self._redis_url),
+            'connected': self._listener_connected,
+            'reconnects': self._listener_reconnects,
+            'consecutive_failures': self._listener_failures,
+            'last_error': self._listener_last_error,
+        }
+
+    async def listen(self) -> None:
+        # Runs for the life of the process: a dropped connection or failed subscribe is retried with
+        # backoff instead of silently ending cross-replica invalidation and the firehose.
+        if not self._redis_url:
+            return
+        import redis.asyncio as aioredis
+
+        while True:
+            try:
+                await self._listen_once(aioredis)
+                self._listener_last_error = 'connection closed'
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._listener_last_error = f'{type(exc).__name__}: {exc}'
+            # _listen_once resets the failure count once subscribed, so a healthy spell restarts the backoff.
+            backoff = LISTENER_RETRY_INITIAL_SECONDS * 2 ** min(self._listener_failures, 16)
+            delay = min(backoff, LISTENER_RETRY_MAX_SECONDS) * random.uniform(0.5, 1.0)
+            self._listener_failures += 1
+            logger.warning(
+                'Redis ingestion listener stopped (%s), reconnecting in %.1fs', self._listener_last_error, delay
+            )
+            await asyncio.sleep(delay)
+            self._listener_reconnects += 1
+
+    async def _listen_once(self, aioredis) -> None:
+        client = aioredis.Redis.from_url(self._redis_url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(INGESTION_CHANNEL)
+            if self._firehose is not None:
+                await pubsub.psubscribe(f'{FIREHOSE_CHANNEL_PREFIX}*')
+            self._listener_connected = True
+            self._listener_failures = 0
+            async for message in pubsub.listen():
+                if message.get('type') not in ('message', 'pmessage'):
+                    continue
+                data = message['data']
+                if isinstance(data, bytes):
+                    data = data.decode('utf-8')
+                if message['type'] == 'pmessage':
+                    self._firehose.publish(loads(data))
+                else:
+                    self._broadcaster.notify(data.split(','))
+        finally:
+            self._listener_connected = False
+            await pubsub.aclose()
+            await client.aclose()
+
+    def close(self) -> None:
+        if self._publisher is not None:
+            self._publisher.close()
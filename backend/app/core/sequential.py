@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+class MsprtArrays(NamedTuple):
+    p_value: np.ndarray
+    half_width: np.ndarray
+
+
+@dataclass
+class SequentialState:
+    control_exposures: int = 0
+    control_conversions: int = 0
+    treatment_exposures: int = 0
+    treatment_conversions: int = 0
+    always_valid_p_value: float = 1.0
+    cs_lower: float = -1.0
+    cs_upper: float = 1.0
+
+
+def msprt_statistics(
+    uplift: ArrayLike,
+    variance: ArrayLike,
+    mixture_variance: ArrayLike,
+    alpha: ArrayLike,
+) -> MsprtArrays:
+    # Normal-mixture mSPRT: the likelihood ratio against H0 integrates over a N(0, tau^2) effect prior.
+    delta, v, tau2, alpha_arr = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (uplift, variance, mixture_variance, alpha))
+    )
+    v = np.maximum(v, 1e-12)
+    tau2 = np.maximum(tau2, 1e-12)
+    log_likelihood_ratio = 0.5 * np.log(v / (v + tau2)) + (tau2 * delta**2) / (2 * v * (v + tau2))
+    p_value = np.exp(-np.maximum(log_likelihood_ratio, 0.0))
+    half_width = np.sqrt((v * (v + tau2) / tau2) * (2 * np.log(1 / alpha_arr) + np.log((v + tau2) / v)))
+    return MsprtArrays(p_value=p_value, half_width=half_width)
+
+
+def update_sequential_state(
+    state: SequentialState,
+    control_conversions: int,
+    control_exposures: int,
+    treatment_conversions: int,
+    treatment_exposures: int,
+    alpha: float,
+    mixture_variance: float,
+) -> SequentialState:
+    # O(1) per refresh: only the latest cumulative counts are needed, history lives in the running min/intersection.
+    if control_exposures < state.control_exposures or treatment_exposures < state.treatment_exposures:
+        state = SequentialState()
+    observed = (control_exposures, control_conversions, treatment_exposures, treatment_conversions)
+    if observed == (
+        state.control_exposures,
+        state.control_conversions,
+        state.treatment_exposures,
+        state.treatment_conversions,
+    ):
+        return state
+
+    updated = SequentialState(
+        control_exposures=control_exposures,
+        control_conversions=control_conversions,
+        treatment_exposures=treatment_exposures,
+        treatment_conversions=treatment_conversions,
+        always_valid_p_value=state.always_valid_p_value,
+        cs_lower=state.cs_lower,
+        cs_upper=state.cs_upper,
+    )
+    if control_exposures == 0 or treatment_exposures == 0:
+        return updated
+
+    p_control = control_conversions / control_exposures
+    p_treatment = treatment_conversions / treatment_exposures
+    uplift = p_treatment - p_control
+    variance = (p_control * (1 - p_control) / control_exposures) + (p_treatment * (1 - p_treatment) / treatment_exposures)
+    stats = msprt_statistics(uplift, variance, mixture_variance, alpha)
+    half_width = float(stats.half_width)
+
+    updated.always_valid_p_value = min(state.always_valid_p_value, float(stats.p_value))
+    # Intersecting every interval seen so far keeps the sequence valid and monotonically narrowing.
+    lower = max(state.cs_lower, uplift - half_width)
+    upper = min(state.cs_upper, uplift + half_width)
+    if lower > upper:
+        lower = upper = uplift
+    updated.cs_lower = lower
+    updated.cs_upper = upper
+    return updated
+
+
+def default_mixture_variance(mde: float) -> float:
+    # Centre the effect prior on the minimum detectable effect the experiment was powered for.
+    return max(mde, 1e-4) ** 2
@@ -0,0 +1,53 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# Dict keys are not always strings in computed payloads (variant ids as ints in tests, enum keys), and the
+# statistics code hands back numpy scalars and arrays.
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any):
+    # orjson covers datetimes, enums, dataclasses and numpy natively; these are the stragglers.
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json')
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(value: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes. NaN and infinities become ``null`` instead of invalid JSON."""
+    option = _OPTIONS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(value, default=_default, option=option)
+
+
+def dumps_str(value: Any, **kwargs) -> str:
+    return dumps(value, **kwargs).decode('utf-8')
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Plain JSON types (str/int/float/bool/None/list/dict) for a computed document.
+
+    A round trip through orjson; much cheaper than ``jsonable_encoder`` for large reports.
+    """
+    return orjson.loads(dumps(value))
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: the same JSON as ``JSONResponse``, rendered by orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,6 +1,9 @@
-import math
 from typing import NamedTuple
 
+import numpy as np
+from numpy.typing import ArrayLike
+from scipy.stats import norm
+
 
 class ZTestResult(NamedTuple):
     z_score: float
@@ -12,23 +15,69 @@ class Interval(NamedTuple):
     upper: float
 
 
-def calculate_sample_size(baseline_rate: float, mde: float, alpha: float, power: float) -> int:
-    # Two-proportion approximation for balanced groups.
-    p1 = baseline_rate
-    p2 = min(baseline_rate + mde, 0.999)
+class ZTestArrays(NamedTuple):
+    z_score: np.ndarray
+    p_value: np.ndarray
+
+
+class IntervalArrays(NamedTuple):
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+def two_sided_critical_value(alpha: ArrayLike) -> np.ndarray:
+    return norm.isf(np.asarray(alpha, dtype=float) / 2)
+
+
+def _as_float_arrays(*values: ArrayLike) -> list[np.ndarray]:
+    return np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in values))
+
+
+def calculate_sample_size_array(
+    baseline_rate: ArrayLike,
+    mde: ArrayLike,
+    alpha: ArrayLike,
+    power: ArrayLike,
+) -> np.ndarray:
+    # Two-proportion approximation for balanced groups, returned as total units across both groups.
+    p1, mde_arr, alpha_arr, power_arr = _as_float_arrays(baseline_rate, mde, alpha, power)
+    p2 = np.minimum(p1 + mde_arr, 0.999)
     p_bar = (p1 + p2) / 2
 
-    z_alpha = 1.96 if alpha <= 0.05 else 1.64
-    z_beta = 0.84 if power >= 0.8 else 0.52
+    z_alpha = two_sided_critical_value(alpha_arr)
+    z_beta = norm.ppf(power_arr)
 
-    numerator = (z_alpha * math.sqrt(2 * p_bar * (1 - p_bar)) + z_beta * math.sqrt(p1 * (1 - p1) + p2 * (1 - p2))) ** 2
-    denominator = max((p2 - p1) ** 2, 1e-12)
-    per_group = max(1, math.ceil(numerator / denominator))
-    return per_group * 2
+    numerator = (z_alpha * np.sqrt(2 * p_bar * (1 - p_bar)) + z_beta * np.sqrt(p1 * (1 - p1) + p2 * (1 - p2))) ** 2
+    denominator = np.maximum((p2 - p1) ** 2, 1e-12)
+    per_group = np.maximum(1, np.ceil(numerator / denominator))
+    return per_group.astype(np.int64) * 2
 
 
-def _normal_cdf(value: float) -> float:
-    return 0.5 * (1 + math.erf(value / math.sqrt(2)))
+def calculate_sample_size(baseline_rate: float, mde: float, alpha: float, power: float) -> int:
+    return int(calculate_sample_size_array(baseline_rate, mde, alpha, power))
+
+
+def two_proportion_z_test_array(
+    control_conversions: ArrayLike,
+    control_exposures: ArrayLike,
+    treatment_conversions: ArrayLike,
+    treatment_exposures: ArrayLike,
+) -> ZTestArrays:
+    # Inputs broadcast against each other, so a (metrics, arms) grid is evaluated in one call.
+    c_conv, c_exp, t_conv, t_exp = _as_float_arrays(
+        control_conversions, control_exposures, treatment_conversions, treatment_exposures
+    )
+    valid = (c_exp > 0) & (t_exp > 0)
+    safe_c_exp = np.where(valid, c_exp, 1.0)
+    safe_t_exp = np.where(valid, t_exp, 1.0)
+
+    p_control = c_conv / safe_c_exp
+    p_treatment = t_conv / safe_t_exp
+    pooled = (c_conv + t_conv) / (safe_c_exp + safe_t_exp)
+    std_error = np.sqrt(np.maximum(pooled * (1 - pooled) * ((1 / safe_c_exp) + (1 / safe_t_exp)), 1e-12))
+    z_score = np.where(valid, (p_treatment - p_control) / std_error, 0.0)
+    p_value = np.where(valid, np.clip(2 * norm.sf(np.abs(z_score)), 0.0, 1.0), 1.0)
+    return ZTestArrays(z_score=z_score, p_value=p_value)
 
 
 def two_proportion_z_test(
@@ -37,16 +86,41 @@ def two_proportion_z_test(
     treatment_conversions: int,
     treatment_exposures: int,
 ) -> ZTestResult:
-    if control_exposures == 0 or treatment_exposures == 0:
-        return ZTestResult(z_score=0.0, p_value=1.0)
+    result = two_proportion_z_test_array(
+        control_conversions, control_exposures, treatment_conversions, treatment_exposures
+    )
+    return ZTestResult(z_score=float(result.z_score), p_value=float(result.p_value))
+
+
+def uplift_confidence_interval_array(
+    control_conversions: ArrayLike,
+    control_exposures: ArrayLike,
+    treatment_conversions: ArrayLike,
+    treatment_exposures: ArrayLike,
+    confidence_level: ArrayLike = 0.95,
+) -> IntervalArrays:
+    c_conv, c_exp, t_conv, t_exp, level = _as_float_arrays(
+        control_conversions, control_exposures, treatment_conversions, treatment_exposures, confidence_level
+    )
+    valid = (c_exp > 0) & (t_exp > 0)
+    safe_c_exp = np.where(valid, c_exp, 1.0)
+    safe_t_exp = np.where(valid, t_exp, 1.0)
+
+    p_control = c_conv / safe_c_exp
+    p_treatment = t_conv / safe_t_exp
+    uplift = p_treatment - p_control
 
-    p_control = control_conversions / control_exposures
-    p_treatment = treatment_conversions / treatment_exposures
-    pooled = (control_conversions + treatment_conversions) / (control_exposures + treatment_exposures)
-    std_error = math.sqrt(max(pooled * (1 - pooled) * ((1 / control_exposures) + (1 / treatment_exposures)), 1e-12))
-    z_score = (p_treatment - p_control) / std_error
-    p_value = max(0.0, min(1.0, 2 * (1 - _normal_cdf(abs(z_score)))))
-    return ZTestResult(z_score=z_score, p_value=p_value)
+    # Normal approximation interval for difference in proportions.
+    se = np.sqrt(
+        np.maximum(
+            (p_control * (1 - p_control) / safe_c_exp) + (p_treatment * (1 - p_treatment) / safe_t_exp),
+            1e-12,
+        )
+    )
+    margin = two_sided_critical_value(1 - level) * se
+    lower = np.where(valid, uplift - margin, 0.0)
+    upper = np.where(valid, uplift + margin, 0.0)
+    return IntervalArrays(lower=lower, upper=upper)
 
 
 def uplift_confidence_interval(
@@ -56,24 +130,10 @@ def uplift_confidence_interval(
     treatment_exposures: int,
     confidence_level: float = 0.95,
 ) -> Interval:
-    if control_exposures == 0 or treatment_exposures == 0:
-        return Interval(lower=0.0, upper=0.0)
-
-    p_control = control_conversions / control_exposures
-    p_treatment = treatment_conversions / treatment_exposures
-    uplift = p_treatment - p_control
-
-    # Normal approximation interval for difference in proportions.
-    se = math.sqrt(
-        max(
-            (p_control * (1 - p_control) / control_exposures)
-            + (p_treatment * (1 - p_treatment) / treatment_exposures),
-            1e-12,
-        )
+    result = uplift_confidence_interval_array(
+        control_conversions, control_exposures, treatment_conversions, treatment_exposures, confidence_level
     )
-    z = 1.96 if confidence_level >= 0.95 else 1.64
-    margin = z * se
-    return Interval(lower=uplift - margin, upper=uplift + margin)
+    return Interval(lower=float(result.lower), upper=float(result.upper))
 
 
 def confidence_from_p_value(p_value: float) -> float:
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger('litmus.db')
+
+# A caught-up standby has replayed everything it received; otherwise lag is the age of the last
+# replayed transaction. Both functions return NULL on a primary.
+_POSTGRES_LAG_SQL = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def measure_replica_lag(connection: Connection) -> float:
+    if connection.dialect.name != 'postgresql':
+        return 0.0
+    lag = connection.execute(_POSTGRES_LAG_SQL).scalar()
+    return float(lag or 0.0)
+
+
+class ReplicaRouter:
+    """Routes read-only analytics sessions to the replica while its lag stays within tolerance.
+
+    Lag is probed off the request path (see ``monitor``); requests only read the cached verdict.
+    When the replica is missing, unreachable, too far behind or has not been probed recently,
+    reads fall back to the primary.
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replica: sessionmaker | None = None,
+        replica_engine: Engine | None = None,
+        max_lag_seconds: float = 5.0,
+        check_interval_seconds: float = 1.0,
+    ) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.replica_engine = replica_engine
+        self.async_primary: async_sessionmaker | None = None
+        self.async_replica: async_sessionmaker | None = None
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.lag_seconds: float | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+
+    def probe(self) -> float | None:
+        if self.replica_engine is None:
+            return None
+        try:
+            with self.replica_engine.connect() as connection:
+                lag = measure_replica_lag(connection)
+        except SQLAlchemyError:
+            logger.warning('replica lag probe failed; routing analytics reads to the primary', exc_info=True)
+            lag = None
+        with self._lock:
+            self.lag_seconds = lag
+            self._checked_at = time.monotonic()
+        return lag
+
+    def replica_usable(self) -> bool:
+        if self.replica is None:
+            return False
+        with self._lock:
+            lag, checked_at = self.lag_seconds, self._checked_at
+        # A verdict older than a few probe intervals means the monitor stalled; do not trust it.
+        fresh = time.monotonic() - checked_at <= max(3 * self.check_interval_seconds, 1.0)
+        return lag is not None and fresh and lag <= self.max_lag_seconds
+
+    def _route(self, replica, primary):
+        if replica is not None and self.replica_usable():
+            self.replica_reads += 1
+            return replica
+        if self.replica is not None:
+            self.primary_fallbacks += 1
+        return primary
+
+    def read_session_maker(self) -> sessionmaker:
+        return self._route(self.replica, self.primary)
+
+    def async_read_session_maker(self) -> async_sessionmaker:
+        return self._route(self.async_replica, self.async_primary)
+
+    def read_session(self) -> Session:
+        return self.read_session_maker()()
+
+    async def monitor(self) -> None:
+        if self.replica_engine is None:
+            return
+        while True:
+            await asyncio.to_thread(self.probe)
+            await asyncio.sleep(self.check_interval_seconds)
+
+    def status(self) -> dict:
+        return {
+            'replica_configured': self.replica is not None,
+            'replica_in_use': self.replica_usable(),
+            'lag_seconds': self.lag_seconds,
+            'max_lag_seconds': self.max_lag_seconds,
+            'replica_reads': self.replica_reads,
+            'primary_fallbacks': self.primary_fallbacks,
+        }
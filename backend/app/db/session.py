@@ -1,8 +1,162 @@
-from sqlalchemy import create_engine
+import threading
+import time
+import uuid
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+# Async drivers for the sync URLs configured in DATABASE_URL.
+_ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+class _WaitTimingMixin:
+    """Records how long checkouts wait on an exhausted pool, so spikes show up on /metrics before timeouts do."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_stats = {'checkouts': 0, 'waited': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0, 'timeouts': 0}
+
+    def _do_get(self):
+        # Only checkouts that find the pool full and cannot overflow actually block.
+        blocking = self.checkedin() == 0 and 0 <= self._max_overflow <= self.overflow()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.wait_stats['timeouts'] += 1
+            raise
+        finally:
+            waited_ms = (time.perf_counter() - started) * 1000
+            with self._stats_lock:
+                self.wait_stats['checkouts'] += 1
+                if blocking:
+                    self.wait_stats['waited'] += 1
+                    self.wait_stats['wait_ms_total'] += waited_ms
+                    self.wait_stats['wait_ms_max'] = max(self.wait_stats['wait_ms_max'], waited_ms)
+
+
+class MonitoredQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class MonitoredAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_memory_sqlite(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def _pool_options(database_url: str, pool_class) -> dict:
+    if _is_memory_sqlite(database_url):
+        # In-memory SQLite lives in a single connection; keep SQLAlchemy's singleton pool.
+        return {}
+    return {
+        'poolclass': pool_class,
+        'pool_size': settings.db_pool_size,
+        'max_overflow': settings.db_max_overflow,
+        'pool_timeout': settings.db_pool_timeout_seconds,
+        'pool_recycle': settings.db_pool_recycle_seconds,
+        'pool_pre_ping': settings.db_pool_pre_ping,
+    }
+
+
+def _apply_statement_timeout(engine: Engine) -> None:
+    # Behind PgBouncer in transaction mode startup parameters and session SETs do not stick to a
+    # server connection, so the timeout is set per transaction instead.
+    timeout_ms = int(settings.db_statement_timeout_ms)
+
+    @event.listens_for(engine, 'begin')
+    def _set_local_timeout(connection) -> None:
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout_ms}')
+
+
+def build_sessionmaker(database_url: str, read_only: bool = False):
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    connect_args = {'check_same_thread': False} if backend == 'sqlite' else {}
+    use_statement_timeout = backend == 'postgresql' and settings.db_statement_timeout_ms > 0
+    if use_statement_timeout and not settings.db_pgbouncer_mode:
+        connect_args['options'] = f'-c statement_timeout={int(settings.db_statement_timeout_ms)}'
+    engine = create_engine(
+        database_url,
+        future=True,
+        echo=False,
+        connect_args=connect_args,
+        **_pool_options(database_url, MonitoredQueuePool),
+    )
+    if use_statement_timeout and settings.db_pgbouncer_mode:
+        _apply_statement_timeout(engine)
+    # Read-only sessions point at a replica; services skip opportunistic writes on them.
+    session_maker = sessionmaker(
+        bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, info={'read_only': read_only}
+    )
+    return session_maker, engine
+
+
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for database backend: {backend}')
+    return url.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def build_async_sessionmaker(database_url: str, read_only: bool = False) -> tuple[async_sessionmaker, AsyncEngine]:
+    backend = make_url(database_url).get_backend_name()
+    connect_args = {}
+    if backend == 'postgresql':
+        if settings.db_pgbouncer_mode:
+            # PgBouncer hands each transaction a different server connection, so server-side prepared
+            # statements cannot be cached or reused by name.
+            connect_args.update(
+                {
+                    'statement_cache_size': 0,
+                    'prepared_statement_cache_size': 0,
+                    'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+                }
+            )
+        elif settings.db_statement_timeout_ms > 0:
+            connect_args['server_settings'] = {'statement_timeout': str(int(settings.db_statement_timeout_ms))}
+    engine = create_async_engine(
+        to_async_url(database_url),
+        echo=False,
+        connect_args=connect_args,
+        **_pool_options(database_url, MonitoredAsyncQueuePool),
+    )
+    if backend == 'postgresql' and settings.db_pgbouncer_mode and settings.db_statement_timeout_ms > 0:
+        _apply_statement_timeout(engine.sync_engine)
+    session_maker = async_sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False, info={'read_only': read_only}
+    )
+    return session_maker, engine
 
 
-def build_sessionmaker(database_url: str):
-    connect_args = {'check_same_thread': False} if database_url.startswith('sqlite') else {}
-    engine = create_engine(database_url, future=True, echo=False, connect_args=connect_args)
-    return sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False), engine
+def pool_status(engine: Engine | AsyncEngine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {'pool_class': type(pool).__name__}
+    stats = dict(getattr(pool, 'wait_stats', {}))
+    waited = stats.get('waited', 0)
+    return {
+        'pool_class': type(pool).__name__,
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(0, pool.overflow()),
+        'max_overflow': pool._max_overflow,
+        'checkouts': stats.get('checkouts', 0),
+        'waited_checkouts': waited,
+        'wait_ms_avg': round(stats.get('wait_ms_total', 0.0) / waited, 2) if waited else 0.0,
+        'wait_ms_max': round(stats.get('wait_ms_max', 0.0), 2),
+        'timeouts': stats.get('timeouts', 0),
+    }
@@ -12,6 +12,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
                 'request_id': getattr(request.state, 'request_id', None),
             }
         },
+        headers=getattr(exc, 'headers', None),
     )
 
 
@@ -1,19 +1,30 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from functools import partial
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy import text
 
-from app.api.v1.router import api_router
+from app.api.v1.router import build_api_router
 from app.config import settings
-from app.core.observability import InMemoryRequestMetrics
-from app.core.rate_limit import InMemoryRateLimiter
+from app.core.observability import (
+    InMemoryRequestMetrics,
+    counter_lines,
+    gauge_lines,
+    instrument_engine,
+    process_resident_memory_bytes,
+)
+from app.core.rate_limit import InMemoryRateLimiter, RedisRateLimiter
+from app.core.realtime import EventFirehose, ExperimentBroadcaster, IngestionNotifier
+from app.core.serialization import FastJSONResponse
 from app.db.init_db import init_db
-from app.db.session import build_sessionmaker
+from app.db.routing import ReplicaRouter
+from app.db.session import build_async_sessionmaker, build_sessionmaker, pool_status
 from app.errors import http_exception_handler, unhandled_exception_handler
-from app.middleware import rate_limit_middleware, request_context_middleware
+from app.middleware import GzipRequestMiddleware, rate_limit_middleware, request_context_middleware
 from app.models import Base  # noqa: F401
 from app.models.assignment import Assignment  # noqa: F401
 from app.models.decision_audit import DecisionAudit  # noqa: F401
@@ -21,7 +32,10 @@ from app.models.event import Event  # noqa: F401
 from app.models.experiment import Experiment  # noqa: F401
 from app.models.metric import Metric  # noqa: F401
 from app.models.report_snapshot import ReportSnapshot  # noqa: F401
+from app.models.rollup import UnitRollup, VariantRollup  # noqa: F401
+from app.models.sequential_state import SequentialTestState  # noqa: F401
 from app.models.variant import Variant  # noqa: F401
+from app.services.realtime_service import RealtimeService
 
 
 def create_app(database_url: str | None = None) -> FastAPI:
@@ -32,17 +46,77 @@ def create_app(database_url: str | None = None) -> FastAPI:
         session_maker, engine = build_sessionmaker(database_url or settings.database_url)
         app.state.session_maker = session_maker
         app.state.engine = engine
-        app.state.request_metrics = InMemoryRequestMetrics()
-        app.state.rate_limiter = InMemoryRateLimiter()
-        app.state.rate_limit_per_minute = settings.rate_limit_per_minute
+        app.state.read_engine = None
+        read_session_maker = None
+        if settings.read_database_url:
+            read_session_maker, app.state.read_engine = build_sessionmaker(settings.read_database_url, read_only=True)
+        db_router = ReplicaRouter(
+            session_maker,
+            read_session_maker,
+            app.state.read_engine,
+            max_lag_seconds=settings.read_replica_max_lag_seconds,
+            check_interval_seconds=settings.read_replica_check_interval_seconds,
+        )
+        app.state.db_router = db_router
+        async_engines = {}
+        if settings.async_db_enabled:
+            async_session_maker, async_engine = build_async_sessionmaker(database_url or settings.database_url)
+            app.state.async_session_maker = async_session_maker
+            db_router.async_primary = async_session_maker
+            async_engines['async_primary'] = async_engine
+            if settings.read_database_url:
+                db_router.async_replica, async_engines['async_replica'] = build_async_sessionmaker(
+                    settings.read_database_url, read_only=True
+                )
+        app.state.async_engines = async_engines
+        for instrumented in (engine, app.state.read_engine, *async_engines.values()):
+            if instrumented is not None:
+                instrument_engine(getattr(instrumented, 'sync_engine', instrumented))
+        app.state.request_metrics = InMemoryRequestMetrics(
+            latency_buckets=[float(bound) for bound in settings.metrics_latency_buckets.split(',') if bound.strip()]
+        )
+        app.state.rate_limiter = InMemoryRateLimiter(max_keys=settings.rate_limit_max_keys)
+        if settings.rate_limit_backend == 'redis' and settings.redis_url:
+            app.state.rate_limiter = RedisRateLimiter(settings.redis_url, fallback=app.state.rate_limiter)
+        app.state.rate_limits = {
+            'assignment': settings.rate_limit_assignment_per_minute,
+            'admin': settings.rate_limit_per_minute,
+        }
+        app.state.live_broadcaster = ExperimentBroadcaster(
+            partial(RealtimeService.live_channel_document, db_router.read_session),
+            min_interval_seconds=settings.live_report_min_interval_seconds,
+            refresh_seconds=settings.live_report_refresh_seconds,
+            max_workers=settings.live_report_workers,
+            running_min_interval_seconds=settings.live_running_min_interval_seconds,
+        )
+        app.state.live_broadcaster.start()
+        app.state.event_firehose = EventFirehose(max_queue_size=settings.event_tail_queue_size)
+        app.state.event_firehose.start()
+        app.state.ingestion_notifier = IngestionNotifier(
+            app.state.live_broadcaster, settings.redis_url, firehose=app.state.event_firehose
+        )
+        listener = asyncio.create_task(app.state.ingestion_notifier.listen())
         init_db(engine)
         # Startup preflight: fail fast if database connectivity is unhealthy.
         with engine.connect() as connection:
             connection.execute(text('SELECT 1'))
+        db_router.probe()
+        replica_monitor = asyncio.create_task(db_router.monitor())
         yield
+        for task in (listener, replica_monitor):
+            task.cancel()
+        await asyncio.gather(listener, replica_monitor, return_exceptions=True)
+        await app.state.live_broadcaster.stop()
+        app.state.ingestion_notifier.close()
+        if isinstance(app.state.rate_limiter, RedisRateLimiter):
+            await app.state.rate_limiter.aclose()
+        for async_engine in async_engines.values():
+            await async_engine.dispose()
+        if app.state.read_engine is not None:
+            app.state.read_engine.dispose()
         engine.dispose()
 
-    application = FastAPI(title=settings.app_name, lifespan=lifespan)
+    application = FastAPI(title=settings.app_name, lifespan=lifespan, default_response_class=FastJSONResponse)
     origins = [origin.strip() for origin in settings.cors_allowed_origins.split(',') if origin.strip()]
     application.add_middleware(
         CORSMiddleware,
@@ -51,11 +125,13 @@ def create_app(database_url: str | None = None) -> FastAPI:
         allow_methods=['*'],
         allow_headers=['*'],
     )
+    # Innermost, so inflated bodies still pass through request metrics and rate limiting.
+    application.add_middleware(GzipRequestMiddleware, max_body_bytes=settings.max_decompressed_body_bytes)
     application.middleware('http')(request_context_middleware)
     application.middleware('http')(rate_limit_middleware)
     application.add_exception_handler(HTTPException, http_exception_handler)
     application.add_exception_handler(Exception, unhandled_exception_handler)
-    application.include_router(api_router, prefix=settings.api_v1_prefix)
+    application.include_router(build_api_router(async_db=settings.async_db_enabled), prefix=settings.api_v1_prefix)
     return application
 
 
@@ -86,6 +162,79 @@ def readiness():
     return JSONResponse(status_code=503, content=payload)
 
 
+def _database_pools() -> dict[str, dict]:
+    engines = {'primary': getattr(app.state, 'engine', None), 'replica': getattr(app.state, 'read_engine', None)}
+    engines.update(getattr(app.state, 'async_engines', {}))
+    return {name: pool_status(engine) for name, engine in engines.items() if engine is not None}
+
+
 @app.get('/metrics')
 def metrics():
-    return app.state.request_metrics.snapshot()
+    payload = app.state.request_metrics.snapshot()
+    payload['database_pools'] = _database_pools()
+    if hasattr(app.state, 'db_router'):
+        payload['replica_routing'] = app.state.db_router.status()
+    payload['memory'] = _memory_usage()
+    notifier = getattr(app.state, 'ingestion_notifier', None)
+    payload['ingestion_listener'] = notifier.listener_status() if notifier is not None else None
+    return payload
+
+
+def _memory_usage() -> dict:
+    limiter = getattr(app.state, 'rate_limiter', None)
+    return {
+        'resident_bytes': process_resident_memory_bytes(),
+        'rate_limiter': limiter.stats() if limiter is not None else None,
+    }
+
+
+_POOL_SERIES = (
+    ('checked_out', 'litmus_db_pool_checked_out', gauge_lines, 'Connections currently checked out of the pool.'),
+    ('overflow', 'litmus_db_pool_overflow', gauge_lines, 'Connections open beyond the configured pool size.'),
+    (
+        'waited_checkouts',
+        'litmus_db_pool_checkout_waits_total',
+        counter_lines,
+        'Checkouts that had to wait for a free connection.',
+    ),
+    ('timeouts', 'litmus_db_pool_checkout_timeouts_total', counter_lines, 'Checkouts that timed out waiting.'),
+)
+
+
+@app.get('/metrics/prometheus', response_class=PlainTextResponse)
+def prometheus_metrics():
+    lines = app.state.request_metrics.render_prometheus()
+    pools = _database_pools()
+    for field, name, render, help_text in _POOL_SERIES:
+        samples = {(('engine', engine),): status[field] for engine, status in pools.items() if field in status}
+        lines += render(name, help_text, samples)
+    memory = _memory_usage()
+    if memory['resident_bytes'] is not None:
+        lines += gauge_lines(
+            'process_resident_memory_bytes', 'Resident memory of the API process.', {(): memory['resident_bytes']}
+        )
+    if memory['rate_limiter'] is not None:
+        lines += gauge_lines(
+            'litmus_rate_limiter_keys',
+            'Client/route keys tracked by the rate limiter.',
+            {(): memory['rate_limiter']['entries']},
+        )
+        lines += counter_lines(
+            'litmus_rate_limiter_evictions_total',
+            'Rate limiter keys evicted to stay within RATE_LIMIT_MAX_KEYS.',
+            {(): memory['rate_limiter']['evictions']},
+        )
+    notifier = getattr(app.state, 'ingestion_notifier', None)
+    listener = notifier.listener_status() if notifier is not None else None
+    if listener is not None and listener['enabled']:
+        lines += gauge_lines(
+            'litmus_ingestion_listener_connected',
+            'Whether the Redis listener for cross-replica invalidation and the firehose is subscribed.',
+            {(): int(listener['connected'])},
+        )
+        lines += counter_lines(
+            'litmus_ingestion_listener_reconnects_total',
+            'Reconnect attempts of the Redis ingestion listener.',
+            {(): listener['reconnects']},
+        )
+    return PlainTextResponse('\n'.join(lines) + '\n', media_type='text/plain; version=0.0.4')
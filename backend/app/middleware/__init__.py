@@ -1,3 +1,4 @@
 from app.middleware.request_context import rate_limit_middleware, request_context_middleware
+from app.middleware.request_encoding import GzipRequestMiddleware
 
-__all__ = ['request_context_middleware', 'rate_limit_middleware']
+__all__ = ['request_context_middleware', 'rate_limit_middleware', 'GzipRequestMiddleware']
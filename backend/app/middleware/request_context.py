@@ -1,28 +1,97 @@
+import asyncio
 import json
 import logging
+import random
 import time
 import uuid
 
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from starlette.routing import Match
+
+from app.api.deps import rate_limit_identity
+from app.config import settings
+from app.core.observability import (
+    UNMATCHED_ROUTE,
+    RequestDbStats,
+    current_request_id,
+    stop_tracking_request_db,
+    track_request_db,
+)
+from app.core.profiling import slow_request_report
+from app.core.rate_limit import rate_limit_headers
 
 logger = logging.getLogger('litmus.request')
 
 
+def route_template(request: Request) -> str:
+    """The matched route's path template, e.g. /api/v1/experiments/{experiment_id}/report."""
+    template = request.scope.get('litmus.route_template')
+    if template is not None:
+        return template
+    template = UNMATCHED_ROUTE
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            template = route.path
+            break
+        if match == Match.PARTIAL and template == UNMATCHED_ROUTE:
+            template = route.path
+    request.scope['litmus.route_template'] = template
+    return template
+
+
+def _server_timing(elapsed_ms: float, db_stats: RequestDbStats) -> str:
+    return (
+        f'app;dur={elapsed_ms:.1f}, '
+        f'db;dur={db_stats.duration_seconds * 1000:.1f};desc="{db_stats.queries} queries"'
+    )
+
+
+def _log_slow_request(request_id: str, method: str, route: str, duration_ms: int, db_stats: RequestDbStats) -> None:
+    # Runs on the default executor after the response is sent: EXPLAIN round-trips never add latency.
+    logger.warning(
+        json.dumps(
+            {
+                'event': 'slow_request',
+                'request_id': request_id,
+                'route': route,
+                'method': method,
+                'duration_ms': duration_ms,
+                'db_queries': db_stats.queries,
+                'db_ms': round(db_stats.duration_seconds * 1000, 2),
+                'top_queries': slow_request_report(
+                    db_stats.profile, settings.slow_request_top_queries, settings.slow_request_explain
+                ),
+            }
+        )
+    )
+
+
 async def request_context_middleware(request: Request, call_next):
     request_id = str(uuid.uuid4())
     request.state.request_id = request_id
+    metrics = request.app.state.request_metrics
+    route = route_template(request)
+    profiled = settings.sql_profiling_enabled and random.random() < settings.sql_profiling_sample_rate
+    db_stats, db_token = track_request_db(profile=profiled)
+    request_id_token = current_request_id.set(request_id)
+    metrics.request_started(request.method, route)
 
     start = time.perf_counter()
     try:
         response = await call_next(request)
     except Exception:
-        duration_ms = int((time.perf_counter() - start) * 1000)
-        request.app.state.request_metrics.record(
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        duration_ms = int(elapsed_ms)
+        metrics.record(
             method=request.method,
             path=request.url.path,
             status_code=500,
-            duration_ms=duration_ms,
+            duration_ms=elapsed_ms,
+            route=route,
+            db_queries=db_stats.queries,
+            db_duration_ms=db_stats.duration_seconds * 1000,
         )
         logger.exception(
             json.dumps(
@@ -36,15 +105,29 @@ async def request_context_middleware(request: Request, call_next):
             )
         )
         raise
+    finally:
+        metrics.request_finished(request.method, route)
+        stop_tracking_request_db(db_token)
+        current_request_id.reset(request_id_token)
 
-    duration_ms = int((time.perf_counter() - start) * 1000)
-    request.app.state.request_metrics.record(
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    duration_ms = int(elapsed_ms)
+    metrics.record(
         method=request.method,
         path=request.url.path,
         status_code=response.status_code,
-        duration_ms=duration_ms,
+        duration_ms=elapsed_ms,
+        route=route,
+        db_queries=db_stats.queries,
+        db_duration_ms=db_stats.duration_seconds * 1000,
     )
     response.headers['X-Request-ID'] = request_id
+    if settings.server_timing_enabled:
+        response.headers['Server-Timing'] = _server_timing(elapsed_ms, db_stats)
+    if db_stats.profile is not None and elapsed_ms >= settings.slow_request_threshold_ms:
+        asyncio.get_running_loop().run_in_executor(
+            None, _log_slow_request, request_id, request.method, route, duration_ms, db_stats
+        )
     logger.info(
         json.dumps(
             {
@@ -60,24 +143,34 @@ async def request_context_middleware(request: Request, call_next):
     return response
 
 
-async def rate_limit_middleware(request: Request, call_next):
-    sensitive_prefixes = (
-        '/api/v1/events',
-        '/api/v1/assignments',
-        '/api/v1/metrics/guardrails',
-        '/api/v1/experiments/',
-    )
+# Route classes for POST limits. Ingestion is exempt from per-request counting: batches are charged
+# per item by the events routes instead, so one 500-event batch costs the same as 500 single events.
+ROUTE_CLASS_PREFIXES = (
+    ('/api/v1/assignments', 'assignment'),
+    ('/api/v1/events', 'ingestion'),
+    ('/api/v1/metrics/guardrails', 'admin'),
+    ('/api/v1/experiments/', 'admin'),
+)
 
-    is_sensitive_post = request.method == 'POST' and request.url.path.startswith(sensitive_prefixes)
-    if is_sensitive_post:
-        limiter = request.app.state.rate_limiter
-        client_host = request.headers.get('x-forwarded-for') or (request.client.host if request.client else 'unknown')
-        key = f'{client_host}:{request.url.path}'
-        if not limiter.allow(
-            key=key,
-            limit=request.app.state.rate_limit_per_minute,
-            window_seconds=60,
-        ):
+
+def rate_limit_class(request: Request) -> str | None:
+    if request.method != 'POST':
+        return None
+    path = request.url.path
+    for prefix, route_class in ROUTE_CLASS_PREFIXES:
+        if path.startswith(prefix):
+            return route_class
+    return None
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    route_class = rate_limit_class(request)
+    limit = request.app.state.rate_limits.get(route_class, 0) if route_class else 0
+    decision = None
+    if limit > 0:
+        key = f'{rate_limit_identity(request)}:{route_class}'
+        decision = await request.app.state.rate_limiter.acheck(key, limit, 60)
+        if not decision.allowed:
             return JSONResponse(
                 status_code=429,
                 content={
@@ -87,6 +180,12 @@ async def rate_limit_middleware(request: Request, call_next):
                         'request_id': getattr(request.state, 'request_id', None),
                     }
                 },
+                headers=rate_limit_headers(decision),
             )
+        request.state.rate_limit_decision = decision
 
-    return await call_next(request)
+    response = await call_next(request)
+    decision = getattr(request.state, 'rate_limit_decision', None)
+    if decision is not None:
+        response.headers.update(rate_limit_headers(decision))
+    return response
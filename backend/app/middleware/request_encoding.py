@@ -0,0 +1,72 @@
+import zlib
+
+from fastapi.responses import JSONResponse
+
+
+def _error(scope, status_code: int, error_type: str, message: str) -> JSONResponse:
+    state = scope.get('state') or {}
+    return JSONResponse(
+        status_code=status_code,
+        content={'error': {'type': error_type, 'message': message, 'request_id': state.get('request_id')}},
+    )
+
+
+class GzipRequestMiddleware:
+    """Inflates ``Content-Encoding: gzip`` request bodies (SDK batch flushes) before they reach routing.
+
+    Pure ASGI rather than an ``@app.middleware('http')`` function because it has to replace the body
+    stream. The inflated size is capped so a small compressed payload cannot expand without bound.
+    """
+
+    def __init__(self, app, max_body_bytes: int) -> None:
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = next((value for name, value in scope['headers'] if name == b'content-encoding'), None)
+        if encoding is None or encoding.strip().lower() != b'gzip':
+            await self.app(scope, receive, send)
+            return
+
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = []
+        size = 0
+        more_body = True
+        try:
+            while more_body:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                more_body = message.get('more_body', False)
+                chunk = inflater.decompress(message.get('body', b''), self.max_body_bytes + 1 - size)
+                size += len(chunk)
+                if size > self.max_body_bytes:
+                    response = _error(scope, 413, 'payload_too_large', 'Decompressed request body is too large')
+                    await response(scope, receive, send)
+                    return
+                chunks.append(chunk)
+            if not inflater.eof:
+                raise zlib.error('truncated gzip stream')
+        except zlib.error:
+            response = _error(scope, 400, 'invalid_request_encoding', 'Request body is not valid gzip')
+            await response(scope, receive, send)
+            return
+
+        body = b''.join(chunks)
+        headers = [
+            (name, value) for name, value in scope['headers'] if name not in (b'content-encoding', b'content-length')
+        ]
+        headers.append((b'content-length', str(len(body)).encode('ascii')))
+        delivered = False
+
+        async def replay():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            return await receive()
+
+        await self.app({**scope, 'headers': headers}, replay, send)
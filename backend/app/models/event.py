@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, Float, ForeignKey, Index, String, Text
+from sqlalchemy import DateTime, Float, ForeignKey, Index, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models import Base, TimestampMixin
@@ -11,6 +11,7 @@ class Event(Base, TimestampMixin):
     __tablename__ = 'events'
     __table_args__ = (
         Index('ix_events_experiment_period_type', 'experiment_id', 'period', 'event_type'),
+        UniqueConstraint('experiment_id', 'idempotency_key', name='uq_events_experiment_idempotency_key'),
     )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -22,6 +23,7 @@ class Event(Base, TimestampMixin):
     period: Mapped[str] = mapped_column(String(20), default='post', index=True)
     value: Mapped[float] = mapped_column(Float, default=1.0)
     context_json: Mapped[str] = mapped_column(Text, default='{}', nullable=False)
+    idempotency_key: Mapped[str | None] = mapped_column(String(120), nullable=True)
     observed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     experiment = relationship('Experiment', back_populates='events')
@@ -25,6 +25,11 @@ class ExperimentStatus(str, enum.Enum):
     stopped = STOPPED
 
 
+class DecisionRule(str, enum.Enum):
+    fixed_horizon = 'fixed_horizon'
+    sequential = 'sequential'
+
+
 class Experiment(Base, TimestampMixin):
     __tablename__ = 'experiments'
 
@@ -50,6 +55,9 @@ class Experiment(Base, TimestampMixin):
     status: Mapped[ExperimentStatus] = mapped_column(
         Enum(ExperimentStatus), default=ExperimentStatus.DRAFT, nullable=False
     )
+    decision_rule: Mapped[DecisionRule] = mapped_column(
+        Enum(DecisionRule), default=DecisionRule.fixed_horizon, nullable=False
+    )
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     ended_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     termination_reason: Mapped[str | None] = mapped_column(Text, nullable=True)
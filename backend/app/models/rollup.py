@@ -0,0 +1,57 @@
+import uuid
+
+from sqlalchemy import Float, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class UnitRollup(Base):
+    __tablename__ = 'unit_rollups'
+    __table_args__ = (
+        UniqueConstraint(
+            'experiment_id',
+            'variant_id',
+            'unit_id',
+            'period',
+            'event_type',
+            'metric_name',
+            name='uq_unit_rollup_key',
+        ),
+        Index('ix_unit_rollups_experiment_unit', 'experiment_id', 'unit_id'),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    experiment_id: Mapped[str] = mapped_column(ForeignKey('experiments.id', ondelete='CASCADE'), nullable=False)
+    variant_id: Mapped[str] = mapped_column(ForeignKey('variants.id', ondelete='CASCADE'), nullable=False)
+    unit_id: Mapped[str] = mapped_column(String(120), nullable=False)
+    period: Mapped[str] = mapped_column(String(20), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Empty string rather than NULL so the unique key also covers exposure and conversion rows.
+    metric_name: Mapped[str] = mapped_column(String(120), default='', nullable=False)
+    event_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    value_sum: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+
+
+class VariantRollup(Base):
+    __tablename__ = 'variant_rollups'
+    __table_args__ = (
+        UniqueConstraint(
+            'experiment_id',
+            'variant_id',
+            'period',
+            'event_type',
+            'metric_name',
+            name='uq_variant_rollup_key',
+        ),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    experiment_id: Mapped[str] = mapped_column(ForeignKey('experiments.id', ondelete='CASCADE'), index=True)
+    variant_id: Mapped[str] = mapped_column(ForeignKey('variants.id', ondelete='CASCADE'), nullable=False)
+    period: Mapped[str] = mapped_column(String(20), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    metric_name: Mapped[str] = mapped_column(String(120), default='', nullable=False)
+    units: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    events: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    value_sum: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class SequentialTestState(Base):
+    __tablename__ = 'sequential_test_states'
+    __table_args__ = (UniqueConstraint('experiment_id', 'variant_id', name='uq_sequential_state_experiment_variant'),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    experiment_id: Mapped[str] = mapped_column(ForeignKey('experiments.id', ondelete='CASCADE'), index=True)
+    variant_id: Mapped[str] = mapped_column(ForeignKey('variants.id', ondelete='CASCADE'))
+    control_exposures: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    control_conversions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    treatment_exposures: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    treatment_conversions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    always_valid_p_value: Mapped[float] = mapped_column(Float, default=1.0, nullable=False)
+    cs_lower: Mapped[float] = mapped_column(Float, default=-1.0, nullable=False)
+    cs_upper: Mapped[float] = mapped_column(Float, default=1.0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
@@ -1,6 +1,14 @@
 from datetime import datetime
+from typing import Annotated
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+from typing_extensions import NotRequired, TypedDict
+
+# Batch ingestion media type: events grouped by their repeated fields, with the per-event fields as
+# parallel arrays. Ends in +json so clients and proxies still treat it as JSON.
+COLUMNAR_CONTENT_TYPE = 'application/vnd.litmus.columnar+json'
+
+IdempotencyKey = Annotated[str, Field(min_length=1, max_length=120)]
 
 
 class EventCreate(BaseModel):
@@ -13,6 +21,7 @@ class EventCreate(BaseModel):
     value: float = 1.0
     context_json: dict | None = None
     observed_at: datetime | None = None
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=120)
 
 
 class EventResponse(BaseModel):
@@ -36,6 +45,7 @@ class ExposureEventCreate(BaseModel):
     variant_key: str
     ts: datetime | None = None
     context: dict | None = None
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=120)
 
 
 class MetricEventCreate(BaseModel):
@@ -44,9 +54,84 @@ class MetricEventCreate(BaseModel):
     variant_key: str
     metric_name: str = Field(min_length=1, max_length=120)
     value: float
+    period: str = Field(default='post', pattern='^(pre|post)$')
     ts: datetime | None = None
     context: dict | None = None
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=120)
+
+
+class ExposureEventRow(TypedDict):
+    """One exposure in a JSON batch. Validated as a plain dict, with the same rules as ExposureEventCreate."""
+
+    experiment_id: str
+    unit_id: str
+    variant_key: str
+    ts: NotRequired[datetime | None]
+    context: NotRequired[dict | None]
+    idempotency_key: NotRequired[IdempotencyKey | None]
+
+
+class MetricEventRow(TypedDict):
+    """One metric event in a JSON batch. Validated as a plain dict, with the same rules as MetricEventCreate."""
+
+    experiment_id: str
+    unit_id: str
+    variant_key: str
+    metric_name: Annotated[str, Field(min_length=1, max_length=120)]
+    value: float
+    period: NotRequired[Annotated[str, Field(pattern='^(pre|post)$')]]
+    ts: NotRequired[datetime | None]
+    context: NotRequired[dict | None]
+    idempotency_key: NotRequired[IdempotencyKey | None]
+
+
+class _EventColumns(BaseModel):
+    experiment_id: str
+    variant_key: str
+    unit_ids: list[str]
+    ts: list[datetime | None] | None = None
+    contexts: list[dict | None] | None = None
+    idempotency_keys: list[IdempotencyKey | None] | None = None
+
+    def _parallel_columns(self) -> dict[str, list | None]:
+        return {'ts': self.ts, 'contexts': self.contexts, 'idempotency_keys': self.idempotency_keys}
+
+    @model_validator(mode='after')
+    def _check_column_lengths(self):
+        size = len(self.unit_ids)
+        for name, column in self._parallel_columns().items():
+            if column is not None and len(column) != size:
+                raise ValueError(f'{name} has {len(column)} entries, expected {size} (one per unit_id)')
+        return self
+
+
+class ExposureColumns(_EventColumns):
+    pass
+
+
+class MetricColumns(_EventColumns):
+    metric_name: str = Field(min_length=1, max_length=120)
+    period: str = Field(default='post', pattern='^(pre|post)$')
+    values: list[float]
+
+    def _parallel_columns(self) -> dict[str, list | None]:
+        return {**super()._parallel_columns(), 'values': self.values}
+
+
+class ExposureColumnBatch(BaseModel):
+    groups: list[ExposureColumns]
+
+    def experiment_ids(self) -> list[str]:
+        return [group.experiment_id for group in self.groups for _ in group.unit_ids]
+
+
+class MetricColumnBatch(BaseModel):
+    groups: list[MetricColumns]
+
+    def experiment_ids(self) -> list[str]:
+        return [group.experiment_id for group in self.groups for _ in group.unit_ids]
 
 
 class BatchIngestResponse(BaseModel):
     ingested: int
+    duplicates: int = 0
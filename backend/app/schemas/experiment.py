@@ -2,7 +2,7 @@ from datetime import datetime
 
 from pydantic import BaseModel, Field, model_validator
 
-from app.models.experiment import ExperimentStatus
+from app.models.experiment import DecisionRule, ExperimentStatus
 from app.schemas.variant import VariantCreate, VariantResponse
 
 
@@ -20,6 +20,7 @@ class ExperimentCreate(BaseModel):
     baseline_rate: float = Field(default=0.1, gt=0, lt=1)
     alpha: float = Field(default=0.05, gt=0, lt=1)
     power: float = Field(default=0.8, gt=0, lt=1)
+    decision_rule: DecisionRule = DecisionRule.fixed_horizon
     variants: list[VariantCreate]
 
     @model_validator(mode='after')
@@ -55,6 +56,7 @@ class ExperimentResponse(BaseModel):
     alpha: float
     power: float
     sample_size_required: int
+    decision_rule: DecisionRule
     status: ExperimentStatus
     started_at: datetime | None
     ended_at: datetime | None
@@ -73,6 +75,7 @@ class ExperimentPatch(BaseModel):
     tags: list[str] | None = None
     targeting: dict | None = None
     ramp_pct: int | None = Field(default=None, ge=0, le=100)
+    decision_rule: DecisionRule | None = None
     variants: list[VariantCreate] | None = None
 
 
@@ -108,6 +111,8 @@ class ExperimentReport(BaseModel):
     sample_size_required: int
     exposures: int
     conversions: int
+    exposure_events: int = 0
+    conversion_events: int = 0
     sample_progress: float
     control_conversion_rate: float
     treatment_conversion_rate: float
@@ -122,6 +127,10 @@ class ExperimentReport(BaseModel):
     estimated_days_to_decision: int | None
     diff_in_diff_delta: float | None
     variant_performance: list[dict]
+    variant_comparisons: list[dict]
+    multiple_testing_correction: str
+    decision_rule: DecisionRule
+    sequential_tests: list[dict]
     assignment_policy: str
     bandit_state: list[dict]
     last_updated_at: datetime
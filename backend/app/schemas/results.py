@@ -31,6 +31,34 @@ class LiftEstimate(BaseModel):
     ci_lower: float
     ci_upper: float
     p_value: float
+    adjusted_p_value: float
+
+
+class PairwiseComparison(BaseModel):
+    variant_key: str
+    reference_variant_key: str
+    absolute_lift: float
+    ci_lower: float
+    ci_upper: float
+    p_value: float
+    adjusted_p_value: float
+
+
+class CupedEstimate(BaseModel):
+    variant_key: str
+    variant_name: str
+    metric_name: str
+    units: int
+    control_units: int
+    theta: float
+    mean: float
+    adjusted_mean: float
+    control_adjusted_mean: float
+    adjusted_absolute_lift: float
+    ci_lower: float
+    ci_upper: float
+    p_value: float
+    variance_reduction: float
 
 
 class ExperimentResultsResponse(BaseModel):
@@ -40,3 +68,6 @@ class ExperimentResultsResponse(BaseModel):
     exposure_timeseries: list[ExposureSeriesByVariant]
     metric_summaries: list[MetricSummaryByVariant]
     lift_estimates: list[LiftEstimate]
+    multiple_testing_correction: str
+    pairwise_comparisons: list[PairwiseComparison]
+    cuped_estimates: list[CupedEstimate]
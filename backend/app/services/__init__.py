@@ -6,6 +6,8 @@ from app.services.experiment_service import ExperimentService
 from app.services.metric_service import MetricService
 from app.services.realtime_service import RealtimeService
 from app.services.results_service import ResultsService
+from app.services.rollup_service import RollupService
+from app.services.sequential_service import SequentialService
 from app.services.snapshot_service import SnapshotService
 
 __all__ = [
@@ -17,5 +19,7 @@ __all__ = [
     'MetricService',
     'RealtimeService',
     'ResultsService',
+    'RollupService',
+    'SequentialService',
     'SnapshotService',
 ]
@@ -1,6 +1,9 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.services.experiment_service import ExperimentService
+from app.services.sequential_service import SequentialObservation, SequentialService
+from app.services.snapshot_service import SnapshotService
 
 
 class AnalysisService:
@@ -8,3 +11,36 @@ class AnalysisService:
     def report(db: Session, experiment_id: str):
         experiment = ExperimentService.get_experiment(db, experiment_id)
         return ExperimentService.build_report(db, experiment)
+
+    @staticmethod
+    def record_served_report(
+        db: Session,
+        experiment_id: str,
+        report: dict,
+        observation: SequentialObservation | None = None,
+    ) -> dict:
+        # Writes always go to the primary, whichever session built the report: sequential state, any
+        # automatic decision and the snapshot commit together.
+        experiment = ExperimentService.get_experiment(db, experiment_id)
+        if observation is not None:
+            SequentialService.observe(db, experiment, observation)
+        experiment = ExperimentService.apply_outcome_transition(db, experiment, report)
+        report['status'] = experiment.status
+        SnapshotService.create_snapshot(db, experiment_id, report)
+        return report
+
+    @staticmethod
+    def refresh_report(db: Session, experiment_id: str, read_db: Session | None = None) -> dict:
+        # Report endpoint flow: recompute (on the replica when one is configured), then record what was
+        # served on the primary: sequential monitoring state, any automatic decision and a snapshot.
+        build_db = read_db if read_db is not None and read_db.info.get('read_only') else db
+        experiment = ExperimentService.get_experiment(build_db, experiment_id)
+        report, observation = ExperimentService.evaluate_report(build_db, experiment)
+        return AnalysisService.record_served_report(db, experiment_id, report, observation)
+
+    @staticmethod
+    async def refresh_report_async(db: AsyncSession, experiment_id: str, read_db: AsyncSession | None = None) -> dict:
+        build_db = read_db if read_db is not None and read_db.info.get('read_only') else db
+        experiment = await ExperimentService.get_experiment_async(build_db, experiment_id)
+        report, observation = await ExperimentService.evaluate_report_async(build_db, experiment)
+        return await db.run_sync(AnalysisService.record_served_report, experiment_id, report, observation)
@@ -1,5 +1,6 @@
 from fastapi import HTTPException
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.assignment import matches_targeting, unit_bucket
@@ -30,33 +31,27 @@ class AssignmentService:
         return chosen
 
     @staticmethod
-    def assign_unit(
-        db: Session,
-        experiment_id: str,
-        unit_id: str,
-        attributes: dict,
-    ) -> tuple[Assignment, int]:
-        experiment = db.scalar(
-            select(Experiment).where(Experiment.id == experiment_id)
-        )
+    def _check_assignable(experiment: Experiment | None) -> Experiment:
         if not experiment:
             raise HTTPException(status_code=404, detail='Experiment not found')
         if experiment.status != ExperimentStatus.RUNNING:
             raise HTTPException(status_code=400, detail='Experiment is not running')
+        return experiment
 
-        existing = db.scalar(
-            select(Assignment).where(
-                Assignment.experiment_id == experiment_id,
-                Assignment.user_id == unit_id,
-                Assignment.released_at.is_(None),
-            )
+    @staticmethod
+    def _existing_assignment_query(experiment_id: str, unit_id: str):
+        return select(Assignment).where(
+            Assignment.experiment_id == experiment_id,
+            Assignment.user_id == unit_id,
+            Assignment.released_at.is_(None),
         )
-        if existing:
-            return existing, experiment.version
 
-        variants = db.scalars(
-            select(Variant).where(Variant.experiment_id == experiment_id).order_by(Variant.created_at.asc())
-        ).all()
+    @staticmethod
+    def _variants_query(experiment_id: str):
+        return select(Variant).where(Variant.experiment_id == experiment_id).order_by(Variant.created_at.asc())
+
+    @staticmethod
+    def _choose_variant(experiment: Experiment, variants: list[Variant], unit_id: str, attributes: dict) -> Variant:
         if not variants:
             raise HTTPException(status_code=400, detail='Experiment has no variants configured')
 
@@ -65,10 +60,29 @@ class AssignmentService:
 
         targets_match = matches_targeting(experiment.targeting, attributes or {})
         if targets_match and experiment.ramp_pct > 0:
-            ramp_bucket = unit_bucket(experiment_id, unit_id, experiment.assignment_salt, 'ramp')
+            ramp_bucket = unit_bucket(experiment.id, unit_id, experiment.assignment_salt, 'ramp')
             if ramp_bucket * 100 < experiment.ramp_pct:
-                variant_bucket = unit_bucket(experiment_id, unit_id, experiment.assignment_salt, 'variant')
+                variant_bucket = unit_bucket(experiment.id, unit_id, experiment.assignment_salt, 'variant')
                 chosen = AssignmentService._weighted_variant(variants, variant_bucket)
+        return chosen
+
+    @staticmethod
+    def assign_unit(
+        db: Session,
+        experiment_id: str,
+        unit_id: str,
+        attributes: dict,
+    ) -> tuple[Assignment, int]:
+        experiment = AssignmentService._check_assignable(
+            db.scalar(select(Experiment).where(Experiment.id == experiment_id))
+        )
+
+        existing = db.scalar(AssignmentService._existing_assignment_query(experiment_id, unit_id))
+        if existing:
+            return existing, experiment.version
+
+        variants = db.scalars(AssignmentService._variants_query(experiment_id)).all()
+        chosen = AssignmentService._choose_variant(experiment, variants, unit_id, attributes)
 
         assignment = Assignment(experiment_id=experiment_id, user_id=unit_id, variant_id=chosen.id)
         db.add(assignment)
@@ -76,6 +90,30 @@ class AssignmentService:
         db.refresh(assignment)
         return assignment, experiment.version
 
+    @staticmethod
+    async def assign_unit_async(
+        db: AsyncSession,
+        experiment_id: str,
+        unit_id: str,
+        attributes: dict,
+    ) -> tuple[Assignment, int]:
+        experiment = AssignmentService._check_assignable(
+            await db.scalar(select(Experiment).where(Experiment.id == experiment_id))
+        )
+
+        existing = await db.scalar(AssignmentService._existing_assignment_query(experiment_id, unit_id))
+        if existing:
+            return existing, experiment.version
+
+        variants = (await db.scalars(AssignmentService._variants_query(experiment_id))).all()
+        chosen = AssignmentService._choose_variant(experiment, variants, unit_id, attributes)
+
+        assignment = Assignment(experiment_id=experiment_id, user_id=unit_id, variant_id=chosen.id)
+        db.add(assignment)
+        await db.commit()
+        await db.refresh(assignment)
+        return assignment, experiment.version
+
     @staticmethod
     def assign_user(db: Session, experiment_id: str, user_id: str) -> Assignment:
         assignment, _ = AssignmentService.assign_unit(
@@ -3,11 +3,22 @@ from datetime import datetime, timezone
 
 from fastapi import HTTPException
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.event import Event
 from app.models.variant import Variant
-from app.schemas.event import EventCreate, ExposureEventCreate, MetricEventCreate
+from app.schemas.event import (
+    EventCreate,
+    ExposureColumnBatch,
+    ExposureEventCreate,
+    ExposureEventRow,
+    MetricColumnBatch,
+    MetricEventCreate,
+    MetricEventRow,
+)
+from app.services.rollup_service import RollupService
 
 
 class EventService:
@@ -32,6 +43,22 @@ class EventService:
             'observed_at': event.observed_at,
         }
 
+    @staticmethod
+    def firehose_record(event: Event) -> dict:
+        # Variants were loaded while resolving keys, so event.variant comes from the identity map without a query.
+        return {
+            'id': event.id,
+            'experiment_id': event.experiment_id,
+            'unit_id': event.user_id,
+            'variant_id': event.variant_id,
+            'variant_key': event.variant.key if event.variant_id else None,
+            'event_type': event.event_type,
+            'metric_name': event.metric_name,
+            'period': event.period,
+            'value': event.value,
+            'observed_at': event.observed_at.isoformat() if event.observed_at else None,
+        }
+
     @staticmethod
     def _resolve_variant(db: Session, experiment_id: str, variant_key: str) -> Variant:
         variant = db.scalar(
@@ -44,16 +71,81 @@ class EventService:
             raise HTTPException(status_code=404, detail=f'Variant key not found: {variant_key}')
         return variant
 
+    @staticmethod
+    def _variant_lookup(db: Session):
+        # A batch usually names a handful of variants; resolve each once instead of one query per event.
+        resolved: dict[tuple[str, str], Variant] = {}
+
+        def lookup(experiment_id: str, variant_key: str) -> Variant:
+            key = (experiment_id, variant_key)
+            variant = resolved.get(key)
+            if variant is None:
+                variant = resolved[key] = EventService._resolve_variant(db, experiment_id, variant_key)
+            return variant
+
+        return lookup
+
     @staticmethod
     def _to_payload_context(context: dict | None) -> str:
-        return json.dumps(context or {})
+        return json.dumps(context) if context else '{}'
 
     @staticmethod
     def _normalize_ts(ts: datetime | None) -> datetime:
         return ts or datetime.now(timezone.utc)
 
+    @staticmethod
+    def _persist(db: Session, events: list[Event]) -> list[Event]:
+        # Drops events whose idempotency key was already ingested (SDK retries) and folds the rest into rollups.
+        seen: set[tuple[str, str]] = set()
+        fresh: list[Event] = []
+        for event in events:
+            if event.idempotency_key is not None:
+                key = (event.experiment_id, event.idempotency_key)
+                if key in seen:
+                    continue
+                seen.add(key)
+            fresh.append(event)
+        if seen:
+            duplicates = RollupService.existing_idempotency_keys(db, seen)
+            if duplicates:
+                fresh = [
+                    event
+                    for event in fresh
+                    if event.idempotency_key is None or (event.experiment_id, event.idempotency_key) not in duplicates
+                ]
+        if not fresh:
+            return []
+
+        db.add_all(fresh)
+        RollupService.apply_events(db, fresh)
+        try:
+            db.commit()
+        except IntegrityError as exc:
+            db.rollback()
+            raise HTTPException(status_code=503, detail='Concurrent ingestion conflict, retry the request') from exc
+        return fresh
+
+    @staticmethod
+    def _persist_one(db: Session, event: Event) -> tuple[Event, bool]:
+        # The stored event, and whether this call created it rather than matching a retried idempotency key.
+        persisted = EventService._persist(db, [event])
+        if persisted:
+            db.refresh(event)
+            return event, True
+        existing = db.scalar(
+            select(Event).where(
+                Event.experiment_id == event.experiment_id,
+                Event.idempotency_key == event.idempotency_key,
+            )
+        )
+        return existing, False
+
     @staticmethod
     def ingest_event(db: Session, payload: EventCreate) -> Event:
+        return EventService.record_event(db, payload)[0]
+
+    @staticmethod
+    def record_event(db: Session, payload: EventCreate) -> tuple[Event, bool]:
         event = Event(
             experiment_id=payload.experiment_id,
             user_id=payload.user_id,
@@ -64,16 +156,13 @@ class EventService:
             value=payload.value,
             context_json=EventService._to_payload_context(payload.context_json),
             observed_at=EventService._normalize_ts(payload.observed_at),
+            idempotency_key=payload.idempotency_key,
         )
-        db.add(event)
-        db.commit()
-        db.refresh(event)
-        return event
+        return EventService._persist_one(db, event)
 
     @staticmethod
-    def ingest_exposure(db: Session, payload: ExposureEventCreate) -> Event:
-        variant = EventService._resolve_variant(db, payload.experiment_id, payload.variant_key)
-        event = Event(
+    def _exposure_event(payload: ExposureEventCreate, variant: Variant) -> Event:
+        return Event(
             experiment_id=payload.experiment_id,
             user_id=payload.unit_id,
             variant_id=variant.id,
@@ -82,66 +171,171 @@ class EventService:
             value=1.0,
             context_json=EventService._to_payload_context(payload.context),
             observed_at=EventService._normalize_ts(payload.ts),
+            idempotency_key=payload.idempotency_key,
         )
-        db.add(event)
-        db.commit()
-        db.refresh(event)
-        return event
-
-    @staticmethod
-    def ingest_exposure_batch(db: Session, payloads: list[ExposureEventCreate]) -> int:
-        for payload in payloads:
-            variant = EventService._resolve_variant(db, payload.experiment_id, payload.variant_key)
-            db.add(
-                Event(
-                    experiment_id=payload.experiment_id,
-                    user_id=payload.unit_id,
-                    variant_id=variant.id,
-                    event_type='exposure',
-                    period='post',
-                    value=1.0,
-                    context_json=EventService._to_payload_context(payload.context),
-                    observed_at=EventService._normalize_ts(payload.ts),
-                )
-            )
-        db.commit()
-        return len(payloads)
 
     @staticmethod
-    def ingest_metric(db: Session, payload: MetricEventCreate) -> Event:
-        variant = EventService._resolve_variant(db, payload.experiment_id, payload.variant_key)
-        event = Event(
+    def _metric_event(payload: MetricEventCreate, variant: Variant) -> Event:
+        return Event(
             experiment_id=payload.experiment_id,
             user_id=payload.unit_id,
             variant_id=variant.id,
             event_type='metric',
             metric_name=payload.metric_name,
-            period='post',
+            period=payload.period,
             value=payload.value,
             context_json=EventService._to_payload_context(payload.context),
             observed_at=EventService._normalize_ts(payload.ts),
+            idempotency_key=payload.idempotency_key,
         )
-        db.add(event)
-        db.commit()
-        db.refresh(event)
-        return event
+
+    @staticmethod
+    def ingest_exposure(db: Session, payload: ExposureEventCreate) -> Event:
+        variant = EventService._resolve_variant(db, payload.experiment_id, payload.variant_key)
+        return EventService._persist_one(db, EventService._exposure_event(payload, variant))[0]
+
+    @staticmethod
+    def ingest_exposure_events(db: Session, payloads: list[ExposureEventCreate]) -> list[Event]:
+        variant_for = EventService._variant_lookup(db)
+        events = [
+            EventService._exposure_event(payload, variant_for(payload.experiment_id, payload.variant_key))
+            for payload in payloads
+        ]
+        return EventService._persist(db, events)
+
+    @staticmethod
+    def ingest_exposure_batch(db: Session, payloads: list[ExposureEventCreate]) -> int:
+        return len(EventService.ingest_exposure_events(db, payloads))
+
+    @staticmethod
+    def ingest_metric(db: Session, payload: MetricEventCreate) -> Event:
+        variant = EventService._resolve_variant(db, payload.experiment_id, payload.variant_key)
+        return EventService._persist_one(db, EventService._metric_event(payload, variant))[0]
+
+    @staticmethod
+    def ingest_metric_events(db: Session, payloads: list[MetricEventCreate]) -> list[Event]:
+        variant_for = EventService._variant_lookup(db)
+        events = [
+            EventService._metric_event(payload, variant_for(payload.experiment_id, payload.variant_key))
+            for payload in payloads
+        ]
+        return EventService._persist(db, events)
 
     @staticmethod
     def ingest_metric_batch(db: Session, payloads: list[MetricEventCreate]) -> int:
-        for payload in payloads:
-            variant = EventService._resolve_variant(db, payload.experiment_id, payload.variant_key)
-            db.add(
+        return len(EventService.ingest_metric_events(db, payloads))
+
+    @staticmethod
+    def _row_events(db: Session, rows: list[ExposureEventRow] | list[MetricEventRow], event_type: str) -> list[Event]:
+        # Rows arrive as validated dicts and go straight into Event objects; no per-event model in between.
+        variant_for = EventService._variant_lookup(db)
+        now = datetime.now(timezone.utc)
+        is_metric = event_type == 'metric'
+        events: list[Event] = []
+        for row in rows:
+            experiment_id = row['experiment_id']
+            events.append(
                 Event(
-                    experiment_id=payload.experiment_id,
-                    user_id=payload.unit_id,
-                    variant_id=variant.id,
-                    event_type='metric',
-                    metric_name=payload.metric_name,
-                    period='post',
-                    value=payload.value,
-                    context_json=EventService._to_payload_context(payload.context),
-                    observed_at=EventService._normalize_ts(payload.ts),
+                    experiment_id=experiment_id,
+                    user_id=row['unit_id'],
+                    variant_id=variant_for(experiment_id, row['variant_key']).id,
+                    event_type=event_type,
+                    metric_name=row['metric_name'] if is_metric else None,
+                    period=row.get('period', 'post') if is_metric else 'post',
+                    value=row['value'] if is_metric else 1.0,
+                    context_json=EventService._to_payload_context(row.get('context')),
+                    observed_at=row.get('ts') or now,
+                    idempotency_key=row.get('idempotency_key'),
                 )
             )
-        db.commit()
-        return len(payloads)
+        return events
+
+    @staticmethod
+    def ingest_exposure_rows(db: Session, rows: list[ExposureEventRow]) -> list[Event]:
+        return EventService._persist(db, EventService._row_events(db, rows, 'exposure'))
+
+    @staticmethod
+    def ingest_metric_rows(db: Session, rows: list[MetricEventRow]) -> list[Event]:
+        return EventService._persist(db, EventService._row_events(db, rows, 'metric'))
+
+    @staticmethod
+    def _column_events(db: Session, batch: ExposureColumnBatch | MetricColumnBatch, event_type: str) -> list[Event]:
+        # One variant lookup per group and no intermediate per-event models: rows come straight from the columns.
+        variant_for = EventService._variant_lookup(db)
+        now = datetime.now(timezone.utc)
+        events: list[Event] = []
+        for group in batch.groups:
+            variant = variant_for(group.experiment_id, group.variant_key)
+            size = len(group.unit_ids)
+            timestamps = group.ts or [None] * size
+            contexts = group.contexts or [None] * size
+            keys = group.idempotency_keys or [None] * size
+            values = group.values if event_type == 'metric' else [1.0] * size
+            metric_name = group.metric_name if event_type == 'metric' else None
+            period = group.period if event_type == 'metric' else 'post'
+            for unit_id, ts, context, key, value in zip(group.unit_ids, timestamps, contexts, keys, values):
+                events.append(
+                    Event(
+                        experiment_id=group.experiment_id,
+                        user_id=unit_id,
+                        variant_id=variant.id,
+                        event_type=event_type,
+                        metric_name=metric_name,
+                        period=period,
+                        value=value,
+                        context_json=EventService._to_payload_context(context),
+                        observed_at=ts or now,
+                        idempotency_key=key,
+                    )
+                )
+        return events
+
+    @staticmethod
+    def ingest_exposure_columns(db: Session, batch: ExposureColumnBatch) -> list[Event]:
+        return EventService._persist(db, EventService._column_events(db, batch, 'exposure'))
+
+    @staticmethod
+    def ingest_metric_columns(db: Session, batch: MetricColumnBatch) -> list[Event]:
+        return EventService._persist(db, EventService._column_events(db, batch, 'metric'))
+
+    # Async entry points reuse the sync ingestion path on the AsyncSession's greenlet, so the logic
+    # (dedup, rollups) stays in one place while database I/O no longer holds a threadpool worker.
+    @staticmethod
+    async def ingest_event_async(db: AsyncSession, payload: EventCreate) -> Event:
+        return await db.run_sync(EventService.ingest_event, payload)
+
+    @staticmethod
+    async def record_event_async(db: AsyncSession, payload: EventCreate) -> tuple[Event, bool]:
+        return await db.run_sync(EventService.record_event, payload)
+
+    @staticmethod
+    async def ingest_exposure_async(db: AsyncSession, payload: ExposureEventCreate) -> Event:
+        return await db.run_sync(EventService.ingest_exposure, payload)
+
+    @staticmethod
+    async def ingest_exposure_events_async(db: AsyncSession, payloads: list[ExposureEventCreate]) -> list[Event]:
+        return await db.run_sync(EventService.ingest_exposure_events, payloads)
+
+    @staticmethod
+    async def ingest_metric_async(db: AsyncSession, payload: MetricEventCreate) -> Event:
+        return await db.run_sync(EventService.ingest_metric, payload)
+
+    @staticmethod
+    async def ingest_metric_events_async(db: AsyncSession, payloads: list[MetricEventCreate]) -> list[Event]:
+        return await db.run_sync(EventService.ingest_metric_events, payloads)
+
+    @staticmethod
+    async def ingest_exposure_rows_async(db: AsyncSession, rows: list[ExposureEventRow]) -> list[Event]:
+        return await db.run_sync(EventService.ingest_exposure_rows, rows)
+
+    @staticmethod
+    async def ingest_metric_rows_async(db: AsyncSession, rows: list[MetricEventRow]) -> list[Event]:
+        return await db.run_sync(EventService.ingest_metric_rows, rows)
+
+    @staticmethod
+    async def ingest_exposure_columns_async(db: AsyncSession, batch: ExposureColumnBatch) -> list[Event]:
+        return await db.run_sync(EventService.ingest_exposure_columns, batch)
+
+    @staticmethod
+    async def ingest_metric_columns_async(db: AsyncSession, batch: MetricColumnBatch) -> list[Event]:
+        return await db.run_sync(EventService.ingest_metric_columns, batch)
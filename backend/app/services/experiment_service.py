@@ -1,11 +1,18 @@
+import asyncio
 from datetime import datetime, timezone
 import json
 import random
+from typing import NamedTuple
 
+import numpy as np
 from fastapi import HTTPException
-from sqlalchemy import case, func, select
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
 
+from app.config import settings
+from app.core.comparisons import adjust_p_values, compare_arms
+from app.core.serialization import dumps_str
 from app.core.statistics import (
     calculate_sample_size,
     confidence_from_p_value,
@@ -14,13 +21,17 @@ from app.core.statistics import (
     uplift_confidence_interval,
 )
 from app.core.bandits import build_thompson_posteriors, estimate_win_probabilities
+from app.core.sequential import SequentialState
 from app.models.assignment import Assignment
 from app.models.decision_audit import DecisionSource
 from app.models.event import Event
-from app.models.experiment import Experiment, ExperimentStatus
+from app.models.experiment import DecisionRule, Experiment, ExperimentStatus
 from app.models.metric import GuardrailStatus, Metric
+from app.models.rollup import VariantRollup
 from app.models.variant import Variant
 from app.services.decision_service import DecisionService
+from app.services.rollup_service import RollupService
+from app.services.sequential_service import SequentialObservation, SequentialService
 from app.schemas.experiment import ExperimentCreate
 
 
@@ -28,6 +39,14 @@ def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+class ReportInputs(NamedTuple):
+    """Everything a report reads from the database, loaded up front so the statistics need no session."""
+
+    rollups: list[VariantRollup]
+    guardrail_metrics: list[Metric]
+    sequential_states: dict[str, SequentialState]
+
+
 class ExperimentService:
     @staticmethod
     def serialize_experiment(experiment: Experiment) -> dict:
@@ -66,6 +85,7 @@ class ExperimentService:
             'alpha': experiment.alpha,
             'power': experiment.power,
             'sample_size_required': experiment.sample_size_required,
+            'decision_rule': experiment.decision_rule,
             'status': experiment.status,
             'started_at': experiment.started_at,
             'ended_at': experiment.ended_at,
@@ -76,24 +96,18 @@ class ExperimentService:
         }
 
     @staticmethod
-    def _variant_event_counts(db: Session, experiment_id: str) -> dict[str, tuple[int, int]]:
-        rows = db.execute(
-            select(
-                Event.variant_id,
-                func.count(case((Event.event_type == 'exposure', 1))).label('exposures'),
-                func.count(case((Event.event_type == 'conversion', 1))).label('conversions'),
-            ).where(
-                Event.experiment_id == experiment_id,
-                Event.period == 'post',
-                Event.variant_id.is_not(None),
-            )
-            .group_by(Event.variant_id)
-        ).all()
-        counts: dict[str, tuple[int, int]] = {}
-        for variant_id, exposures, conversions in rows:
-            if not variant_id:
+    def _variant_period_counts(rollups: list[VariantRollup]) -> dict[tuple[str, str], tuple[int, int]]:
+        # Distinct units per (period, variant) from the rollups, so repeat exposures of one unit count once.
+        counts: dict[tuple[str, str], tuple[int, int]] = {}
+        for row in rollups:
+            if row.event_type not in ('exposure', 'conversion'):
                 continue
-            counts[variant_id] = (exposures or 0, conversions or 0)
+            exposures, conversions = counts.get((row.period, row.variant_id), (0, 0))
+            if row.event_type == 'exposure':
+                exposures = row.units
+            else:
+                conversions = row.units
+            counts[(row.period, row.variant_id)] = (exposures, conversions)
         return counts
 
     @staticmethod
@@ -115,6 +129,7 @@ class ExperimentService:
             alpha=payload.alpha,
             power=payload.power,
             sample_size_required=sample_size,
+            decision_rule=payload.decision_rule,
             status=ExperimentStatus.DRAFT,
         )
         db.add(experiment)
@@ -139,11 +154,20 @@ class ExperimentService:
     def list_experiments(db: Session) -> list[Experiment]:
         return db.scalars(select(Experiment).options(selectinload(Experiment.variants)).order_by(Experiment.created_at.desc())).all()
 
+    @staticmethod
+    def _experiment_query(experiment_id: str):
+        return select(Experiment).where(Experiment.id == experiment_id).options(selectinload(Experiment.variants))
+
     @staticmethod
     def get_experiment(db: Session, experiment_id: str) -> Experiment:
-        experiment = db.scalar(
-            select(Experiment).where(Experiment.id == experiment_id).options(selectinload(Experiment.variants))
-        )
+        experiment = db.scalar(ExperimentService._experiment_query(experiment_id))
+        if not experiment:
+            raise HTTPException(status_code=404, detail='Experiment not found')
+        return experiment
+
+    @staticmethod
+    async def get_experiment_async(db: AsyncSession, experiment_id: str) -> Experiment:
+        experiment = await db.scalar(ExperimentService._experiment_query(experiment_id))
         if not experiment:
             raise HTTPException(status_code=404, detail='Experiment not found')
         return experiment
@@ -181,6 +205,8 @@ class ExperimentService:
             experiment.targeting_json = json.dumps(payload.targeting)
         if payload.ramp_pct is not None:
             experiment.ramp_pct = payload.ramp_pct
+        if payload.decision_rule is not None:
+            experiment.decision_rule = payload.decision_rule
         if payload.variants is not None:
             db.query(Variant).filter(Variant.experiment_id == experiment.id).delete(synchronize_session=False)
             db.add_all(
@@ -252,42 +278,101 @@ class ExperimentService:
         return experiment
 
     @staticmethod
-    def _report_query(db: Session, experiment_id: str):
-        return db.execute(
-            select(
-                func.count(case((Event.event_type == 'exposure', 1))).label('exposures'),
-                func.count(case((Event.event_type == 'conversion', 1))).label('conversions'),
-            ).where(Event.experiment_id == experiment_id, Event.period == 'post')
-        ).one()
+    def _report_totals(period_counts: dict[tuple[str, str], tuple[int, int]]) -> tuple[int, int]:
+        exposures = sum(counts[0] for (period, _), counts in period_counts.items() if period == 'post')
+        conversions = sum(counts[1] for (period, _), counts in period_counts.items() if period == 'post')
+        return exposures, conversions
 
     @staticmethod
-    def _variant_counts(db: Session, experiment_id: str, variant_id: str, period: str = 'post') -> tuple[int, int]:
-        exposure = db.scalar(
-            select(func.count(Event.id)).where(
-                Event.experiment_id == experiment_id,
-                Event.variant_id == variant_id,
-                Event.event_type == 'exposure',
-                Event.period == period,
-            )
+    def _report_event_totals(rollups: list[VariantRollup]) -> tuple[int, int]:
+        # Raw event counts (repeats included), next to the distinct-unit totals.
+        post = [row for row in rollups if row.period == 'post']
+        return (
+            sum(row.events for row in post if row.event_type == 'exposure'),
+            sum(row.events for row in post if row.event_type == 'conversion'),
         )
-        conversion = db.scalar(
-            select(func.count(Event.id)).where(
-                Event.experiment_id == experiment_id,
-                Event.variant_id == variant_id,
-                Event.event_type == 'conversion',
-                Event.period == period,
-            )
+
+    @staticmethod
+    def _recommendation(
+        sample_progress: float,
+        guardrails_breached: int,
+        significant: np.ndarray,
+        uplift: np.ndarray,
+        mde: float,
+        allow_early_stop: bool,
+    ) -> str:
+        if sample_progress < 1 and not allow_early_stop:
+            return 'continue_collecting'
+        if guardrails_breached > 0:
+            return 'fail'
+        if np.any(significant & (uplift >= mde)):
+            return 'pass'
+        if np.any(significant) and np.all(uplift[significant] < 0):
+            return 'fail'
+        if sample_progress < 1:
+            return 'continue_collecting'
+        return 'inconclusive'
+
+    @staticmethod
+    def _report_inputs(db: Session, experiment: Experiment) -> ReportInputs:
+        return ReportInputs(
+            rollups=RollupService.variant_rollups(db, experiment.id),
+            guardrail_metrics=db.scalars(ExperimentService._guardrails_query(experiment.id)).all(),
+            sequential_states=SequentialService.stored_states(
+                db.scalars(SequentialService.states_query(experiment.id)).all()
+            ),
+        )
+
+    @staticmethod
+    async def _report_inputs_async(db: AsyncSession, experiment: Experiment) -> ReportInputs:
+        return ReportInputs(
+            rollups=(await db.scalars(RollupService.variant_rollups_query(experiment.id))).all(),
+            guardrail_metrics=(await db.scalars(ExperimentService._guardrails_query(experiment.id))).all(),
+            sequential_states=SequentialService.stored_states(
+                (await db.scalars(SequentialService.states_query(experiment.id))).all()
+            ),
         )
-        return exposure or 0, conversion or 0
 
     @staticmethod
     def build_report(db: Session, experiment: Experiment) -> dict:
-        exposures, conversions = ExperimentService._report_query(db, experiment.id)
+        # Read-only: listings, exports and live views call this; only AnalysisService.refresh_report writes.
+        return ExperimentService.evaluate_report(db, experiment)[0]
+
+    @staticmethod
+    def evaluate_report(db: Session, experiment: Experiment) -> tuple[dict, SequentialObservation | None]:
+        """The report plus the sequential-test counts it used, for the write path to record."""
+        inputs = ExperimentService._report_inputs(db, experiment)
+        report, observation = ExperimentService._compute_report(experiment, inputs)
+        return report, ExperimentService._tag_source(db, observation)
+
+    @staticmethod
+    def _tag_source(db: Session | AsyncSession, observation: SequentialObservation | None):
+        if observation is None or not db.info.get('read_only'):
+            return observation
+        return observation._replace(from_replica=True)
+
+    @staticmethod
+    async def evaluate_report_async(
+        db: AsyncSession, experiment: Experiment
+    ) -> tuple[dict, SequentialObservation | None]:
+        inputs = await ExperimentService._report_inputs_async(db, experiment)
+        # The statistics are pure CPU; run them on a worker thread rather than the event loop.
+        report, observation = await asyncio.to_thread(ExperimentService._compute_report, experiment, inputs)
+        return report, ExperimentService._tag_source(db, observation)
+
+    @staticmethod
+    def _compute_report(experiment: Experiment, inputs: ReportInputs) -> tuple[dict, SequentialObservation | None]:
+        # Works only on rows already loaded (variants included), so it can run on a worker thread.
+        period_counts = ExperimentService._variant_period_counts(inputs.rollups)
+        exposures, conversions = ExperimentService._report_totals(period_counts)
+        exposure_events, conversion_events = ExperimentService._report_event_totals(inputs.rollups)
         sample_progress = min(1.0, exposures / experiment.sample_size_required) if experiment.sample_size_required else 0.0
 
         variants = experiment.variants
         variant_rows = [(variant.id, variant.name) for variant in variants]
-        counts_by_variant = ExperimentService._variant_event_counts(db, experiment.id)
+        counts_by_variant = {
+            variant_id: counts for (period, variant_id), counts in period_counts.items() if period == 'post'
+        }
         posteriors = build_thompson_posteriors(variant_rows, counts_by_variant)
         win_probabilities = estimate_win_probabilities(
             posteriors=posteriors,
@@ -314,17 +399,16 @@ class ExperimentService:
         uplift_ci_upper = 0.0
         recommendation = 'continue_collecting'
         variant_performance = []
-        guardrails = ExperimentService._latest_guardrails(db, experiment.id)
+        variant_comparisons = []
+        sequential_tests = []
+        observation = None
+        guardrails = ExperimentService._latest_guardrails(inputs.guardrail_metrics)
         guardrails_breached = sum(1 for g in guardrails if g['status'] == GuardrailStatus.breached.value)
 
         if variants:
             control = variants[0]
-            control_post_exposure, control_post_conversion = ExperimentService._variant_counts(
-                db, experiment.id, control.id, period='post'
-            )
-            control_pre_exposure, control_pre_conversion = ExperimentService._variant_counts(
-                db, experiment.id, control.id, period='pre'
-            )
+            control_post_exposure, control_post_conversion = period_counts.get(('post', control.id), (0, 0))
+            control_pre_exposure, control_pre_conversion = period_counts.get(('pre', control.id), (0, 0))
             control_rate = (control_post_conversion / control_post_exposure) if control_post_exposure else 0.0
             control_pre_rate = (control_pre_conversion / control_pre_exposure) if control_pre_exposure else 0.0
 
@@ -334,8 +418,8 @@ class ExperimentService:
             treatment_pre_conversion = 0
 
             for variant in variants:
-                post_exposure, post_conversion = ExperimentService._variant_counts(db, experiment.id, variant.id, period='post')
-                pre_exposure, pre_conversion = ExperimentService._variant_counts(db, experiment.id, variant.id, period='pre')
+                post_exposure, post_conversion = period_counts.get(('post', variant.id), (0, 0))
+                pre_exposure, pre_conversion = period_counts.get(('pre', variant.id), (0, 0))
                 post_rate = (post_conversion / post_exposure) if post_exposure else 0.0
                 pre_rate = (pre_conversion / pre_exposure) if pre_exposure else 0.0
                 variant_performance.append(
@@ -376,6 +460,69 @@ class ExperimentService:
             uplift_ci_lower = ci.lower
             uplift_ci_upper = ci.upper
 
+            # Each arm is tested against control with a family-wise correction instead of pooling treatments.
+            comparisons = compare_arms(
+                conversions=[row['post_conversions'] for row in variant_performance],
+                exposures=[row['post_exposures'] for row in variant_performance],
+                control_index=0,
+                correction=settings.multiple_testing_correction,
+                alpha=experiment.alpha,
+            )
+            variant_comparisons = [
+                {
+                    'variant_id': variants[arm].id,
+                    'variant_name': variants[arm].name,
+                    'uplift_vs_control': round(float(comparisons.uplift[idx]), 4),
+                    'ci_lower': round(float(comparisons.ci_lower[idx]), 4),
+                    'ci_upper': round(float(comparisons.ci_upper[idx]), 4),
+                    'p_value': round(float(comparisons.p_value[idx]), 6),
+                    'adjusted_p_value': round(float(comparisons.adjusted_p_value[idx]), 6),
+                }
+                for idx, arm in enumerate(comparisons.treatment_index)
+            ]
+            significant = comparisons.adjusted_p_value <= experiment.alpha
+
+            # Always-valid p-values and confidence sequences tolerate continuous peeking at the report.
+            tests = len(comparisons.treatment_index)
+            sequential_alpha = experiment.alpha
+            if settings.multiple_testing_correction != 'none' and tests > 1:
+                sequential_alpha = experiment.alpha / tests
+            observation = SequentialObservation(
+                control_counts=(control_post_exposure, control_post_conversion),
+                treatment_counts={
+                    variants[arm].id: (
+                        variant_performance[arm]['post_exposures'],
+                        variant_performance[arm]['post_conversions'],
+                    )
+                    for arm in comparisons.treatment_index
+                },
+                alpha=sequential_alpha,
+            )
+            sequential_states = SequentialService.advance(
+                experiment,
+                inputs.sequential_states,
+                observation.control_counts,
+                observation.treatment_counts,
+                observation.alpha,
+            )
+            sequential_p_values = np.array(
+                [sequential_states[variants[arm].id].always_valid_p_value for arm in comparisons.treatment_index]
+            )
+            adjusted_sequential_p_values = adjust_p_values(sequential_p_values, settings.multiple_testing_correction)
+            sequential_tests = [
+                {
+                    'variant_id': variants[arm].id,
+                    'variant_name': variants[arm].name,
+                    'always_valid_p_value': round(float(sequential_p_values[idx]), 6),
+                    'adjusted_always_valid_p_value': round(float(adjusted_sequential_p_values[idx]), 6),
+                    'cs_lower': round(sequential_states[variants[arm].id].cs_lower, 4),
+                    'cs_upper': round(sequential_states[variants[arm].id].cs_upper, 4),
+                }
+                for idx, arm in enumerate(comparisons.treatment_index)
+            ]
+            if experiment.decision_rule == DecisionRule.sequential:
+                significant = adjusted_sequential_p_values <= experiment.alpha
+
             if control_pre_exposure > 0 and treatment_pre_exposure > 0:
                 did_delta = diff_in_diff(
                     pre_control_rate=control_pre_rate,
@@ -384,27 +531,27 @@ class ExperimentService:
                     post_treatment_rate=treatment_rate,
                 )
 
-            if sample_progress < 1:
-                recommendation = 'continue_collecting'
-            elif guardrails_breached > 0:
-                recommendation = 'fail'
-            elif p_value <= experiment.alpha and uplift >= experiment.mde:
-                recommendation = 'pass'
-            elif p_value <= experiment.alpha and uplift < 0:
-                recommendation = 'fail'
-            else:
-                recommendation = 'inconclusive'
+            recommendation = ExperimentService._recommendation(
+                sample_progress=sample_progress,
+                guardrails_breached=guardrails_breached,
+                significant=significant,
+                uplift=comparisons.uplift,
+                mde=experiment.mde,
+                allow_early_stop=experiment.decision_rule == DecisionRule.sequential,
+            )
         else:
             uplift = 0.0
 
         confidence = confidence_from_p_value(p_value)
-        return {
+        report = {
             'experiment_id': experiment.id,
             'status': experiment.status,
             'mde': experiment.mde,
             'sample_size_required': experiment.sample_size_required,
             'exposures': exposures,
             'conversions': conversions,
+            'exposure_events': exposure_events,
+            'conversion_events': conversion_events,
             'sample_progress': round(sample_progress, 4),
             'control_conversion_rate': round(control_rate, 4),
             'treatment_conversion_rate': round(treatment_rate, 4),
@@ -419,16 +566,22 @@ class ExperimentService:
             'estimated_days_to_decision': None if exposures == 0 else max(0, int((experiment.sample_size_required - exposures) / 200)),
             'diff_in_diff_delta': did_delta,
             'variant_performance': variant_performance,
+            'variant_comparisons': variant_comparisons,
+            'multiple_testing_correction': settings.multiple_testing_correction,
+            'decision_rule': experiment.decision_rule,
+            'sequential_tests': sequential_tests,
             'assignment_policy': 'thompson_sampling',
             'bandit_state': bandit_state,
             'last_updated_at': utc_now(),
         }
+        return report, observation
 
     @staticmethod
-    def _latest_guardrails(db: Session, experiment_id: str) -> list[dict]:
-        metrics = db.scalars(
-            select(Metric).where(Metric.experiment_id == experiment_id).order_by(Metric.observed_at.desc())
-        ).all()
+    def _guardrails_query(experiment_id: str):
+        return select(Metric).where(Metric.experiment_id == experiment_id).order_by(Metric.observed_at.desc())
+
+    @staticmethod
+    def _latest_guardrails(metrics: list[Metric]) -> list[dict]:
         latest_by_name: dict[str, Metric] = {}
         for metric in metrics:
             if metric.name not in latest_by_name:
@@ -449,11 +602,12 @@ class ExperimentService:
     def apply_outcome_transition(db: Session, experiment: Experiment, report: dict) -> Experiment:
         if experiment.status != ExperimentStatus.running:
             return experiment
-        if report['sample_progress'] < 1:
+        recommendation = report['recommendation']
+        sequential = report.get('decision_rule') == DecisionRule.sequential
+        if report['sample_progress'] < 1 and not (sequential and recommendation in {'pass', 'fail'}):
             return experiment
 
         previous_status = experiment.status
-        recommendation = report['recommendation']
         if recommendation == 'pass':
             experiment.status = ExperimentStatus.passed
         elif recommendation == 'fail':
@@ -466,7 +620,8 @@ class ExperimentService:
             experiment=experiment,
             previous_status=previous_status,
             new_status=experiment.status,
-            reason=f'Auto transition from recommendation={recommendation}',
+            reason=f'Auto transition from recommendation={recommendation}'
+            + (' (sequential decision rule)' if sequential else ''),
             source=DecisionSource.auto,
             actor='system',
         )
@@ -534,16 +689,7 @@ class ExperimentService:
     @staticmethod
     def export_report_payload(report: dict, fmt: str) -> str:
         if fmt == 'json':
-            import json
-
-            serializable = dict(report)
-            serializable['status'] = report['status'].value if hasattr(report['status'], 'value') else report['status']
-            serializable['last_updated_at'] = (
-                report['last_updated_at'].isoformat()
-                if hasattr(report['last_updated_at'], 'isoformat')
-                else report['last_updated_at']
-            )
-            return json.dumps(serializable, indent=2)
+            return dumps_str(report, indent=True)
 
         if fmt == 'csv':
             headers = [
@@ -1,9 +1,27 @@
+from collections.abc import Callable
+
 from sqlalchemy.orm import Session
 
+from app.core.realtime import RUNNING_CHANNEL
+from app.core.serialization import to_jsonable
 from app.services.analysis_service import AnalysisService
+from app.services.experiment_service import ExperimentService
 
 
 class RealtimeService:
     @staticmethod
     def live_report(db: Session, experiment_id: str):
         return AnalysisService.report(db, experiment_id)
+
+    @staticmethod
+    def live_channel_document(session_maker: Callable[[], Session], channel: str) -> dict:
+        # Runs on the broadcaster's thread pool, so it owns its session end to end.
+        db = session_maker()
+        try:
+            if channel == RUNNING_CHANNEL:
+                document = {'experiments': ExperimentService.condensed_running_reports(db)}
+            else:
+                document = RealtimeService.live_report(db, channel)
+        finally:
+            db.close()
+        return to_jsonable(document)
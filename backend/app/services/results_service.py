@@ -1,14 +1,21 @@
+import asyncio
 from collections import defaultdict
 from datetime import datetime, timezone
 
+import numpy as np
 from fastapi import HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from app.core.statistics import two_proportion_z_test, uplift_confidence_interval
+from app.config import settings
+from app.core.comparisons import CORRECTION_METHODS, compare_arms
+from app.core.cuped import compare_cuped_to_control, cuped_from_sums
 from app.models.event import Event
 from app.models.experiment import Experiment
+from app.models.rollup import UnitRollup, VariantRollup
 from app.models.variant import Variant
+from app.services.rollup_service import RollupService
 
 
 class ResultsService:
@@ -20,46 +27,221 @@ class ResultsService:
         return ts_utc.replace(minute=0, second=0, microsecond=0)
 
     @staticmethod
-    def build_results(db: Session, experiment_id: str, interval: str = 'hour') -> dict:
+    def _cuped_sums_query(experiment_id: str):
+        # Per-unit sums come straight from the rollup table; only one row per (metric, variant) reaches Python.
+        post_units = (
+            select(
+                UnitRollup.variant_id.label('variant_id'),
+                UnitRollup.unit_id.label('unit_id'),
+                UnitRollup.metric_name.label('metric_name'),
+                UnitRollup.value_sum.label('y'),
+            )
+            .where(
+                UnitRollup.experiment_id == experiment_id,
+                UnitRollup.event_type == 'metric',
+                UnitRollup.period == 'post',
+                UnitRollup.metric_name != '',
+            )
+            .subquery()
+        )
+        pre_units = (
+            select(
+                UnitRollup.unit_id.label('unit_id'),
+                UnitRollup.metric_name.label('metric_name'),
+                func.sum(UnitRollup.value_sum).label('x'),
+            )
+            .where(
+                UnitRollup.experiment_id == experiment_id,
+                UnitRollup.event_type == 'metric',
+                UnitRollup.period == 'pre',
+                UnitRollup.metric_name != '',
+            )
+            .group_by(UnitRollup.unit_id, UnitRollup.metric_name)
+            .subquery()
+        )
+        x = func.coalesce(pre_units.c.x, 0.0)
+        y = post_units.c.y
+        return (
+            select(
+                post_units.c.metric_name,
+                post_units.c.variant_id,
+                func.count(),
+                func.sum(y),
+                func.sum(y * y),
+                func.sum(x),
+                func.sum(x * x),
+                func.sum(x * y),
+            )
+            .select_from(post_units)
+            .outerjoin(
+                pre_units,
+                and_(
+                    pre_units.c.unit_id == post_units.c.unit_id,
+                    pre_units.c.metric_name == post_units.c.metric_name,
+                ),
+            )
+            .group_by(post_units.c.metric_name, post_units.c.variant_id)
+        )
+
+    @staticmethod
+    def _cuped_estimates(rows: list[tuple], variants: list[Variant], control_index: int, alpha: float) -> list[dict]:
+        if not rows:
+            return []
+        metric_names = sorted({row[0] for row in rows})
+        metric_index = {name: idx for idx, name in enumerate(metric_names)}
+        arm_index = {variant.id: idx for idx, variant in enumerate(variants)}
+        sums = np.zeros((6, len(metric_names), len(variants)))
+        for metric_name, variant_id, *values in rows:
+            if variant_id in arm_index:
+                sums[:, metric_index[metric_name], arm_index[variant_id]] = [value or 0.0 for value in values]
+
+        units = sums[0]
+        cuped = cuped_from_sums(*sums)
+        comparison = compare_cuped_to_control(cuped, units, control_index=control_index, alpha=alpha)
+        return [
+            {
+                'variant_key': variant.key,
+                'variant_name': variant.name,
+                'metric_name': metric_name,
+                'units': int(units[m, arm]),
+                'control_units': int(units[m, control_index]),
+                'theta': round(float(cuped.theta[m]), 6),
+                'mean': round(float(cuped.mean[m, arm]), 6),
+                'adjusted_mean': round(float(cuped.adjusted_mean[m, arm]), 6),
+                'control_adjusted_mean': round(float(cuped.adjusted_mean[m, control_index]), 6),
+                'adjusted_absolute_lift': round(float(comparison.adjusted_lift[m, arm]), 6),
+                'ci_lower': round(float(comparison.ci_lower[m, arm]), 6),
+                'ci_upper': round(float(comparison.ci_upper[m, arm]), 6),
+                'p_value': round(float(comparison.p_value[m, arm]), 6),
+                'variance_reduction': round(float(comparison.variance_reduction[m, arm]), 4),
+            }
+            for m, metric_name in enumerate(metric_names)
+            for arm, variant in enumerate(variants)
+            if arm != control_index
+        ]
+
+    @staticmethod
+    def _correction(interval: str, correction: str | None) -> str:
         if interval not in {'minute', 'hour'}:
             raise HTTPException(status_code=400, detail='interval must be minute or hour')
+        correction = correction or settings.multiple_testing_correction
+        if correction not in CORRECTION_METHODS:
+            raise HTTPException(status_code=400, detail=f'correction must be one of: {", ".join(CORRECTION_METHODS)}')
+        return correction
+
+    @staticmethod
+    def _alpha_query(experiment_id: str):
+        return select(Experiment.alpha).where(Experiment.id == experiment_id)
+
+    @staticmethod
+    def _variants_query(experiment_id: str):
+        return select(Variant).where(Variant.experiment_id == experiment_id).order_by(Variant.created_at.asc())
 
-        experiment = db.scalar(
-            select(Experiment).where(Experiment.id == experiment_id).options(selectinload(Experiment.variants))
+    @staticmethod
+    def _exposure_times_query(experiment_id: str):
+        return select(Event.variant_id, Event.observed_at, Event.created_at).where(
+            Event.experiment_id == experiment_id,
+            Event.period == 'post',
+            Event.event_type == 'exposure',
         )
-        if experiment is None:
-            raise HTTPException(status_code=404, detail='Experiment not found')
 
-        variants = db.scalars(
-            select(Variant).where(Variant.experiment_id == experiment_id).order_by(Variant.created_at.asc())
-        ).all()
+    @staticmethod
+    def _require(alpha: float | None, variants: list[Variant]) -> None:
+        if alpha is None:
+            raise HTTPException(status_code=404, detail='Experiment not found')
         if not variants:
             raise HTTPException(status_code=400, detail='Experiment has no variants configured')
 
+    @staticmethod
+    def build_results(
+        db: Session,
+        experiment_id: str,
+        interval: str = 'hour',
+        correction: str | None = None,
+        all_pairs: bool = False,
+    ) -> dict:
+        correction = ResultsService._correction(interval, correction)
+        alpha = db.scalar(ResultsService._alpha_query(experiment_id))
+        variants = db.scalars(ResultsService._variants_query(experiment_id)).all() if alpha is not None else []
+        ResultsService._require(alpha, variants)
+        return ResultsService._compute_results(
+            experiment_id,
+            alpha,
+            variants,
+            RollupService.variant_rollups(db, experiment_id),
+            db.execute(ResultsService._exposure_times_query(experiment_id)).all(),
+            db.execute(ResultsService._cuped_sums_query(experiment_id)).all(),
+            interval,
+            correction,
+            all_pairs,
+        )
+
+    @staticmethod
+    async def build_results_async(
+        db: AsyncSession,
+        experiment_id: str,
+        interval: str = 'hour',
+        correction: str | None = None,
+        all_pairs: bool = False,
+    ) -> dict:
+        correction = ResultsService._correction(interval, correction)
+        alpha = await db.scalar(ResultsService._alpha_query(experiment_id))
+        variants = (await db.scalars(ResultsService._variants_query(experiment_id))).all() if alpha is not None else []
+        ResultsService._require(alpha, variants)
+        rollups = (await db.scalars(RollupService.variant_rollups_query(experiment_id))).all()
+        exposure_rows = (await db.execute(ResultsService._exposure_times_query(experiment_id))).all()
+        cuped_rows = (await db.execute(ResultsService._cuped_sums_query(experiment_id))).all()
+        # Bucketing every exposure and the statistics are pure CPU; keep them off the event loop.
+        return await asyncio.to_thread(
+            ResultsService._compute_results,
+            experiment_id,
+            alpha,
+            variants,
+            rollups,
+            exposure_rows,
+            cuped_rows,
+            interval,
+            correction,
+            all_pairs,
+        )
+
+    @staticmethod
+    def _compute_results(
+        experiment_id: str,
+        alpha: float,
+        variants: list[Variant],
+        rollups: list[VariantRollup],
+        exposure_rows: list[tuple],
+        cuped_rows: list[tuple],
+        interval: str,
+        correction: str,
+        all_pairs: bool,
+    ) -> dict:
+        # Works only on rows already loaded, so it can run on a worker thread.
         variant_by_id = {variant.id: variant for variant in variants}
+        variant_by_key = {variant.key: variant for variant in variants}
         control = next((variant for variant in variants if variant.key == 'control'), variants[0])
 
-        events = db.scalars(
-            select(Event).where(Event.experiment_id == experiment_id).order_by(Event.observed_at.asc())
-        ).all()
-
         exposures_by_variant: dict[str, int] = defaultdict(int)
         conversions_by_variant: dict[str, int] = defaultdict(int)
-        exposure_points: dict[str, dict[datetime, int]] = defaultdict(lambda: defaultdict(int))
-        metric_accumulator: dict[tuple[str, str], list[float]] = defaultdict(list)
+        metric_totals: dict[tuple[str, str], tuple[int, float]] = {}
+        for rollup in rollups:
+            variant = variant_by_id.get(rollup.variant_id)
+            if variant is None or rollup.period != 'post':
+                continue
+            if rollup.event_type == 'exposure':
+                exposures_by_variant[variant.key] = rollup.units
+            elif rollup.event_type == 'conversion':
+                conversions_by_variant[variant.key] = rollup.units
+            elif rollup.event_type == 'metric' and rollup.metric_name:
+                metric_totals[(variant.key, rollup.metric_name)] = (rollup.events, rollup.value_sum)
 
-        for event in events:
-            if event.variant_id is None or event.variant_id not in variant_by_id:
+        exposure_points: dict[str, dict[datetime, int]] = defaultdict(lambda: defaultdict(int))
+        for variant_id, observed_at, created_at in exposure_rows:
+            variant = variant_by_id.get(variant_id)
+            if variant is None:
                 continue
-            variant = variant_by_id[event.variant_id]
-            timestamp = event.observed_at or event.created_at
-            if event.event_type == 'exposure':
-                exposures_by_variant[variant.key] += 1
-                exposure_points[variant.key][ResultsService._bucket_start(timestamp, interval)] += 1
-            elif event.event_type == 'conversion':
-                conversions_by_variant[variant.key] += 1
-            elif event.event_type == 'metric' and event.metric_name:
-                metric_accumulator[(variant.key, event.metric_name)].append(float(event.value))
+            exposure_points[variant.key][ResultsService._bucket_start(observed_at or created_at, interval)] += 1
 
         exposure_timeseries = []
         for variant in variants:
@@ -80,64 +262,67 @@ class ResultsService:
             )
 
         metric_summaries = []
-        for (variant_key, metric_name), values in sorted(metric_accumulator.items(), key=lambda item: item[0]):
-            variant = next((item for item in variants if item.key == variant_key), None)
-            if variant is None:
+        for (variant_key, metric_name), (count, value_sum) in sorted(metric_totals.items(), key=lambda item: item[0]):
+            if count == 0:
                 continue
             metric_summaries.append(
                 {
                     'variant_key': variant_key,
-                    'variant_name': variant.name,
+                    'variant_name': variant_by_key[variant_key].name,
                     'metric_name': metric_name,
-                    'count': len(values),
-                    'mean': round(sum(values) / len(values), 6),
+                    'count': count,
+                    'mean': round(value_sum / count, 6),
                 }
             )
 
-        lift_estimates = []
-        control_exposures = exposures_by_variant.get(control.key, 0)
-        control_conversions = conversions_by_variant.get(control.key, 0)
-        control_rate = (control_conversions / control_exposures) if control_exposures else 0.0
+        control_index = variants.index(control)
+        arm_exposures = np.array([exposures_by_variant.get(variant.key, 0) for variant in variants], dtype=float)
+        arm_conversions = np.array([conversions_by_variant.get(variant.key, 0) for variant in variants], dtype=float)
+        arm_rates = np.divide(arm_conversions, arm_exposures, out=np.zeros_like(arm_conversions), where=arm_exposures > 0)
+        vs_control = compare_arms(
+            arm_conversions,
+            arm_exposures,
+            control_index=control_index,
+            correction=correction,
+            alpha=alpha,
+        )
+
+        lift_estimates = [
+            {
+                'variant_key': variants[arm].key,
+                'variant_name': variants[arm].name,
+                'control_rate': round(float(arm_rates[control_index]), 6),
+                'treatment_rate': round(float(arm_rates[arm]), 6),
+                'absolute_lift': round(float(arm_rates[arm] - arm_rates[control_index]), 6),
+                'ci_lower': round(float(vs_control.ci_lower[idx]), 6),
+                'ci_upper': round(float(vs_control.ci_upper[idx]), 6),
+                'p_value': round(float(vs_control.p_value[idx]), 6),
+                'adjusted_p_value': round(float(vs_control.adjusted_p_value[idx]), 6),
+            }
+            for idx, arm in enumerate(vs_control.treatment_index)
+        ]
 
-        for variant in variants:
-            if variant.id == control.id:
-                continue
-            treatment_exposures = exposures_by_variant.get(variant.key, 0)
-            treatment_conversions = conversions_by_variant.get(variant.key, 0)
-            treatment_rate = (treatment_conversions / treatment_exposures) if treatment_exposures else 0.0
-            if control_exposures == 0 or treatment_exposures == 0:
-                p_value = 1.0
-                ci_lower = 0.0
-                ci_upper = 0.0
-            else:
-                z_result = two_proportion_z_test(
-                    control_conversions=control_conversions,
-                    control_exposures=control_exposures,
-                    treatment_conversions=treatment_conversions,
-                    treatment_exposures=treatment_exposures,
-                )
-                ci = uplift_confidence_interval(
-                    control_conversions=control_conversions,
-                    control_exposures=control_exposures,
-                    treatment_conversions=treatment_conversions,
-                    treatment_exposures=treatment_exposures,
-                )
-                p_value = z_result.p_value
-                ci_lower = ci.lower
-                ci_upper = ci.upper
-
-            lift_estimates.append(
+        pairwise_comparisons = []
+        if all_pairs:
+            pairwise = compare_arms(
+                arm_conversions,
+                arm_exposures,
+                all_pairs=True,
+                correction=correction,
+                alpha=alpha,
+            )
+            pairwise_comparisons = [
                 {
-                    'variant_key': variant.key,
-                    'variant_name': variant.name,
-                    'control_rate': round(control_rate, 6),
-                    'treatment_rate': round(treatment_rate, 6),
-                    'absolute_lift': round(treatment_rate - control_rate, 6),
-                    'ci_lower': round(ci_lower, 6),
-                    'ci_upper': round(ci_upper, 6),
-                    'p_value': round(p_value, 6),
+                    'variant_key': variants[arm].key,
+                    'reference_variant_key': variants[reference].key,
+                    'absolute_lift': round(float(pairwise.uplift[idx]), 6),
+                    'ci_lower': round(float(pairwise.ci_lower[idx]), 6),
+                    'ci_upper': round(float(pairwise.ci_upper[idx]), 6),
+                    'p_value': round(float(pairwise.p_value[idx]), 6),
+                    'adjusted_p_value': round(float(pairwise.adjusted_p_value[idx]), 6),
                 }
-            )
+                for idx, (arm, reference) in enumerate(zip(pairwise.treatment_index, pairwise.reference_index))
+            ]
 
         return {
             'experiment_id': experiment_id,
@@ -146,4 +331,7 @@ class ResultsService:
             'exposure_timeseries': exposure_timeseries,
             'metric_summaries': metric_summaries,
             'lift_estimates': lift_estimates,
+            'multiple_testing_correction': correction,
+            'pairwise_comparisons': pairwise_comparisons,
+            'cuped_estimates': ResultsService._cuped_estimates(cuped_rows, variants, control_index, alpha),
         }
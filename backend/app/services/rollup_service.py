@@ -0,0 +1,184 @@
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.event import Event
+from app.models.rollup import UnitRollup, VariantRollup
+
+# Keeps IN (...) lists under SQLite's bound-parameter limit on large batches.
+_IN_CHUNK = 500
+
+
+def _chunks(values: Iterable, size: int = _IN_CHUNK) -> Iterator[list]:
+    items = list(values)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class RollupService:
+    @staticmethod
+    def _unit_key(event: Event) -> tuple[str, str, str, str, str, str]:
+        return (
+            event.experiment_id,
+            event.variant_id,
+            event.user_id,
+            event.period or 'post',
+            event.event_type,
+            event.metric_name or '',
+        )
+
+    @staticmethod
+    def apply_events(db: Session, events: list[Event]) -> None:
+        # Folds a batch of new events into per-unit and per-variant rollups on the caller's transaction.
+        unit_deltas: dict[tuple, list] = {}
+        for event in events:
+            if event.variant_id is None:
+                continue
+            key = RollupService._unit_key(event)
+            delta = unit_deltas.setdefault(key, [0, 0.0])
+            delta[0] += 1
+            delta[1] += float(event.value if event.value is not None else 1.0)
+        if not unit_deltas:
+            return
+
+        experiment_ids = {key[0] for key in unit_deltas}
+        existing_units: dict[tuple, UnitRollup] = {}
+        for unit_ids in _chunks({key[2] for key in unit_deltas}):
+            for row in db.scalars(
+                select(UnitRollup).where(
+                    UnitRollup.experiment_id.in_(experiment_ids),
+                    UnitRollup.unit_id.in_(unit_ids),
+                )
+            ):
+                existing_units[
+                    (row.experiment_id, row.variant_id, row.unit_id, row.period, row.event_type, row.metric_name)
+                ] = row
+
+        variant_deltas: dict[tuple, list] = defaultdict(lambda: [0, 0, 0.0])
+        for key, (count, value_sum) in unit_deltas.items():
+            experiment_id, variant_id, unit_id, period, event_type, metric_name = key
+            variant_delta = variant_deltas[(experiment_id, variant_id, period, event_type, metric_name)]
+            row = existing_units.get(key)
+            if row is None:
+                db.add(
+                    UnitRollup(
+                        experiment_id=experiment_id,
+                        variant_id=variant_id,
+                        unit_id=unit_id,
+                        period=period,
+                        event_type=event_type,
+                        metric_name=metric_name,
+                        event_count=count,
+                        value_sum=value_sum,
+                    )
+                )
+                variant_delta[0] += 1
+            else:
+                # Column expressions render as "col = col + n" so concurrent writers do not lose increments.
+                row.event_count = UnitRollup.event_count + count
+                row.value_sum = UnitRollup.value_sum + value_sum
+            variant_delta[1] += count
+            variant_delta[2] += value_sum
+
+        existing_variants = {
+            (row.experiment_id, row.variant_id, row.period, row.event_type, row.metric_name): row
+            for row in db.scalars(select(VariantRollup).where(VariantRollup.experiment_id.in_(experiment_ids)))
+        }
+        for key, (units, count, value_sum) in variant_deltas.items():
+            row = existing_variants.get(key)
+            if row is None:
+                experiment_id, variant_id, period, event_type, metric_name = key
+                db.add(
+                    VariantRollup(
+                        experiment_id=experiment_id,
+                        variant_id=variant_id,
+                        period=period,
+                        event_type=event_type,
+                        metric_name=metric_name,
+                        units=units,
+                        events=count,
+                        value_sum=value_sum,
+                    )
+                )
+            else:
+                row.units = VariantRollup.units + units
+                row.events = VariantRollup.events + count
+                row.value_sum = VariantRollup.value_sum + value_sum
+
+    @staticmethod
+    def variant_rollups_query(experiment_id: str):
+        return select(VariantRollup).where(VariantRollup.experiment_id == experiment_id)
+
+    @staticmethod
+    def variant_rollups(db: Session, experiment_id: str) -> list[VariantRollup]:
+        return db.scalars(RollupService.variant_rollups_query(experiment_id)).all()
+
+    @staticmethod
+    def existing_idempotency_keys(db: Session, keys: set[tuple[str, str]]) -> set[tuple[str, str]]:
+        found: set[tuple[str, str]] = set()
+        for chunk in _chunks(keys):
+            found.update(
+                db.execute(
+                    select(Event.experiment_id, Event.idempotency_key).where(
+                        tuple_(Event.experiment_id, Event.idempotency_key).in_(chunk)
+                    )
+                ).all()
+            )
+        return found
+
+    @staticmethod
+    def rebuild_experiment(db: Session, experiment_id: str) -> None:
+        # Backfill for events ingested before rollups existed; rescans the experiment once.
+        db.execute(delete(UnitRollup).where(UnitRollup.experiment_id == experiment_id))
+        db.execute(delete(VariantRollup).where(VariantRollup.experiment_id == experiment_id))
+        metric_name = func.coalesce(Event.metric_name, '')
+        unit_rows = db.execute(
+            select(
+                Event.variant_id,
+                Event.user_id,
+                Event.period,
+                Event.event_type,
+                metric_name,
+                func.count(),
+                func.sum(Event.value),
+            )
+            .where(Event.experiment_id == experiment_id, Event.variant_id.is_not(None))
+            .group_by(Event.variant_id, Event.user_id, Event.period, Event.event_type, metric_name)
+        ).all()
+
+        variant_totals: dict[tuple, list] = defaultdict(lambda: [0, 0, 0.0])
+        for variant_id, unit_id, period, event_type, name, count, value_sum in unit_rows:
+            db.add(
+                UnitRollup(
+                    experiment_id=experiment_id,
+                    variant_id=variant_id,
+                    unit_id=unit_id,
+                    period=period,
+                    event_type=event_type,
+                    metric_name=name,
+                    event_count=count,
+                    value_sum=value_sum or 0.0,
+                )
+            )
+            totals = variant_totals[(variant_id, period, event_type, name)]
+            totals[0] += 1
+            totals[1] += count
+            totals[2] += value_sum or 0.0
+        db.add_all(
+            [
+                VariantRollup(
+                    experiment_id=experiment_id,
+                    variant_id=variant_id,
+                    period=period,
+                    event_type=event_type,
+                    metric_name=name,
+                    units=units,
+                    events=count,
+                    value_sum=value_sum,
+                )
+                for (variant_id, period, event_type, name), (units, count, value_sum) in variant_totals.items()
+            ]
+        )
+        db.commit()
@@ -0,0 +1,103 @@
+from dataclasses import asdict, fields
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.sequential import SequentialState, default_mixture_variance, update_sequential_state
+from app.models.experiment import Experiment
+from app.models.sequential_state import SequentialTestState
+
+_STATE_FIELDS = [field.name for field in fields(SequentialState)]
+
+
+class SequentialObservation(NamedTuple):
+    """Cumulative counts one report fed into the sequential tests, replayed when the report is recorded."""
+
+    control_counts: tuple[int, int]
+    treatment_counts: dict[str, tuple[int, int]]
+    alpha: float
+    # Counts read from a replica may trail what the primary already folded in.
+    from_replica: bool = False
+
+
+class SequentialService:
+    @staticmethod
+    def _to_state(row: SequentialTestState | None) -> SequentialState:
+        if row is None:
+            return SequentialState()
+        return SequentialState(**{name: getattr(row, name) for name in _STATE_FIELDS})
+
+    @staticmethod
+    def states_query(experiment_id: str):
+        return select(SequentialTestState).where(SequentialTestState.experiment_id == experiment_id)
+
+    @staticmethod
+    def stored_states(rows: list[SequentialTestState]) -> dict[str, SequentialState]:
+        return {row.variant_id: SequentialService._to_state(row) for row in rows}
+
+    @staticmethod
+    def advance(
+        experiment: Experiment,
+        previous: dict[str, SequentialState],
+        control_counts: tuple[int, int],
+        treatment_counts: dict[str, tuple[int, int]],
+        alpha: float,
+    ) -> dict[str, SequentialState]:
+        # Pure: folds the latest cumulative counts into the stored states without touching the database.
+        mixture_variance = default_mixture_variance(experiment.mde)
+        control_exposures, control_conversions = control_counts
+        return {
+            variant_id: update_sequential_state(
+                previous.get(variant_id, SequentialState()),
+                control_conversions=control_conversions,
+                control_exposures=control_exposures,
+                treatment_conversions=conversions,
+                treatment_exposures=exposures,
+                alpha=alpha,
+                mixture_variance=mixture_variance,
+            )
+            for variant_id, (exposures, conversions) in treatment_counts.items()
+        }
+
+    @staticmethod
+    def observe(db: Session, experiment: Experiment, observation: SequentialObservation) -> None:
+        """Folds a served report's counts into the stored states on the caller's (primary) transaction.
+
+        The states are advanced again from what the primary holds, so a report built on a lagging replica
+        never overwrites newer state. Only the report write path calls this; building a report is read-only.
+        """
+        rows = {row.variant_id: row for row in db.scalars(SequentialService.states_query(experiment.id)).all()}
+        previous = SequentialService.stored_states(list(rows.values()))
+        control_exposures = observation.control_counts[0]
+        treatment_counts = {
+            variant_id: counts
+            for variant_id, counts in observation.treatment_counts.items()
+            if not (
+                # Shrinking counts reset a state; from a replica they only mean it has not caught up yet.
+                observation.from_replica
+                and variant_id in previous
+                and (
+                    control_exposures < previous[variant_id].control_exposures
+                    or counts[0] < previous[variant_id].treatment_exposures
+                )
+            )
+        }
+        states = SequentialService.advance(
+            experiment, previous, observation.control_counts, treatment_counts, observation.alpha
+        )
+        for variant_id, state in states.items():
+            if state == previous.get(variant_id, SequentialState()):
+                continue
+            row = rows.get(variant_id)
+            if row is None:
+                row = SequentialTestState(experiment_id=experiment.id, variant_id=variant_id, **asdict(state))
+                try:
+                    with db.begin_nested():
+                        db.add(row)
+                except IntegrityError:
+                    continue
+            else:
+                for name, value in asdict(state).items():
+                    setattr(row, name, value)
@@ -1,27 +1,16 @@
-import json
-from datetime import datetime
-from enum import Enum
-
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.serialization import dumps_str
 from app.models.report_snapshot import ReportSnapshot
 
 
 class SnapshotService:
-    @staticmethod
-    def _json_default(value):
-        if isinstance(value, Enum):
-            return value.value
-        if isinstance(value, datetime):
-            return value.isoformat()
-        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
-
     @staticmethod
     def create_snapshot(db: Session, experiment_id: str, report_payload: dict) -> ReportSnapshot:
         snapshot = ReportSnapshot(
             experiment_id=experiment_id,
-            snapshot_json=json.dumps(report_payload, default=SnapshotService._json_default),
+            snapshot_json=dumps_str(report_payload),
         )
         db.add(snapshot)
         db.commit()
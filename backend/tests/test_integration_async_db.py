@@ -0,0 +1,233 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from app.api.v1 import events as events_api
+from app.api.v1.router import build_api_router
+from app.db.init_db import init_db
+from app.db.session import build_async_sessionmaker, build_sessionmaker
+from app.schemas.event import ExposureEventCreate
+from app.schemas.experiment import ExperimentCreate
+from app.services.analysis_service import AnalysisService
+from app.services.assignment_service import AssignmentService
+from app.services.event_service import EventService
+from app.services.experiment_service import ExperimentService
+from app.services.results_service import ResultsService
+
+
+def test_async_services_match_sync_behaviour(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'async.db'}"
+    session_maker, engine = build_sessionmaker(database_url)
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Async Handlers',
+                description='Async services share the sync business logic',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        experiment_id = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100).id
+    finally:
+        db.close()
+
+    async def scenario():
+        async_session_maker, async_engine = build_async_sessionmaker(database_url)
+        try:
+            async with async_session_maker() as session:
+                assignments = [
+                    await AssignmentService.assign_unit_async(session, experiment_id, f'u-{idx}', {})
+                    for idx in range(20)
+                ]
+                repeat, _ = await AssignmentService.assign_unit_async(session, experiment_id, 'u-0', {})
+                assert repeat.id == assignments[0][0].id
+
+                events = await EventService.ingest_exposure_events_async(
+                    session,
+                    [
+                        ExposureEventCreate(
+                            experiment_id=experiment_id,
+                            unit_id=f'u-{idx}',
+                            variant_key='control' if idx % 2 else 'treatment',
+                            idempotency_key=f'async-{idx}',
+                        )
+                        for idx in range(20)
+                    ],
+                )
+                assert len(events) == 20
+
+            async with async_session_maker() as session:
+                report = await AnalysisService.refresh_report_async(session, experiment_id)
+                results = await ResultsService.build_results_async(session, experiment_id)
+            return assignments, report, results
+        finally:
+            await async_engine.dispose()
+
+    assignments, report, results = asyncio.run(scenario())
+
+    db = session_maker()
+    try:
+        for assignment, version in assignments:
+            sync_assignment, sync_version = AssignmentService.assign_unit(db, experiment_id, assignment.user_id, {})
+            assert (sync_assignment.id, sync_version) == (assignment.id, version)
+    finally:
+        db.close()
+        engine.dispose()
+
+    assert report['exposures'] == 20
+    assert results['exposure_totals'] == {'control': 10, 'treatment': 10}
+
+
+def test_async_report_and_results_compute_off_the_event_loop(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'offload.db'}"
+    session_maker, engine = build_sessionmaker(database_url)
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Offloaded Statistics',
+                description='Async report and results fetch rows on the loop and compute on a thread',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        experiment_id = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100).id
+        EventService.ingest_exposure_batch(
+            db,
+            [
+                ExposureEventCreate(experiment_id=experiment_id, unit_id=f'u-{idx}', variant_key='control')
+                for idx in range(6)
+            ],
+        )
+    finally:
+        db.close()
+        engine.dispose()
+
+    compute_threads = {}
+    for owner, name in ((ExperimentService, '_compute_report'), (ResultsService, '_compute_results')):
+        compute = getattr(owner, name)
+
+        def recording(*args, _compute=compute, _name=name):
+            compute_threads[_name] = threading.get_ident()
+            return _compute(*args)
+
+        monkeypatch.setattr(owner, name, staticmethod(recording))
+
+    async def scenario():
+        async_session_maker, async_engine = build_async_sessionmaker(database_url)
+        try:
+            async with async_session_maker() as session:
+                report = await AnalysisService.refresh_report_async(session, experiment_id)
+                results = await ResultsService.build_results_async(session, experiment_id, interval='minute')
+            return threading.get_ident(), report, results
+        finally:
+            await async_engine.dispose()
+
+    loop_thread, report, results = asyncio.run(scenario())
+
+    assert set(compute_threads) == {'_compute_report', '_compute_results'}
+    assert loop_thread not in compute_threads.values()
+    assert report['exposures'] == 6
+    assert results['exposure_totals'] == {'control': 6, 'treatment': 0}
+
+
+def test_slow_ingestion_notifier_does_not_stall_the_event_loop(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'notify.db'}"
+    session_maker, engine = build_sessionmaker(database_url)
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Slow Notifier',
+                description='Redis round trips after ingestion stay off the event loop',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        experiment_id = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100).id
+    finally:
+        db.close()
+        engine.dispose()
+
+    class SlowNotifier:
+        def __init__(self):
+            self.records = []
+
+        def publish(self, experiment_ids):
+            time.sleep(0.3)
+
+        def is_tailed(self, experiment_id):
+            time.sleep(0.1)
+            return True
+
+        def publish_events(self, records):
+            self.records.extend(records)
+
+    notifier = SlowNotifier()
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(ingestion_notifier=notifier)))
+
+    async def scenario():
+        async_session_maker, async_engine = build_async_sessionmaker(database_url)
+        loop = asyncio.get_running_loop()
+        gaps = []
+
+        async def concurrent_request():
+            while True:
+                started = loop.time()
+                await asyncio.sleep(0.01)
+                gaps.append(loop.time() - started)
+
+        ticker = asyncio.create_task(concurrent_request())
+        try:
+            async with async_session_maker() as session:
+                response = await events_api.create_exposure_async(
+                    request,
+                    session,
+                    None,
+                    ExposureEventCreate(experiment_id=experiment_id, unit_id='u-1', variant_key='treatment'),
+                )
+        finally:
+            ticker.cancel()
+            await async_engine.dispose()
+        return response, gaps
+
+    response, gaps = asyncio.run(scenario())
+
+    assert response.ingested == 1
+    assert [record['variant_key'] for record in notifier.records] == ['treatment']
+    assert len(gaps) > 10
+    assert max(gaps) < 0.2
+
+
+def test_async_router_replaces_hot_sync_handlers():
+    def handlers(router):
+        return {(route.path, method): route.endpoint for route in router.routes for method in getattr(route, 'methods', ())}
+
+    sync_handlers = handlers(build_api_router())
+    async_handlers = handlers(build_api_router(async_db=True))
+    assert sync_handlers.keys() == async_handlers.keys()
+
+    for key in (
+        ('/assignments', 'POST'),
+        ('/events/exposure', 'POST'),
+        ('/events/metric', 'POST'),
+        ('/experiments/{experiment_id}/report', 'GET'),
+        ('/results/{experiment_id}', 'GET'),
+    ):
+        assert not asyncio.iscoroutinefunction(sync_handlers[key])
+        assert asyncio.iscoroutinefunction(async_handlers[key])
+    assert async_handlers[('/experiments', 'GET')] is sync_handlers[('/experiments', 'GET')]
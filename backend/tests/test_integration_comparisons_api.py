@@ -0,0 +1,117 @@
+import math
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1 import experiments as experiments_api
+from app.api.v1 import results as results_api
+from app.core.statistics import two_sided_critical_value
+from app.db.init_db import init_db
+from app.db.session import build_sessionmaker
+from app.schemas.event import EventCreate, ExposureEventCreate
+from app.schemas.experiment import ExperimentCreate, ExperimentReport
+from app.schemas.results import ExperimentResultsResponse
+from app.services.event_service import EventService
+from app.services.experiment_service import ExperimentService
+
+CONVERSIONS = {'control': 20, 'fast': 45, 'slow': 24}
+
+
+def _seed(db) -> str:
+    experiment = ExperimentService.create_experiment(
+        db,
+        ExperimentCreate(
+            name='Corrected Comparisons',
+            description='Three arms compared against control and pairwise',
+            variants=[
+                {'key': 'control', 'name': 'Control', 'weight': 0.34},
+                {'key': 'fast', 'name': 'Fast', 'weight': 0.33},
+                {'key': 'slow', 'name': 'Slow', 'weight': 0.33},
+            ],
+        ),
+    )
+    experiment = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100)
+    for variant in experiment.variants:
+        exposures = [
+            ExposureEventCreate(experiment_id=experiment.id, unit_id=f'{variant.key}-{idx}', variant_key=variant.key)
+            for idx in range(200)
+        ]
+        EventService.ingest_exposure_batch(db, exposures)
+        for idx in range(CONVERSIONS[variant.key]):
+            EventService.ingest_event(
+                db,
+                EventCreate(
+                    experiment_id=experiment.id,
+                    user_id=f'{variant.key}-{idx}',
+                    variant_id=variant.id,
+                    event_type='conversion',
+                ),
+            )
+    return experiment.id
+
+
+def test_results_endpoint_applies_correction_and_all_pairs_params(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'comparisons.db'}")
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment_id = _seed(db)
+
+        def results(**params) -> ExperimentResultsResponse:
+            return ExperimentResultsResponse.model_validate(
+                results_api.get_results(experiment_id, **{'interval': 'hour', 'db': db, **params})
+            )
+
+        holm = results(correction='holm', all_pairs=False)
+        bh = results(correction='bh', all_pairs=True)
+
+        assert holm.multiple_testing_correction == 'holm' and bh.multiple_testing_correction == 'bh'
+        assert [item.variant_key for item in holm.lift_estimates] == ['fast', 'slow']
+        assert holm.pairwise_comparisons == []
+        assert {(item.variant_key, item.reference_variant_key) for item in bh.pairwise_comparisons} == {
+            ('fast', 'control'),
+            ('slow', 'control'),
+            ('slow', 'fast'),
+        }
+        for holm_item, bh_item in zip(holm.lift_estimates, bh.lift_estimates):
+            assert holm_item.p_value == bh_item.p_value
+            assert bh_item.p_value <= bh_item.adjusted_p_value <= holm_item.adjusted_p_value
+            assert holm_item.ci_lower <= holm_item.absolute_lift <= holm_item.ci_upper
+            assert bh_item.ci_lower <= bh_item.absolute_lift <= bh_item.ci_upper
+
+        # One BH discovery among two arms: false-coverage-rate intervals at level alpha * 1 / 2.
+        fast = bh.lift_estimates[0]
+        assert [item.adjusted_p_value <= 0.05 for item in bh.lift_estimates] == [True, False]
+        std_error = math.sqrt(0.1 * 0.9 / 200 + 0.225 * 0.775 / 200)
+        critical = float(two_sided_critical_value(0.05 / 2))
+        assert fast.ci_upper - fast.absolute_lift == pytest.approx(critical * std_error, abs=1e-5)
+
+        with pytest.raises(HTTPException) as exc_info:
+            results(correction='sidak', all_pairs=False)
+        assert exc_info.value.status_code == 400
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_report_endpoint_compares_every_arm_against_control(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'report_comparisons.db'}")
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment_id = _seed(db)
+
+        report = ExperimentReport.model_validate(experiments_api.experiment_report(experiment_id, db, db))
+
+        comparisons = {item['variant_name']: item for item in report.variant_comparisons}
+        assert sorted(comparisons) == ['Fast', 'Slow']
+        fast, slow = comparisons['Fast'], comparisons['Slow']
+        assert fast['uplift_vs_control'] == pytest.approx(0.125, abs=1e-4)
+        assert fast['ci_lower'] > 0 and fast['adjusted_p_value'] <= 0.05
+        assert slow['ci_lower'] < 0 < slow['ci_upper'] and slow['adjusted_p_value'] > 0.05
+        for item in (fast, slow):
+            assert item['p_value'] <= item['adjusted_p_value']
+        assert report.multiple_testing_correction == 'holm'
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,58 @@
+import random
+
+from app.db.init_db import init_db
+from app.db.session import build_sessionmaker
+from app.schemas.event import MetricEventCreate
+from app.schemas.experiment import ExperimentCreate
+from app.services.event_service import EventService
+from app.services.experiment_service import ExperimentService
+from app.services.results_service import ResultsService
+
+
+def test_results_include_cuped_adjusted_estimates(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'cuped.db'}")
+    init_db(engine)
+
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='CUPED Results',
+                description='Pre-period spend explains most post-period spend',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        experiment = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100)
+
+        rng = random.Random(7)
+        payloads = []
+        for idx in range(400):
+            variant_key = 'control' if idx % 2 == 0 else 'treatment'
+            baseline = rng.gauss(100, 30)
+            outcome = baseline + rng.gauss(0, 10) + (5 if variant_key == 'treatment' else 0)
+            common = {'experiment_id': experiment.id, 'unit_id': f'u-{idx}', 'variant_key': variant_key}
+            payloads.append(MetricEventCreate(**common, metric_name='spend', value=baseline, period='pre'))
+            payloads.append(MetricEventCreate(**common, metric_name='spend', value=outcome))
+        EventService.ingest_metric_batch(db, payloads)
+
+        results = ResultsService.build_results(db=db, experiment_id=experiment.id)
+
+        spend_summaries = [item for item in results['metric_summaries'] if item['metric_name'] == 'spend']
+        assert {item['count'] for item in spend_summaries} == {200}
+
+        assert len(results['cuped_estimates']) == 1
+        estimate = results['cuped_estimates'][0]
+        assert estimate['metric_name'] == 'spend'
+        assert estimate['variant_key'] == 'treatment'
+        assert estimate['units'] == 200
+        assert estimate['control_units'] == 200
+        assert estimate['variance_reduction'] > 0.5
+        assert estimate['ci_lower'] < 5 < estimate['ci_upper']
+        assert estimate['ci_lower'] > 0
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.config import settings
+from app.db.init_db import init_db
+from app.db.session import build_sessionmaker, pool_status
+from app.models.report_snapshot import ReportSnapshot
+from app.models.sequential_state import SequentialTestState
+from app.schemas.event import ExposureEventCreate
+from app.schemas.experiment import ExperimentCreate
+from app.services.analysis_service import AnalysisService
+from app.services.event_service import EventService
+from app.services.experiment_service import ExperimentService
+
+
+def test_pool_settings_and_wait_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'db_pool_size', 1)
+    monkeypatch.setattr(settings, 'db_max_overflow', 0)
+    monkeypatch.setattr(settings, 'db_pool_timeout_seconds', 0.2)
+    _, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'pool.db'}")
+    try:
+        held = engine.connect()
+        assert pool_status(engine)['checked_out'] == 1
+
+        # A second checkout blocks until the first connection is returned.
+        threading.Timer(0.05, held.close).start()
+        with engine.connect():
+            pass
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        status = pool_status(engine)
+        assert status['size'] == 1 and status['max_overflow'] == 0
+        assert status['checked_out'] == 0 and status['overflow'] == 0
+        assert status['checkouts'] == 4
+        assert status['waited_checkouts'] == 2
+        assert status['timeouts'] == 1
+        assert status['wait_ms_max'] >= 150
+    finally:
+        engine.dispose()
+
+
+def test_report_builds_on_replica_and_writes_to_primary(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    session_maker, engine = build_sessionmaker(database_url)
+    read_session_maker, read_engine = build_sessionmaker(database_url, read_only=True)
+    init_db(engine)
+    db = session_maker()
+    read_db = read_session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Replica Reads',
+                description='Reports are computed on the replica session',
+                decision_rule='sequential',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        experiment = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100)
+        EventService.ingest_exposure_batch(
+            db,
+            [
+                ExposureEventCreate(experiment_id=experiment.id, unit_id=f'{key}-{idx}', variant_key=key)
+                for key in ('control', 'treatment')
+                for idx in range(50)
+            ],
+        )
+
+        report = AnalysisService.refresh_report(db, experiment.id, read_db=read_db)
+        assert report['exposures'] == 100
+        assert db.scalar(select(func.count(ReportSnapshot.id))) == 1
+        # Sequential monitoring state is recorded on the primary even when the replica built the report.
+        assert db.scalar(select(func.count(SequentialTestState.id))) == 1
+
+        AnalysisService.refresh_report(db, experiment.id)
+        assert db.scalar(select(func.count(ReportSnapshot.id))) == 2
+        assert db.scalar(select(func.count(SequentialTestState.id))) == 1
+    finally:
+        read_db.close()
+        db.close()
+        read_engine.dispose()
+        engine.dispose()
+
+
+def test_wait_stats_survive_concurrent_checkouts(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'db_pool_size', 2)
+    monkeypatch.setattr(settings, 'db_max_overflow', 1)
+    _, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'busy.db'}")
+
+    def worker():
+        for _ in range(20):
+            with engine.connect():
+                time.sleep(0.001)
+
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        status = pool_status(engine)
+        assert status['checkouts'] == 120
+        assert status['checked_out'] == 0
+        assert status['waited_checkouts'] > 0
+    finally:
+        engine.dispose()
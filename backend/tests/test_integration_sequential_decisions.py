@@ -0,0 +1,132 @@
+from sqlalchemy import func, select
+
+from app.db.init_db import init_db
+from app.db.session import build_sessionmaker
+from app.models.experiment import ExperimentStatus
+from app.models.sequential_state import SequentialTestState
+from app.schemas.event import EventCreate, ExposureEventCreate
+from app.schemas.experiment import ExperimentCreate
+from app.services.analysis_service import AnalysisService
+from app.services.decision_service import DecisionService
+from app.services.event_service import EventService
+from app.services.experiment_service import ExperimentService
+from app.services.sequential_service import SequentialObservation, SequentialService
+
+
+def _seed_strong_effect(db, experiment):
+    variant_ids = {variant.key: variant.id for variant in experiment.variants}
+    EventService.ingest_exposure_batch(
+        db,
+        [
+            ExposureEventCreate(experiment_id=experiment.id, unit_id=f'{key}-{idx}', variant_key=key)
+            for key in ('control', 'treatment')
+            for idx in range(300)
+        ],
+    )
+    for key, converted in (('control', 30), ('treatment', 90)):
+        for idx in range(converted):
+            EventService.ingest_event(
+                db,
+                EventCreate(
+                    experiment_id=experiment.id,
+                    user_id=f'{key}-{idx}',
+                    variant_id=variant_ids[key],
+                    event_type='conversion',
+                ),
+            )
+
+
+def _create(db, decision_rule: str):
+    experiment = ExperimentService.create_experiment(
+        db,
+        ExperimentCreate(
+            name=f'Sequential {decision_rule}',
+            description='Sequential monitoring may stop before the fixed horizon',
+            decision_rule=decision_rule,
+            variants=[
+                {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+            ],
+        ),
+    )
+    return ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100)
+
+
+def test_sequential_rule_stops_early_on_strong_effect(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'sequential.db'}")
+    init_db(engine)
+
+    db = session_maker()
+    try:
+        experiment = _create(db, 'sequential')
+        _seed_strong_effect(db, experiment)
+
+        experiment = ExperimentService.get_experiment(db, experiment.id)
+        report = ExperimentService.build_report(db, experiment)
+        assert report['sample_progress'] < 1
+        assert report['decision_rule'] == 'sequential'
+        assert report['recommendation'] == 'pass'
+        assert report['sequential_tests'][0]['always_valid_p_value'] < 0.05
+        assert report['sequential_tests'][0]['cs_lower'] > 0
+
+        experiment = ExperimentService.apply_outcome_transition(db, experiment, report)
+        assert experiment.status == ExperimentStatus.passed
+        decisions = DecisionService.list_decisions(db, experiment.id)
+        assert 'sequential' in decisions[0].reason
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_fixed_horizon_rule_keeps_collecting_on_same_data(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'fixed.db'}")
+    init_db(engine)
+
+    db = session_maker()
+    try:
+        experiment = _create(db, 'fixed_horizon')
+        _seed_strong_effect(db, experiment)
+
+        experiment = ExperimentService.get_experiment(db, experiment.id)
+        report = ExperimentService.build_report(db, experiment)
+        assert report['recommendation'] == 'continue_collecting'
+        assert report['sequential_tests']
+
+        experiment = ExperimentService.apply_outcome_transition(db, experiment, report)
+        assert experiment.status == ExperimentStatus.RUNNING
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_read_paths_never_persist_sequential_state(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'pure.db'}")
+    init_db(engine)
+
+    db = session_maker()
+    try:
+        experiment = _create(db, 'sequential')
+        _seed_strong_effect(db, experiment)
+        experiment = ExperimentService.get_experiment(db, experiment.id)
+
+        report = ExperimentService.build_report(db, experiment)
+        ExperimentService.condensed_running_reports(db)
+        ExperimentService.export_report_payload(report, 'json')
+        db.commit()
+        assert report['sequential_tests'][0]['always_valid_p_value'] < 0.05
+        assert db.scalar(select(func.count(SequentialTestState.id))) == 0
+
+        served = AnalysisService.refresh_report(db, experiment.id)
+        state = db.scalar(select(SequentialTestState))
+        assert (state.control_exposures, state.treatment_exposures) == (300, 300)
+        assert served['sequential_tests'] == report['sequential_tests']
+
+        # Counts behind the stored state can only come from a lagging replica; they must not reset it.
+        stale = SequentialObservation((100, 10), {state.variant_id: (100, 30)}, alpha=0.05, from_replica=True)
+        SequentialService.observe(db, experiment, stale)
+        db.commit()
+        db.refresh(state)
+        assert (state.control_exposures, state.treatment_exposures) == (300, 300)
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,236 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.api.v1 import events as events_api
+from app.config import settings
+from app.db.init_db import init_db
+from app.db.session import build_sessionmaker
+from app.schemas.event import EventCreate, ExposureEventCreate, MetricEventCreate
+from app.schemas.experiment import ExperimentCreate
+from app.services.event_service import EventService
+from app.services.experiment_service import ExperimentService
+from app.services.results_service import ResultsService
+from app.services.rollup_service import RollupService
+
+
+def test_report_counts_distinct_units_and_retries_are_idempotent(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'rollups.db'}")
+    init_db(engine)
+
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Unit Rollups',
+                description='Repeat exposures of one unit count once',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        experiment = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100)
+        control_id = next(variant.id for variant in experiment.variants if variant.key == 'control')
+
+        batch = [
+            ExposureEventCreate(
+                experiment_id=experiment.id,
+                unit_id=f'u-{idx % 5}',
+                variant_key='control',
+                idempotency_key=f'exp-{idx}',
+            )
+            for idx in range(20)
+        ]
+        assert EventService.ingest_exposure_batch(db, batch) == 20
+        # A client retry of the same batch, plus an in-batch duplicate, must not double count.
+        assert EventService.ingest_exposure_batch(db, batch + batch[:3]) == 0
+
+        metric_batch = [
+            MetricEventCreate(
+                experiment_id=experiment.id,
+                unit_id=f'u-{idx % 5}',
+                variant_key='control',
+                metric_name='revenue',
+                value=2.0,
+                idempotency_key=f'rev-{idx}',
+            )
+            for idx in range(10)
+        ]
+        assert EventService.ingest_metric_batch(db, metric_batch) == 10
+
+        first = EventService.ingest_event(
+            db,
+            EventCreate(
+                experiment_id=experiment.id,
+                user_id='u-0',
+                variant_id=control_id,
+                event_type='conversion',
+                idempotency_key='conv-1',
+            ),
+        )
+        retried = EventService.ingest_event(
+            db,
+            EventCreate(
+                experiment_id=experiment.id,
+                user_id='u-0',
+                variant_id=control_id,
+                event_type='conversion',
+                idempotency_key='conv-1',
+            ),
+        )
+        assert retried.id == first.id
+        EventService.ingest_event(
+            db,
+            EventCreate(experiment_id=experiment.id, user_id='u-0', variant_id=control_id, event_type='conversion'),
+        )
+
+        report = ExperimentService.build_report(db, experiment)
+        assert report['exposures'] == 5
+        assert report['exposure_events'] == 20
+        assert report['conversions'] == 1
+        assert report['conversion_events'] == 2
+        control_row = next(row for row in report['variant_performance'] if row['variant_id'] == control_id)
+        assert control_row['post_exposures'] == 5
+        assert control_row['post_conversions'] == 1
+
+        results = ResultsService.build_results(db=db, experiment_id=experiment.id)
+        assert results['exposure_totals'] == {'control': 5, 'treatment': 0}
+        assert sum(point['exposures'] for point in results['exposure_timeseries'][0]['points']) == 20
+        revenue = next(item for item in results['metric_summaries'] if item['metric_name'] == 'revenue')
+        assert revenue['count'] == 10
+        assert revenue['mean'] == 2.0
+
+        RollupService.rebuild_experiment(db, experiment.id)
+        assert ExperimentService.build_report(db, experiment)['exposures'] == 5
+    finally:
+        db.close()
+        engine.dispose()
+
+
+
+def test_retried_single_events_report_duplicates_and_are_not_renotified(tmp_path):
+    session_maker, engine = build_sessionmaker(f"sqlite:///{tmp_path / 'retries.db'}")
+    init_db(engine)
+
+    class RecordingNotifier:
+        def __init__(self):
+            self.published = []
+
+        def publish(self, experiment_ids):
+            self.published.append(set(experiment_ids))
+
+        def is_tailed(self, experiment_id):
+            return False
+
+    notifier = RecordingNotifier()
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(ingestion_notifier=notifier)))
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Single Retries',
+                description='A retried single event is a duplicate, not a new ingestion',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        experiment = ExperimentService.launch_experiment(db, experiment.id, ramp_pct=100)
+        exposure = ExposureEventCreate(
+            experiment_id=experiment.id, unit_id='u-1', variant_key='control', idempotency_key='exp-1'
+        )
+        metric = MetricEventCreate(
+            experiment_id=experiment.id,
+            unit_id='u-1',
+            variant_key='control',
+            metric_name='revenue',
+            value=3.0,
+            idempotency_key='rev-1',
+        )
+
+        for payload, handler in ((exposure, events_api.create_exposure), (metric, events_api.create_metric)):
+            first = handler(request, db, None, payload)
+            retried = handler(request, db, None, payload)
+            assert (first.ingested, first.duplicates) == (1, 0)
+            assert (retried.ingested, retried.duplicates) == (0, 1)
+
+        conversion = EventCreate(
+            experiment_id=experiment.id,
+            user_id='u-1',
+            variant_id=experiment.variants[0].id,
+            event_type='conversion',
+            idempotency_key='conv-1',
+        )
+        first = events_api.create_event(conversion, request, db, None)
+        assert events_api.create_event(conversion, request, db, None)['id'] == first['id']
+
+        assert len(notifier.published) == 3
+        assert ExperimentService.build_report(db, experiment)['exposure_events'] == 1
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_upgrade_migration_adds_columns_and_backfills_rollups_of_existing_events(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'upgrade.db'}"
+    monkeypatch.setattr(settings, 'database_url', database_url)
+    config = Config(str(Path(__file__).resolve().parents[1] / 'alembic.ini'))
+    config.attributes['configure_logger'] = False
+
+    session_maker, engine = build_sessionmaker(database_url)
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Upgrade Backfill',
+                description='Events from before rollups existed still count after the upgrade',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        batch = [
+            ExposureEventCreate(experiment_id=experiment.id, unit_id=f'u-{idx % 4}', variant_key='control')
+            for idx in range(12)
+        ]
+        EventService.ingest_exposure_batch(db, batch)
+    finally:
+        db.close()
+
+    # Downgrading reproduces the previous release's schema: no rollups, no idempotency key, no decision rule.
+    command.stamp(config, 'head')
+    command.downgrade(config, 'base')
+    legacy = inspect(engine)
+    assert 'unit_rollups' not in legacy.get_table_names()
+    assert 'idempotency_key' not in {column['name'] for column in legacy.get_columns('events')}
+
+    command.upgrade(config, 'head')
+    upgraded = inspect(engine)
+    assert 'decision_rule' in {column['name'] for column in upgraded.get_columns('experiments')}
+    assert 'uq_events_experiment_idempotency_key' in {
+        constraint['name'] for constraint in upgraded.get_unique_constraints('events')
+    }
+
+    db = session_maker()
+    try:
+        experiment = ExperimentService.get_experiment(db, experiment.id)
+        report = ExperimentService.build_report(db, experiment)
+        assert report['exposures'] == 4
+        assert report['exposure_events'] == 12
+        assert report['decision_rule'] == 'fixed_horizon'
+        # Running it again on an up-to-date database changes nothing.
+        command.upgrade(config, 'head')
+        assert ExperimentService.build_report(db, experiment)['exposures'] == 4
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,31 @@
+from app.core.bounded import LruTtlMap
+
+
+def test_lru_ttl_map_evicts_least_recently_used_and_expires_idle_keys():
+    now = [0.0]
+    cache: LruTtlMap[str, int] = LruTtlMap(2, ttl_seconds=10, now_fn=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1
+
+    now[0] = 8.0
+    assert cache.get('c') == 3
+    now[0] = 15.0
+    # 'a' was last read at 0s and expired; 'c' was read at 8s and is still warm.
+    assert cache.get('a') is None
+    assert cache.get('c') == 3
+    assert cache.stats()['expirations'] == 1
+
+
+def test_expire_after_write_ignores_reads():
+    now = [0.0]
+    cache: LruTtlMap[str, bool] = LruTtlMap(10, ttl_seconds=5, now_fn=lambda: now[0], touch_on_read=False)
+    cache.set('exp-1', True)
+    for tick in range(1, 5):
+        now[0] = float(tick)
+        assert cache.get('exp-1') is True
+    now[0] = 5.5
+    assert cache.get('exp-1') is None
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.core.comparisons import adjust_p_values, compare_arms, dunnett_critical_value
+from app.core.statistics import two_sided_critical_value
+
+
+def test_dunnett_critical_value_matches_published_table():
+    assert dunnett_critical_value(2, 0.5, 0.05) == pytest.approx(2.212, abs=1e-3)
+    assert dunnett_critical_value(4, 0.5, 0.05) == pytest.approx(2.442, abs=1e-3)
+    assert dunnett_critical_value(1, 0.5, 0.05) == pytest.approx(1.96, abs=1e-3)
+
+
+def test_adjust_p_values_holm_and_bh():
+    p_values = [0.01, 0.04, 0.03, 0.2]
+    assert np.allclose(adjust_p_values(p_values, 'holm'), [0.04, 0.09, 0.09, 0.2])
+    assert np.allclose(adjust_p_values(p_values, 'bh'), [0.04, 0.053333, 0.053333, 0.2], atol=1e-6)
+    assert np.allclose(adjust_p_values(p_values, 'bonferroni'), [0.04, 0.16, 0.12, 0.8])
+    with pytest.raises(ValueError):
+        adjust_p_values(p_values, 'unknown')
+
+
+def test_compare_arms_evaluates_metric_by_arm_grid_in_one_pass():
+    conversions = np.array([[100, 150, 110, 90, 120], [40, 40, 60, 40, 41]])
+    exposures = np.full((2, 5), 1000)
+
+    result = compare_arms(conversions, exposures, correction='holm')
+
+    assert result.p_value.shape == (2, 4)
+    assert np.all(result.adjusted_p_value >= result.p_value)
+    assert np.all(result.critical_value > 1.96)
+    matrix = result.matrix('uplift', 5)
+    assert matrix.shape == (2, 5, 5)
+    assert matrix[0, 1, 0] == pytest.approx(0.05)
+    assert np.isnan(matrix[0, 0, 1])
+
+
+def test_compare_arms_all_pairs_handles_empty_arm():
+    result = compare_arms([100, 150, 0], [1000, 1000, 0], all_pairs=True, correction='bonferroni')
+
+    assert list(zip(result.treatment_index, result.reference_index)) == [(1, 0), (2, 0), (2, 1)]
+    assert result.p_value[0] < 0.01
+    assert result.p_value[1] == 1.0
+    assert result.ci_lower[2] == 0.0 and result.ci_upper[2] == 0.0
+
+
+def test_bh_intervals_are_false_coverage_rate_adjusted():
+    conversions = np.array([[100, 160, 150, 105], [100, 101, 99, 100]])
+    exposures = np.full((2, 4), 1000)
+
+    bh = compare_arms(conversions, exposures, correction='bh')
+    holm = compare_arms(conversions, exposures, correction='holm')
+
+    # Two of three arms are BH discoveries on the first metric; none on the second.
+    assert (bh.adjusted_p_value <= 0.05).sum(axis=-1).tolist() == [2, 0]
+    assert bh.critical_value[0] == pytest.approx(float(two_sided_critical_value(0.05 * 2 / 3)))
+    assert bh.critical_value[1] == pytest.approx(float(two_sided_critical_value(0.05 / 3)))
+    assert bh.critical_value[0] < holm.critical_value[0]
+    std_error = np.sqrt(0.1 * 0.9 / 1000 + 0.16 * 0.84 / 1000)
+    assert bh.ci_upper[0, 0] - bh.uplift[0, 0] == pytest.approx(bh.critical_value[0] * std_error)
@@ -0,0 +1,49 @@
+import time
+
+from app.db.routing import ReplicaRouter
+from app.db.session import build_sessionmaker
+
+
+def _router(tmp_path, replica_path=None, **kwargs):
+    primary, _ = build_sessionmaker(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica, replica_engine = build_sessionmaker(f'sqlite:///{replica_path or tmp_path / "replica.db"}', read_only=True)
+    return ReplicaRouter(primary, replica, replica_engine, **kwargs), primary, replica
+
+
+def test_reads_use_replica_only_within_staleness_tolerance(tmp_path):
+    router, primary, replica = _router(tmp_path, max_lag_seconds=5.0)
+    # Until the first probe the replica's freshness is unknown, so reads stay on the primary.
+    assert router.read_session_maker() is primary
+
+    assert router.probe() == 0.0
+    assert router.read_session_maker() is replica
+    session = router.read_session()
+    assert session.info['read_only'] is True
+    session.close()
+
+    router.lag_seconds = 12.0
+    assert router.read_session_maker() is primary
+    status = router.status()
+    assert status['replica_in_use'] is False
+    assert status['replica_reads'] == 2 and status['primary_fallbacks'] == 2
+    router.replica_engine.dispose()
+
+
+def test_unreachable_or_unmonitored_replica_falls_back_to_primary(tmp_path):
+    router, primary, _ = _router(tmp_path, replica_path=tmp_path / 'missing' / 'replica.db')
+    assert router.probe() is None
+    assert router.read_session_maker() is primary
+
+    healthy, healthy_primary, replica = _router(tmp_path, check_interval_seconds=0.01)
+    healthy.probe()
+    assert healthy.read_session_maker() is replica
+    time.sleep(1.1)
+    assert healthy.read_session_maker() is healthy_primary
+
+
+def test_without_replica_reads_go_to_primary_without_fallback_noise(tmp_path):
+    primary, _ = build_sessionmaker(f"sqlite:///{tmp_path / 'primary.db'}")
+    router = ReplicaRouter(primary)
+    assert router.probe() is None
+    assert router.read_session_maker() is primary
+    assert router.status()['primary_fallbacks'] == 0
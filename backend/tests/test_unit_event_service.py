@@ -1,6 +1,14 @@
+import json
+
+import pytest
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.api.v1.events import _EXPOSURE_COLUMNS, _EXPOSURE_ROWS, _EXPOSURE_SINGLE, _parse_body
 from app.db.init_db import init_db
 from app.db.session import build_sessionmaker
-from app.schemas.event import EventCreate
+from app.schemas.event import EventCreate, ExposureEventCreate, MetricColumnBatch
 from app.schemas.experiment import ExperimentCreate
 from app.services.event_service import EventService
 from app.services.experiment_service import ExperimentService
@@ -41,3 +49,124 @@ def test_serialize_event_returns_context_json_dict(tmp_path):
     finally:
         db.close()
         engine.dispose()
+
+
+def test_metric_columns_ingest_one_event_per_unit_and_drop_repeated_keys(tmp_path):
+    session_maker, engine = build_sessionmaker(f'sqlite:///{tmp_path / "columns.db"}')
+    init_db(engine)
+
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Columnar Ingestion',
+                description='Columnar batches become one event row per unit',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5, 'config_json': {}},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5, 'config_json': {}},
+                ],
+            ),
+        )
+        batch = MetricColumnBatch.model_validate(
+            {
+                'groups': [
+                    {
+                        'experiment_id': experiment.id,
+                        'variant_key': 'treatment',
+                        'metric_name': 'gmv',
+                        'unit_ids': ['unit-1', 'unit-2', 'unit-2'],
+                        'values': [1.5, 2.5, 2.5],
+                        'ts': ['2026-01-01T00:00:00Z', None, None],
+                        'idempotency_keys': ['k-1', 'k-2', 'k-2'],
+                    }
+                ]
+            }
+        )
+        events = EventService.ingest_metric_columns(db, batch)
+
+        assert [(event.user_id, event.value, event.metric_name) for event in events] == [
+            ('unit-1', 1.5, 'gmv'),
+            ('unit-2', 2.5, 'gmv'),
+        ]
+        assert {event.variant_id for event in events} == {experiment.variants[1].id}
+        assert events[0].observed_at.year == 2026
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_columnar_batches_reject_misaligned_columns():
+    with pytest.raises(ValidationError, match='values has 1 entries, expected 2'):
+        group = {'experiment_id': 'e', 'variant_key': 'v', 'metric_name': 'm', 'unit_ids': ['a', 'b'], 'values': [1]}
+        MetricColumnBatch.model_validate({'groups': [group]})
+
+
+def test_exposure_rows_resolve_each_variant_once(tmp_path, monkeypatch):
+    session_maker, engine = build_sessionmaker(f'sqlite:///{tmp_path / "rows.db"}')
+    init_db(engine)
+
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Row Ingestion',
+                description='JSON batches map validated dicts straight onto events',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5, 'config_json': {}},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5, 'config_json': {}},
+                ],
+            ),
+        )
+        lookups = []
+        resolve = EventService._resolve_variant
+        monkeypatch.setattr(
+            EventService, '_resolve_variant', staticmethod(lambda *args: lookups.append(args[1:]) or resolve(*args))
+        )
+        body = json.dumps(
+            [
+                {'experiment_id': experiment.id, 'unit_id': f'unit-{index}', 'variant_key': key}
+                for index, key in enumerate(['control', 'treatment'] * 25)
+            ]
+        ).encode()
+        events = EventService.ingest_exposure_rows(db, _EXPOSURE_ROWS.validate_json(b'\n ' + body))
+
+        assert len(events) == 50
+        assert sorted(lookups) == [(experiment.id, 'control'), (experiment.id, 'treatment')]
+        assert len({event.observed_at for event in events}) == 1
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_batch_bodies_pick_one_schema_by_shape_and_content_type():
+    def request(content_type):
+        return Request({'type': 'http', 'headers': [(b'content-type', content_type.encode())]})
+
+    single = _parse_body(
+        request('application/json'),
+        b'{"experiment_id": "e", "unit_id": "u", "variant_key": "v"}',
+        _EXPOSURE_SINGLE,
+        _EXPOSURE_ROWS,
+        _EXPOSURE_COLUMNS,
+    )
+    rows = _parse_body(
+        request('application/json; charset=utf-8'),
+        b' \n[{"experiment_id": "e", "unit_id": "u", "variant_key": "v", "ts": "2026-01-01T00:00:00Z"}]',
+        _EXPOSURE_SINGLE,
+        _EXPOSURE_ROWS,
+        _EXPOSURE_COLUMNS,
+    )
+    assert isinstance(single, ExposureEventCreate)
+    assert rows[0]['unit_id'] == 'u' and rows[0]['ts'].year == 2026
+
+    with pytest.raises(RequestValidationError) as raised:
+        _parse_body(
+            request('application/json'),
+            b'[{"experiment_id": "e"}]',
+            _EXPOSURE_SINGLE,
+            _EXPOSURE_ROWS,
+            _EXPOSURE_COLUMNS,
+        )
+    assert raised.value.errors()[0]['loc'][:2] == ('body', 0)
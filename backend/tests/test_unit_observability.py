@@ -0,0 +1,84 @@
+import threading
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from starlette.requests import Request
+
+from app.core.observability import (
+    InMemoryRequestMetrics,
+    instrument_engine,
+    stop_tracking_request_db,
+    track_request_db,
+)
+from app.middleware.request_context import route_template
+
+
+def test_metrics_merge_per_thread_shards_into_route_histograms():
+    metrics = InMemoryRequestMetrics(latency_buckets=[0.1, 0.01, 1.0])
+    route = '/api/v1/experiments/{experiment_id}/report'
+
+    def worker(index: int) -> None:
+        for _ in range(100):
+            metrics.record('GET', f'/api/v1/experiments/exp-{index}/report', 200, 50.0, route=route, db_queries=3)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.record('POST', '/api/v1/assignments', 503, 2500.0, route='/api/v1/assignments', db_duration_ms=20.0)
+    metrics.request_started('GET', route)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['total_requests'] == 401
+    assert snapshot['total_server_errors'] == 1
+    assert snapshot['status_counts'] == {'200': 400, '503': 1}
+    assert snapshot['in_flight'] == 1
+    # Four distinct experiment IDs still collapse into one endpoint key.
+    assert snapshot['top_endpoints'][0] == {'endpoint': f'GET {route}', 'count': 400}
+
+    lines = metrics.render_prometheus()
+    labels = f'method="GET",route="{route}"'
+    assert f'litmus_http_requests_total{{{labels},status="200"}} 400' in lines
+    assert f'litmus_http_request_duration_seconds_bucket{{{labels},le="0.01"}} 0' in lines
+    assert f'litmus_http_request_duration_seconds_bucket{{{labels},le="0.1"}} 400' in lines
+    assert f'litmus_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 400' in lines
+    assert f'litmus_http_request_duration_seconds_count{{{labels}}} 400' in lines
+    assert f'litmus_http_request_db_queries_bucket{{{labels},le="2.0"}} 0' in lines
+    assert f'litmus_http_request_db_queries_bucket{{{labels},le="5.0"}} 400' in lines
+    assert f'litmus_http_requests_in_flight{{{labels}}} 1' in lines
+    slow = 'method="POST",route="/api/v1/assignments"'
+    assert f'litmus_http_request_duration_seconds_bucket{{{slow},le="1.0"}} 0' in lines
+    assert f'litmus_http_request_db_duration_seconds_sum{{{slow}}} 0.02' in lines
+
+
+def test_instrumented_engine_attributes_queries_to_the_tracked_request():
+    engine = create_engine('sqlite:///:memory:', future=True)
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+        stats, token = track_request_db()
+        try:
+            for _ in range(3):
+                connection.execute(text('SELECT 1'))
+        finally:
+            stop_tracking_request_db(token)
+        connection.execute(text('SELECT 1'))
+    engine.dispose()
+    assert stats.queries == 3
+    assert stats.duration_seconds > 0
+
+
+def test_route_template_resolves_path_parameters():
+    app = FastAPI()
+
+    @app.get('/experiments/{experiment_id}/report')
+    def report(experiment_id: str):
+        return {}
+
+    def request(method: str, path: str) -> Request:
+        return Request({'type': 'http', 'method': method, 'path': path, 'app': app, 'headers': [], 'query_string': b''})
+
+    assert route_template(request('GET', '/experiments/abc/report')) == '/experiments/{experiment_id}/report'
+    assert route_template(request('POST', '/experiments/abc/report')) == '/experiments/{experiment_id}/report'
+    assert route_template(request('GET', '/experiments/abc')) == 'unmatched'
@@ -0,0 +1,38 @@
+from sqlalchemy import create_engine, text
+
+from app.core.observability import instrument_engine, stop_tracking_request_db, track_request_db
+from app.core.profiling import slow_request_report
+
+
+def test_sampled_request_profile_groups_statements_and_explains_selects(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}", future=True)
+    instrument_engine(engine)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)'))
+
+    unsampled, token = track_request_db()
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+    stop_tracking_request_db(token)
+    assert unsampled.queries == 1 and unsampled.profile is None
+
+    stats, token = track_request_db(profile=True)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text('INSERT INTO items (name) VALUES (:name)'), [{'name': 'a'}, {'name': 'b'}])
+            for item_id in range(5):
+                connection.execute(text('SELECT name FROM items WHERE id = :id'), {'id': item_id})
+    finally:
+        stop_tracking_request_db(token)
+
+    assert stats.queries == 6
+    assert len(stats.profile.statements) == 2
+    report = slow_request_report(stats.profile, top_queries=5, explain=True)
+    by_statement = {entry['statement']: entry for entry in report}
+    select = by_statement['SELECT name FROM items WHERE id = ?']
+    assert select['count'] == 5
+    assert any('items' in line for line in select['plan'])
+    assert by_statement['INSERT INTO items (name) VALUES (?)']['plan'] is None
+
+    assert len(slow_request_report(stats.profile, top_queries=1, explain=False)) == 1
+    engine.dispose()
@@ -1,4 +1,12 @@
-from app.core.rate_limit import InMemoryRateLimiter
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.deps import enforce_ingestion_quota, rate_limit_identity
+from app.config import settings
+from app.core.rate_limit import InMemoryRateLimiter, RedisRateLimiter, more_constrained, rate_limit_headers
+from app.middleware.request_context import rate_limit_class
 
 
 def test_rate_limiter_blocks_after_limit():
@@ -24,3 +32,150 @@ def test_rate_limiter_resets_after_window():
     assert limiter.allow('k', limit=1, window_seconds=10, now_fn=now_fn) is False
     now[0] = 111.0
     assert limiter.allow('k', limit=1, window_seconds=10, now_fn=now_fn) is True
+
+
+def test_rate_limiter_keys_are_bounded_and_expire_after_window():
+    limiter = InMemoryRateLimiter(max_keys=3)
+    now = [100.0]
+
+    def now_fn():
+        return now[0]
+
+    for client in range(5):
+        assert limiter.allow(f'client-{client}:/api/v1/assignments', limit=1, window_seconds=60, now_fn=now_fn)
+    stats = limiter.stats()
+    assert stats['entries'] == 3 and stats['evictions'] == 2
+
+    # The most recent client is still tracked; the oldest ones were evicted.
+    assert limiter.allow('client-4:/api/v1/assignments', limit=1, window_seconds=60, now_fn=now_fn) is False
+
+    now[0] = 161.0
+    assert limiter.allow('client-9:/api/v1/assignments', limit=1, window_seconds=60, now_fn=now_fn) is True
+    assert limiter.stats()['entries'] == 1
+
+
+def test_token_bucket_refills_continuously_and_reports_retry_after():
+    limiter = InMemoryRateLimiter()
+
+    first = limiter.check('k', limit=60, window_seconds=60, cost=60, now=100.0)
+    assert first.allowed is True and first.remaining == 0
+    blocked = limiter.check('k', limit=60, window_seconds=60, cost=5, now=100.0)
+    assert blocked.allowed is False
+    assert blocked.retry_after_seconds == pytest.approx(5.0)
+
+    # One token per second comes back, not the whole window at once.
+    assert limiter.check('k', limit=60, window_seconds=60, cost=5, now=105.0).allowed is True
+    assert limiter.check('k', limit=60, window_seconds=60, cost=1, now=105.0).allowed is False
+
+
+def test_batch_cost_larger_than_capacity_is_charged_in_full_as_debt():
+    limiter = InMemoryRateLimiter()
+
+    # A full bucket admits the oversized batch, but all 50 windows' worth of items are owed.
+    first = limiter.check('k', limit=10, window_seconds=60, cost=500, now=100.0)
+    assert first.allowed is True and first.remaining == -490
+    assert first.reset_after_seconds == pytest.approx(50 * 60.0)
+
+    decision = limiter.check('k', limit=10, window_seconds=60, cost=1, now=100.0)
+    assert decision.allowed is False and decision.retry_after_seconds == pytest.approx(491 * 6.0)
+    assert rate_limit_headers(decision)['X-RateLimit-Remaining'] == '0'
+    assert limiter.check('k', limit=10, window_seconds=60, cost=500, now=100.0 + 49 * 60).allowed is False
+    # The debt survives idle time longer than one window, then the bucket admits the next batch.
+    assert limiter.check('k', limit=10, window_seconds=60, cost=500, now=100.0 + 50 * 60).allowed is True
+
+
+def test_redis_limiter_falls_back_to_local_buckets_when_unreachable():
+    limiter = RedisRateLimiter('redis://127.0.0.1:1/0')
+
+    assert limiter.check('k', limit=1, window_seconds=60).allowed is True
+    assert limiter.check('k', limit=1, window_seconds=60).allowed is False
+    assert limiter.stats()['degraded'] is True
+
+
+def test_ingestion_quota_charges_batches_per_item_and_per_experiment():
+    request = SimpleNamespace(
+        headers={'Authorization': 'Bearer sdk-token'},
+        client=None,
+        state=SimpleNamespace(),
+        app=SimpleNamespace(state=SimpleNamespace(rate_limiter=InMemoryRateLimiter())),
+    )
+    previous = settings.ingestion_items_per_minute, settings.experiment_events_per_minute
+    settings.ingestion_items_per_minute, settings.experiment_events_per_minute = 100, 30
+    try:
+        enforce_ingestion_quota(request, ['exp-a'] * 30 + ['exp-b'] * 30)
+        with pytest.raises(HTTPException) as exc_info:
+            enforce_ingestion_quota(request, ['exp-a'])
+        assert exc_info.value.status_code == 429
+        assert int(exc_info.value.headers['Retry-After']) >= 1
+        assert request.state.rate_limit_decision.allowed is False
+        assert rate_limit_identity(request).startswith('token:')
+        assert 'sdk-token' not in rate_limit_identity(request)
+    finally:
+        settings.ingestion_items_per_minute, settings.experiment_events_per_minute = previous
+
+
+def test_ingestion_quota_denied_by_an_experiment_leaves_the_caller_bucket_untouched():
+    limiter = InMemoryRateLimiter()
+    request = SimpleNamespace(
+        headers={'Authorization': 'Bearer sdk-token'},
+        client=None,
+        state=SimpleNamespace(),
+        app=SimpleNamespace(state=SimpleNamespace(rate_limiter=limiter)),
+    )
+    previous = settings.ingestion_items_per_minute, settings.experiment_events_per_minute
+    settings.ingestion_items_per_minute, settings.experiment_events_per_minute = 100, 30
+    try:
+        enforce_ingestion_quota(request, ['exp-hot'] * 30)
+        for _ in range(5):
+            with pytest.raises(HTTPException) as exc_info:
+                enforce_ingestion_quota(request, ['exp-hot'] * 10)
+            assert int(exc_info.value.headers['Retry-After']) == 20
+
+        # Only the first, admitted batch was charged to the caller.
+        items = limiter.check(f'items:{rate_limit_identity(request)}', 100, 60, cost=0)
+        assert items.remaining == 70
+    finally:
+        settings.ingestion_items_per_minute, settings.experiment_events_per_minute = previous
+
+
+def test_redis_limiter_checks_every_bucket_in_one_script_call():
+    limiter = RedisRateLimiter('redis://127.0.0.1:1/0')
+    calls = []
+
+    def script(keys, args):
+        calls.append((keys, args))
+        return [[0, '95', 0, 3000], [0, '-2', 18000, 36000]]
+
+    limiter._script = script
+    items, experiment = limiter.check_all([('items:a', 100, 5), ('experiment:x', 10, 30)], 60)
+
+    assert calls == [
+        (['litmus:ratelimit:items:a', 'litmus:ratelimit:experiment:x'], [100, 60000, 5.0, 5.0, 10, 60000, 30.0, 10.0])
+    ]
+    assert items.allowed is False and items.remaining == 95
+    assert experiment.retry_after_seconds == 18.0
+    assert more_constrained(experiment, items) is experiment
+
+
+def test_rate_limit_headers_expose_remaining_and_retry_after():
+    limiter = InMemoryRateLimiter()
+    allowed = limiter.check('k', limit=10, window_seconds=60, cost=4, now=100.0)
+    denied = limiter.check('k', limit=10, window_seconds=60, cost=8, now=100.0)
+
+    assert rate_limit_headers(allowed) == {
+        'X-RateLimit-Limit': '10',
+        'X-RateLimit-Remaining': '6',
+        'X-RateLimit-Reset': '24',
+    }
+    assert rate_limit_headers(denied)['Retry-After'] == '12'
+    assert more_constrained(allowed, denied) is denied
+
+
+def test_route_classes_separate_assignment_ingestion_and_admin_writes():
+    def request(method, path):
+        return SimpleNamespace(method=method, url=SimpleNamespace(path=path))
+
+    assert rate_limit_class(request('POST', '/api/v1/assignments/assign')) == 'assignment'
+    assert rate_limit_class(request('POST', '/api/v1/events/exposure')) == 'ingestion'
+    assert rate_limit_class(request('POST', '/api/v1/experiments/exp-1/launch')) == 'admin'
+    assert rate_limit_class(request('GET', '/api/v1/experiments/exp-1/report')) is None
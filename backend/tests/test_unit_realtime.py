@@ -0,0 +1,354 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+from app.api.deps import require_write_access
+from app.api.v1 import events as events_api
+from app.core import realtime
+from app.core.realtime import (
+    RUNNING_CHANNEL,
+    EventFirehose,
+    ExperimentBroadcaster,
+    IngestionNotifier,
+    LiveSubscription,
+    TailFilter,
+    build_frame,
+    json_patch,
+)
+
+
+def test_broadcaster_shares_one_computation_across_subscribers():
+    calls = []
+    worker_threads = set()
+
+    def compute(experiment_id: str) -> dict:
+        calls.append(experiment_id)
+        worker_threads.add(threading.get_ident())
+        return {'experiment_id': experiment_id, 'exposures': len(calls)}
+
+    async def scenario():
+        broadcaster = ExperimentBroadcaster(compute, min_interval_seconds=0.01, refresh_seconds=60)
+        broadcaster.start()
+        queues = [broadcaster.subscribe('exp-1') for _ in range(10)]
+        first = await asyncio.gather(*(asyncio.wait_for(queue.get(), 1) for queue in queues))
+        assert {frame.seq for frame in first} == {1}
+        assert broadcaster.computations == 1
+
+        # A burst of ingestion notifications coalesces into a single recompute.
+        notifier = IngestionNotifier(broadcaster)
+        for _ in range(25):
+            notifier.publish(['exp-1', 'exp-unwatched'])
+        second = await asyncio.gather(*(asyncio.wait_for(queue.get(), 1) for queue in queues))
+        assert {frame.seq for frame in second} == {2}
+        await asyncio.sleep(0.05)
+        assert broadcaster.computations == 2
+
+        late = broadcaster.subscribe('exp-1')
+        assert late.get_nowait().document == {'experiment_id': 'exp-1', 'exposures': 2}
+
+        for queue in queues + [late]:
+            broadcaster.unsubscribe('exp-1', queue)
+        assert broadcaster.subscriber_count('exp-1') == 0
+        await broadcaster.stop()
+
+    asyncio.run(scenario())
+    assert calls == ['exp-1', 'exp-1']
+    assert threading.get_ident() not in worker_threads
+
+
+def test_broadcaster_survives_failed_computation():
+    attempts = []
+
+    def compute(experiment_id: str) -> dict:
+        attempts.append(experiment_id)
+        if len(attempts) == 1:
+            raise RuntimeError('database unavailable')
+        return {'status': 'ok'}
+
+    async def scenario():
+        broadcaster = ExperimentBroadcaster(compute, min_interval_seconds=0.01, refresh_seconds=60)
+        broadcaster.start()
+        queue = broadcaster.subscribe('exp-2')
+        await asyncio.sleep(0.05)
+        assert queue.empty()
+        broadcaster.notify(['exp-2'])
+        assert (await asyncio.wait_for(queue.get(), 1)).document == {'status': 'ok'}
+        await broadcaster.stop()
+
+    asyncio.run(scenario())
+
+
+def test_frames_send_snapshot_then_patches_and_skip_unchanged_reports():
+    report = {
+        'p_value': 0.2,
+        'last_updated_at': '2026-01-01T00:00:00',
+        'variant_performance': [{'variant_id': 'a', 'post_exposures': 10}, {'variant_id': 'b', 'post_exposures': 12}],
+        'bandit_state': {'a/b': 1},
+    }
+    first = build_frame('exp-1', None, report)
+    assert first.seq == 1 and first.patch is None
+    assert json.loads(first.message_after(None)) == {'type': 'snapshot', 'channel': 'exp-1', 'seq': 1, 'data': report}
+
+    # Only the volatile timestamp moved, so the tick is skipped entirely.
+    assert build_frame('exp-1', first, {**report, 'last_updated_at': '2026-01-01T00:00:02'}) is None
+
+    changed = {
+        **report,
+        'p_value': 0.04,
+        'variant_performance': [{'variant_id': 'a', 'post_exposures': 10}, {'variant_id': 'b', 'post_exposures': 15}],
+        'bandit_state': {},
+    }
+    second = build_frame('exp-1', first, changed)
+    patch = json.loads(second.message_after(1))
+    assert patch['type'] == 'patch' and patch['seq'] == 2 and patch['base_seq'] == 1
+    ops = {op['path']: op for op in patch['ops']}
+    assert ops['/p_value'] == {'op': 'replace', 'path': '/p_value', 'value': 0.04}
+    assert ops['/variant_performance/1/post_exposures']['value'] == 15
+    assert ops['/bandit_state/a~1b'] == {'op': 'remove', 'path': '/bandit_state/a~1b'}
+    assert '/variant_performance/0/post_exposures' not in ops
+
+    # A socket that missed a version gets a full snapshot instead of a patch it cannot apply.
+    assert json.loads(second.message_after(None))['type'] == 'snapshot'
+    assert json.loads(second.message_after(0))['type'] == 'snapshot'
+
+
+def test_json_patch_replaces_lists_that_change_length():
+    assert json_patch({'arms': [1, 2]}, {'arms': [1, 2, 3]}) == [{'op': 'replace', 'path': '/arms', 'value': [1, 2, 3]}]
+    assert json_patch({'a': 1}, {'a': 1, 'b': 2}) == [{'op': 'add', 'path': '/b', 'value': 2}]
+
+
+def test_one_subscription_multiplexes_channels_and_running_view_follows_any_ingestion():
+    versions: dict[str, int] = {}
+
+    def compute(channel: str) -> dict:
+        return {'channel': channel, 'version': versions.get(channel, 0)}
+
+    async def scenario():
+        broadcaster = ExperimentBroadcaster(
+            compute, min_interval_seconds=0.01, refresh_seconds=60, running_min_interval_seconds=0.01
+        )
+        broadcaster.start()
+        inbox = LiveSubscription()
+        other = LiveSubscription()
+        for channel in ('exp-a', 'exp-b', RUNNING_CHANNEL):
+            broadcaster.subscribe(channel, inbox)
+        broadcaster.subscribe('exp-a', other)
+        received = {(await asyncio.wait_for(inbox.get(), 1)).channel for _ in range(3)}
+        assert received == {'exp-a', 'exp-b', RUNNING_CHANNEL}
+        assert (await asyncio.wait_for(other.get(), 1)).channel == 'exp-a'
+        assert broadcaster.computations == 3
+
+        versions.update({'exp-b': 1, RUNNING_CHANNEL: 1})
+        broadcaster.notify(['exp-b'])
+        updated = {(await asyncio.wait_for(inbox.get(), 1)).channel for _ in range(2)}
+        assert updated == {'exp-b', RUNNING_CHANNEL}
+        await asyncio.sleep(0.05)
+        assert inbox.empty()
+
+        broadcaster.unsubscribe('exp-a', inbox)
+        assert broadcaster.subscriber_count('exp-a') == 1
+        broadcaster.unsubscribe('exp-a', other)
+        assert broadcaster.subscriber_count('exp-a') == 0
+        await broadcaster.stop()
+
+    asyncio.run(scenario())
+
+
+def test_running_view_is_throttled_separately_from_experiment_channels():
+    calls: dict[str, int] = {}
+
+    def compute(channel: str) -> dict:
+        calls[channel] = calls.get(channel, 0) + 1
+        return {'channel': channel, 'version': calls[channel]}
+
+    async def scenario():
+        broadcaster = ExperimentBroadcaster(
+            compute, min_interval_seconds=0.01, refresh_seconds=60, running_min_interval_seconds=0.5
+        )
+        broadcaster.start()
+        inbox = LiveSubscription()
+        for channel in ('exp-a', RUNNING_CHANNEL):
+            broadcaster.subscribe(channel, inbox)
+        await asyncio.sleep(0.05)
+
+        # A steady stream of ingestion keeps the experiment channel current but recomputes the
+        # running view only once its own interval has passed.
+        for _ in range(10):
+            broadcaster.notify(['exp-a'])
+            await asyncio.sleep(0.03)
+        assert calls['exp-a'] >= 5
+        assert calls[RUNNING_CHANNEL] == 1
+        await asyncio.sleep(0.4)
+        assert calls[RUNNING_CHANNEL] == 2
+        await broadcaster.stop()
+
+    asyncio.run(scenario())
+
+
+def test_firehose_filters_and_drops_instead_of_blocking():
+    def record(idx: int, **overrides) -> dict:
+        base = {
+            'experiment_id': 'exp-t',
+            'unit_id': f'u-{idx}',
+            'variant_id': 'v-treatment',
+            'variant_key': 'treatment',
+            'event_type': 'metric',
+            'metric_name': 'revenue',
+        }
+        return {**base, **overrides}
+
+    async def scenario():
+        firehose = EventFirehose(max_queue_size=3)
+        firehose.start()
+        revenue = firehose.subscribe('exp-t', TailFilter(variant='treatment', metric_name='revenue'))
+        exposures = firehose.subscribe('exp-t', TailFilter(event_type='exposure'))
+        sampled_out = firehose.subscribe('exp-t', TailFilter(sample_rate=1e-9))
+        notifier = IngestionNotifier(ExperimentBroadcaster(lambda channel: {}), firehose=firehose)
+        assert notifier.is_tailed('exp-t')
+        assert not notifier.is_tailed('exp-other')
+
+        notifier.publish_events(
+            [record(idx) for idx in range(5)]
+            + [record(5, variant_key='control', variant_id='v-control'), record(6, event_type='exposure', metric_name=None)]
+            + [record(7, experiment_id='exp-other')]
+        )
+        await asyncio.sleep(0.01)
+
+        assert [revenue.queue.get_nowait()['unit_id'] for _ in range(3)] == ['u-0', 'u-1', 'u-2']
+        assert revenue.dropped == 2 and revenue.delivered == 3
+        assert exposures.queue.get_nowait()['unit_id'] == 'u-6'
+        assert exposures.queue.empty()
+        assert sampled_out.queue.empty()
+
+        for subscription in (revenue, exposures, sampled_out):
+            firehose.unsubscribe(subscription)
+        assert not firehose.has_subscribers('exp-t')
+
+    asyncio.run(scenario())
+
+
+def test_event_tail_requires_write_access():
+    route = next(route for route in events_api.router.routes if route.path == '/events/tail/{experiment_id}')
+
+    assert require_write_access in [dependency.call for dependency in route.dependant.dependencies]
+
+
+def test_busy_tail_keeps_refreshing_its_activity_key(monkeypatch):
+    monkeypatch.setattr(events_api, 'FIREHOSE_ACTIVE_REFRESH_SECONDS', 0.02)
+
+    async def scenario():
+        firehose = EventFirehose()
+        firehose.start()
+        marks = []
+        notifier = SimpleNamespace(mark_tailed=marks.append)
+        state = SimpleNamespace(event_firehose=firehose, ingestion_notifier=notifier)
+        response = await events_api.tail_events(
+            'exp-busy', SimpleNamespace(app=SimpleNamespace(state=state)), None, None, None, sample_rate=1.0
+        )
+        stream = response.body_iterator
+        assert await stream.__anext__() == ': tailing\n\n'
+
+        # Events arrive far more often than the keepalive timeout, so only the timer can refresh the key.
+        for idx in range(15):
+            firehose.publish([{'experiment_id': 'exp-busy', 'unit_id': f'u-{idx}', 'event_type': 'exposure'}])
+            assert (await stream.__anext__()).startswith('event: exposure')
+            await asyncio.sleep(0.01)
+        assert len(marks) >= 4 and set(marks) == {'exp-busy'}
+
+        await stream.aclose()
+        refreshed = len(marks)
+        await asyncio.sleep(0.06)
+        assert len(marks) == refreshed
+        assert not firehose.has_subscribers('exp-busy')
+
+    asyncio.run(scenario())
+
+
+def test_ingestion_listener_reconnects_with_backoff_and_reports_health(monkeypatch):
+    import redis.asyncio as aioredis
+
+    class FakePubSub:
+        def __init__(self, behaviour):
+            self.behaviour = behaviour
+
+        async def subscribe(self, channel):
+            if self.behaviour == 'refuse':
+                raise ConnectionError('connection refused')
+
+        async def psubscribe(self, pattern):
+            pass
+
+        async def listen(self):
+            yield {'type': 'subscribe', 'data': 1}
+            yield {'type': 'message', 'data': b'exp-1,exp-2'}
+            if self.behaviour == 'drop':
+                raise ConnectionError('connection reset')
+            await asyncio.Event().wait()
+
+        async def aclose(self):
+            pass
+
+    behaviours = iter(['refuse', 'refuse', 'drop', 'refuse', 'serve'])
+
+    class FakeRedis:
+        @classmethod
+        def from_url(cls, url):
+            return cls()
+
+        def pubsub(self):
+            return FakePubSub(next(behaviours))
+
+        async def aclose(self):
+            pass
+
+    monkeypatch.setattr(aioredis, 'Redis', FakeRedis)
+    monkeypatch.setattr(realtime, 'LISTENER_RETRY_INITIAL_SECONDS', 0.01)
+    delays = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(seconds):
+        delays.append(seconds)
+        await sleep(0)
+
+    monkeypatch.setattr(realtime.asyncio, 'sleep', recording_sleep)
+
+    class Broadcaster:
+        notified = []
+
+        def notify(self, ids):
+            self.notified.append(list(ids))
+
+    async def scenario():
+        # Only the listener talks to Redis here; the synchronous publisher stays unset.
+        notifier = IngestionNotifier(Broadcaster())
+        notifier._redis_url = 'redis://fake'
+        assert notifier.listener_status()['connected'] is False
+
+        listener = asyncio.create_task(notifier.listen())
+        for _ in range(100):
+            await sleep(0)
+            if notifier.listener_status()['connected'] and len(Broadcaster.notified) == 2:
+                break
+        status = notifier.listener_status()
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        return status
+
+    status = asyncio.run(scenario())
+
+    assert status == {
+        'enabled': True,
+        'connected': True,
+        'reconnects': 4,
+        'consecutive_failures': 0,
+        'last_error': 'ConnectionError: connection refused',
+    }
+    assert Broadcaster.notified == [['exp-1', 'exp-2'], ['exp-1', 'exp-2']]
+    # Jittered doubling from 0.01s; the connection that served messages restarts the backoff.
+    assert [(0.005 <= delay <= 0.01, 0.01 <= delay <= 0.02) for delay in delays] == [
+        (True, False),
+        (False, True),
+        (True, False),
+        (False, True),
+    ]
@@ -0,0 +1,63 @@
+import asyncio
+import gzip
+import json
+
+from app.middleware.request_encoding import GzipRequestMiddleware
+
+
+def _run(wrap, body: bytes, encoding: bytes | None = b'gzip', chunk_size: int = 64):
+    received = {}
+    sent = []
+
+    async def inner(scope, receive, send):
+        message = await receive()
+        received['body'] = message['body']
+        received['headers'] = dict(scope['headers'])
+
+    chunks = [body[index : index + chunk_size] for index in range(0, len(body), chunk_size)] or [b'']
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    if encoding is not None:
+        headers.append((b'content-encoding', encoding))
+    scope = {'type': 'http', 'method': 'POST', 'path': '/api/v1/events/exposure', 'headers': headers}
+    asyncio.run(wrap(inner)(scope, receive, send))
+    status = sent[0]['status'] if sent else None
+    return received, status
+
+
+def _middleware(max_body_bytes: int = 4096):
+    return lambda app: GzipRequestMiddleware(app, max_body_bytes=max_body_bytes)
+
+
+def test_gzip_bodies_are_inflated_before_routing():
+    payload = json.dumps([{'experiment_id': 'exp-1', 'unit_id': f'u{index}'} for index in range(20)]).encode()
+
+    received, status = _run(_middleware(), gzip.compress(payload))
+
+    assert status is None
+    assert received['body'] == payload
+    assert b'content-encoding' not in received['headers']
+    assert received['headers'][b'content-length'] == str(len(payload)).encode()
+
+
+def test_plain_bodies_pass_through_untouched():
+    received, _ = _run(_middleware(), b'[]', encoding=None)
+    assert received['body'] == b'[]'
+
+
+def test_oversized_or_corrupt_gzip_bodies_are_rejected():
+    _, status = _run(_middleware(max_body_bytes=1024), gzip.compress(b'x' * 10_000))
+    assert status == 413
+
+    _, status = _run(_middleware(), b'not gzip at all')
+    assert status == 400
@@ -0,0 +1,29 @@
+from app.core.sequential import SequentialState, msprt_statistics, update_sequential_state
+
+
+def test_msprt_p_value_shrinks_with_evidence_and_stays_bounded():
+    weak = msprt_statistics(uplift=0.01, variance=0.001, mixture_variance=0.0025, alpha=0.05)
+    strong = msprt_statistics(uplift=0.2, variance=0.001, mixture_variance=0.0025, alpha=0.05)
+    assert float(weak.p_value) == 1.0
+    assert 0.0 <= float(strong.p_value) < 1e-4
+    assert float(strong.half_width) > 0
+
+
+def test_sequential_state_keeps_running_minimum_and_intersection():
+    state = update_sequential_state(SequentialState(), 30, 300, 90, 300, alpha=0.05, mixture_variance=0.0025)
+    assert state.always_valid_p_value < 0.05
+    assert state.cs_lower > 0
+
+    regressed = update_sequential_state(state, 60, 600, 120, 600, alpha=0.05, mixture_variance=0.0025)
+    assert regressed.always_valid_p_value <= state.always_valid_p_value
+    assert regressed.cs_lower >= state.cs_lower
+    assert regressed.cs_upper <= state.cs_upper
+
+
+def test_sequential_state_is_unchanged_without_new_data_and_resets_on_shrink():
+    state = update_sequential_state(SequentialState(), 30, 300, 90, 300, alpha=0.05, mixture_variance=0.0025)
+    assert update_sequential_state(state, 30, 300, 90, 300, alpha=0.05, mixture_variance=0.0025) is state
+
+    reset = update_sequential_state(state, 1, 10, 1, 10, alpha=0.05, mixture_variance=0.0025)
+    assert reset.control_exposures == 10
+    assert reset.always_valid_p_value == 1.0
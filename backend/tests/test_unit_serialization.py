@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+from app.core.realtime import build_frame, report_digest
+from app.core.serialization import FastJSONResponse, dumps, to_jsonable
+from app.models.experiment import ExperimentStatus
+
+
+def test_dumps_covers_report_values_the_stdlib_encoder_rejects():
+    document = {
+        'status': ExperimentStatus.RUNNING,
+        'last_updated_at': datetime(2026, 1, 1, 12, tzinfo=timezone.utc),
+        'p_value': np.float64(0.03),
+        'exposures': np.int64(120),
+        'posterior': np.array([0.25, 0.75]),
+        'uplift_vs_control': float('nan'),
+        'budget': Decimal('1.5'),
+        1: 'variant id key',
+    }
+
+    assert json.loads(dumps(document)) == {
+        'status': 'RUNNING',
+        'last_updated_at': '2026-01-01T12:00:00+00:00',
+        'p_value': 0.03,
+        'exposures': 120,
+        'posterior': [0.25, 0.75],
+        'uplift_vs_control': None,
+        'budget': 1.5,
+        '1': 'variant id key',
+    }
+    assert dumps({'b': 1, 'a': [1]}, indent=True, sort_keys=True) == b'{\n  "a": [\n    1\n  ],\n  "b": 1\n}'
+
+
+def test_fast_response_renders_the_same_json_as_the_stock_response():
+    content = {'experiment_id': 'exp-1', 'variants': [{'key': 'contrôle', 'rate': 0.125, 'winner': False}], 'n': None}
+
+    assert json.loads(FastJSONResponse(content).body) == json.loads(JSONResponse(content).body)
+    assert FastJSONResponse(content).headers['content-type'] == 'application/json'
+
+
+def test_live_frames_are_plain_json_and_digest_ignores_key_order():
+    document = to_jsonable({'status': ExperimentStatus.RUNNING, 'rate': np.float64(0.5), 'last_updated_at': 'x'})
+    first = build_frame('exp-1', None, document)
+    second = build_frame('exp-1', first, {**document, 'rate': 0.75})
+
+    assert json.loads(first.snapshot)['data'] == {'status': 'RUNNING', 'rate': 0.5, 'last_updated_at': 'x'}
+    assert json.loads(second.patch)['ops'] == [{'op': 'replace', 'path': '/rate', 'value': 0.75}]
+    assert report_digest({'a': 1, 'b': 2}) == report_digest({'b': 2, 'a': 1})
@@ -1,10 +1,15 @@
+import numpy as np
+
 from app.core.assignment import deterministic_bucket
 from app.core.statistics import (
     calculate_sample_size,
+    calculate_sample_size_array,
     confidence_from_p_value,
     diff_in_diff,
     two_proportion_z_test,
+    two_proportion_z_test_array,
     uplift_confidence_interval,
+    uplift_confidence_interval_array,
 )
 
 
@@ -50,3 +55,34 @@ def test_diff_in_diff_works_for_pre_post_rates():
 
 def test_confidence_from_p_value():
     assert confidence_from_p_value(0.2) == 0.8
+
+
+def test_sample_size_uses_exact_quantiles_for_non_default_alpha_and_power():
+    strict = calculate_sample_size(0.1, 0.05, 0.01, 0.9)
+    default = calculate_sample_size(0.1, 0.05, 0.05, 0.8)
+    assert strict > default
+    sizes = calculate_sample_size_array(0.1, [0.05, 0.1], [0.01, 0.05], [0.9, 0.8])
+    assert sizes[0] == strict
+    assert sizes[1] == calculate_sample_size(0.1, 0.1, 0.05, 0.8)
+
+
+def test_array_z_test_matches_scalar_across_metric_arm_grid():
+    control_conversions = np.array([[100], [40]])
+    control_exposures = np.array([[1000], [500]])
+    treatment_conversions = np.array([[150, 90, 0], [55, 41, 0]])
+    treatment_exposures = np.array([[1000, 1000, 0], [500, 500, 0]])
+
+    result = two_proportion_z_test_array(
+        control_conversions, control_exposures, treatment_conversions, treatment_exposures
+    )
+    interval = uplift_confidence_interval_array(
+        control_conversions, control_exposures, treatment_conversions, treatment_exposures
+    )
+
+    assert result.p_value.shape == (2, 3)
+    scalar = two_proportion_z_test(100, 1000, 90, 1000)
+    assert np.isclose(result.p_value[0, 1], scalar.p_value)
+    scalar_ci = uplift_confidence_interval(40, 500, 55, 500)
+    assert np.isclose(interval.lower[1, 0], scalar_ci.lower)
+    assert result.p_value[0, 2] == 1.0
+    assert interval.lower[1, 2] == 0.0 and interval.upper[1, 2] == 0.0
@@ -61,5 +61,16 @@ export interface ExperimentResultsResponse {
     ci_lower: number
     ci_upper: number
     p_value: number
+    adjusted_p_value: number
+  }>
+  multiple_testing_correction: string
+  pairwise_comparisons: Array<{
+    variant_key: string
+    reference_variant_key: string
+    absolute_lift: number
+    ci_lower: number
+    ci_upper: number
+    p_value: number
+    adjusted_p_value: number
   }>
 }
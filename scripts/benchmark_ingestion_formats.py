@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Parse + insert throughput of metric batches per request format and validation path.
+
+Runs in-process against a fresh SQLite file per measurement: each round validates one encoded
+batch the way POST /api/v1/events/metric does for its Content-Type, then ingests it through
+EventService (variant lookup, idempotency check, rollups, commit). Formats:
+
+  models    JSON array validated as ``MetricEventCreate | list[MetricEventCreate]`` into models
+            (the generic FastAPI body path), then copied into ORM events
+  json      JSON array validated by the list-of-dicts fast path the endpoint uses
+  columnar  the columnar content type, produced by the SDK's own encoder
+
+Stdlib only, apart from the backend's own requirements.
+
+Example:
+    python3 scripts/benchmark_ingestion_formats.py --sizes 1000 10000 --rounds 5
+    python3 scripts/benchmark_ingestion_formats.py --formats models json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+from pydantic import TypeAdapter
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / 'backend'), str(ROOT / 'sdk' / 'python')]
+
+from app.api.v1.events import _METRIC_COLUMNS, _METRIC_ROWS  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import build_sessionmaker  # noqa: E402
+from app.schemas.event import MetricColumnBatch, MetricEventCreate  # noqa: E402
+from app.schemas.experiment import ExperimentCreate  # noqa: E402
+from app.services.event_service import EventService  # noqa: E402
+from app.services.experiment_service import ExperimentService  # noqa: E402
+from litmus.client import columnar_batch, metric_event  # noqa: E402
+
+
+FORMATS = ('models', 'json', 'columnar')
+_MODEL_UNION = TypeAdapter(MetricEventCreate | list[MetricEventCreate])
+_ADAPTERS = {'models': _MODEL_UNION, 'json': _METRIC_ROWS, 'columnar': _METRIC_COLUMNS}
+
+
+def _rows(experiment_id: str, size: int) -> list[dict]:
+    return [
+        metric_event(
+            experiment_id,
+            f'unit-{index}',
+            'treatment' if index % 2 else 'control',
+            'order_value',
+            float(index % 97),
+            '2026-01-01T12:00:00Z',
+            None,
+        )
+        for index in range(size)
+    ]
+
+
+def _measure(fmt: str, size: int, workdir: pathlib.Path, round_index: int) -> dict:
+    session_maker, engine = build_sessionmaker(f'sqlite:///{workdir / f"{fmt}-{size}-{round_index}.db"}')
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Ingestion format benchmark',
+                description='Parse and insert throughput per wire format',
+                variants=[
+                    {'key': 'control', 'name': 'Control', 'weight': 0.5},
+                    {'key': 'treatment', 'name': 'Treatment', 'weight': 0.5},
+                ],
+            ),
+        )
+        rows = _rows(experiment.id, size)
+        payload = columnar_batch(rows) if fmt == 'columnar' else rows
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+        started = time.perf_counter()
+        parsed = _ADAPTERS[fmt].validate_json(body)
+        parsed_at = time.perf_counter()
+        if isinstance(parsed, MetricColumnBatch):
+            events = EventService.ingest_metric_columns(db, parsed)
+        elif fmt == 'models':
+            events = EventService.ingest_metric_events(db, parsed)
+        else:
+            events = EventService.ingest_metric_rows(db, parsed)
+        finished = time.perf_counter()
+        assert len(events) == size, (fmt, len(events))
+        return {
+            'parse_ms': (parsed_at - started) * 1000,
+            'insert_ms': (finished - parsed_at) * 1000,
+            'bytes': len(body),
+            'gzip_bytes': len(gzip.compress(body, compresslevel=5)),
+        }
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for fmt in args.formats:
+                samples = [_measure(fmt, size, pathlib.Path(tmp), index) for index in range(args.rounds)]
+                parse_ms = statistics.median(sample['parse_ms'] for sample in samples)
+                insert_ms = statistics.median(sample['insert_ms'] for sample in samples)
+                result = {
+                    'events': size,
+                    'body_bytes': samples[0]['bytes'],
+                    'gzip_bytes': samples[0]['gzip_bytes'],
+                    'parse_ms': round(parse_ms, 1),
+                    'insert_ms': round(insert_ms, 1),
+                    'events_per_second': round(size / ((parse_ms + insert_ms) / 1000)),
+                }
+                print(f'[{fmt}] {json.dumps(result)}', flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Serialization cost of report-shaped payloads: stdlib ``json`` against the orjson path the API uses.
+
+Builds one real report (ExperimentService.build_report over a many-variant experiment with events) and
+one synthetic results document whose exposure timeseries has a point per variant per minute, then times
+each place the backend turns them into JSON:
+
+  response  rendering the validated response model (stock JSONResponse vs FastJSONResponse)
+  export    GET /experiments/{id}/export?format=json (indented)
+  snapshot  the JSON stored with each report snapshot
+  frame     a websocket frame: plain-JSON document, change digest and snapshot message
+
+Stdlib only, apart from the backend's own requirements.
+
+Example:
+    python3 scripts/benchmark_serialization.py --variants 10 --minutes 1440 10080 --rounds 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'backend'))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core.realtime import VOLATILE_FIELDS, build_frame  # noqa: E402
+from app.core.serialization import FastJSONResponse, dumps_str, to_jsonable  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import build_sessionmaker  # noqa: E402
+from app.schemas.event import EventCreate  # noqa: E402
+from app.schemas.experiment import ExperimentCreate, ExperimentReport  # noqa: E402
+from app.schemas.results import ExperimentResultsResponse  # noqa: E402
+from app.services.event_service import EventService  # noqa: E402
+from app.services.experiment_service import ExperimentService  # noqa: E402
+
+
+def _report(workdir: pathlib.Path, variants: int) -> dict:
+    session_maker, engine = build_sessionmaker(f'sqlite:///{workdir / "report.db"}')
+    init_db(engine)
+    db = session_maker()
+    try:
+        experiment = ExperimentService.create_experiment(
+            db,
+            ExperimentCreate(
+                name='Serialization benchmark',
+                description='Report payload size scales with variant count',
+                variants=[
+                    {'key': f'variant-{index}', 'name': f'Variant {index}', 'weight': 1 / variants}
+                    for index in range(variants)
+                ],
+            ),
+        )
+        for variant in experiment.variants:
+            for unit in range(40):
+                for event_type in ('exposure', 'conversion') if unit % 4 == 0 else ('exposure',):
+                    EventService.ingest_event(
+                        db,
+                        EventCreate(
+                            experiment_id=experiment.id,
+                            user_id=f'{variant.key}-{unit}',
+                            variant_id=variant.id,
+                            event_type=event_type,
+                        ),
+                    )
+        return ExperimentService.build_report(db, ExperimentService.get_experiment(db, experiment.id))
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _results(variants: int, minutes: int) -> dict:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    keys = [f'variant-{index}' for index in range(variants)]
+    return {
+        'experiment_id': 'benchmark',
+        'generated_at': start,
+        'exposure_totals': {key: minutes * 3 for key in keys},
+        'exposure_timeseries': [
+            {
+                'variant_key': key,
+                'variant_name': key.title(),
+                'points': [
+                    {'bucket_start': start + timedelta(minutes=minute), 'exposures': 3} for minute in range(minutes)
+                ],
+            }
+            for key in keys
+        ],
+        'metric_summaries': [],
+        'lift_estimates': [],
+        'multiple_testing_correction': 'holm',
+        'pairwise_comparisons': [],
+        'cuped_estimates': [],
+    }
+
+
+def _stdlib_default(value):
+    if hasattr(value, 'value'):
+        return value.value
+    return value.isoformat()
+
+
+def _stdlib_frame(document: dict) -> None:
+    # What the frame path did before: jsonable_encoder, a sort_keys digest and json.dumps of the message.
+    document = jsonable_encoder(document)
+    stable = {key: value for key, value in document.items() if key not in VOLATILE_FIELDS}
+    hashlib.sha256(json.dumps(stable, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    json.dumps({'type': 'snapshot', 'channel': 'benchmark', 'seq': 1, 'data': document})
+
+
+def _stages(document: dict, model) -> dict[str, tuple]:
+    rendered = model.model_validate(document).model_dump(mode='json')
+    return {
+        'response': (lambda: JSONResponse(rendered), lambda: FastJSONResponse(rendered)),
+        'export': (
+            lambda: json.dumps(document, indent=2, default=_stdlib_default),
+            lambda: dumps_str(document, indent=True),
+        ),
+        'snapshot': (lambda: json.dumps(document, default=_stdlib_default), lambda: dumps_str(document)),
+        'frame': (lambda: _stdlib_frame(document), lambda: build_frame('benchmark', None, to_jsonable(document))),
+    }
+
+
+def _median_ms(func, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--variants', type=int, default=10)
+    parser.add_argument('--minutes', type=int, nargs='+', default=[1440, 10080])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        documents = [('report', _report(pathlib.Path(tmp), args.variants), ExperimentReport)]
+    for minutes in args.minutes:
+        documents.append((f'results-{minutes}m', _results(args.variants, minutes), ExperimentResultsResponse))
+
+    for name, document, model in documents:
+        for stage, (stdlib, fast) in _stages(document, model).items():
+            stdlib_ms = _median_ms(stdlib, args.rounds)
+            fast_ms = _median_ms(fast, args.rounds)
+            result = {
+                'document': name,
+                'bytes': len(dumps_str(document)),
+                'stdlib_ms': round(stdlib_ms, 3),
+                'orjson_ms': round(fast_ms, 3),
+                'speedup': round(stdlib_ms / fast_ms, 1) if fast_ms else None,
+            }
+            print(f'[{stage}] {json.dumps(result)}', flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
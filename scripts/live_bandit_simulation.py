@@ -66,7 +66,11 @@ class ApiClient:
             except urllib.error.HTTPError as exc:
                 detail = exc.read().decode('utf-8')
                 if exc.code == 429 and attempt < self.max_429_retries:
+                    # Prefer the server's Retry-After; fall back to linear backoff for older servers.
+                    retry_after = exc.headers.get('Retry-After')
                     sleep_s = (self.retry_backoff_ms / 1000.0) * (attempt + 1)
+                    if retry_after and retry_after.isdigit():
+                        sleep_s = float(retry_after)
                     time.sleep(sleep_s)
                     continue
                 raise RuntimeError(f'HTTP {exc.code} {path}: {detail}') from exc
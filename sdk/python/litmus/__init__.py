@@ -1,11 +1,17 @@
+from litmus.async_client import AsyncExperimentClient
 from litmus.client import ExperimentClient, LitmusClient
 from litmus.models import Assignment, BatchIngestResult, Experiment, ExperimentReport
+from litmus.transport import HttpxTransport, PooledTransport, TransportError
 
 __all__ = [
+    'AsyncExperimentClient',
     'ExperimentClient',
     'LitmusClient',
     'Assignment',
     'BatchIngestResult',
     'Experiment',
     'ExperimentReport',
+    'HttpxTransport',
+    'PooledTransport',
+    'TransportError',
 ]
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+
+from litmus.async_transport import build_async_transport
+from litmus.buffering import EventBuffer
+from litmus.caching import STALE
+from litmus.client import EXPOSURE_PATH, METRIC_PATH, BaseExperimentClient
+from litmus.models import Assignment, BatchIngestResult, Experiment, ExperimentReport
+from litmus.transport import HttpResponse, TransportError
+
+logger = logging.getLogger('litmus')
+
+
+class AsyncExperimentClient(BaseExperimentClient):
+    """Asyncio twin of ExperimentClient for services that must never block their event loop.
+
+    Concurrent ``get_variant`` calls for the same experiment, unit and attributes share one in-flight
+    request. With ``background_flush=True`` an asyncio task flushes on batch size or every
+    ``flush_interval_seconds``, starting as soon as the client exists inside a running loop (or on
+    first log call); use it as an async context manager (or call ``aclose``) so queued events are
+    delivered on shutdown.
+    """
+
+    _build_transport = staticmethod(build_async_transport)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._coalesced = 0
+        self._sleep = asyncio.sleep
+        self._flush_lock: asyncio.Lock | None = None
+        self._wake: asyncio.Event | None = None
+        self._stopping: asyncio.Event | None = None
+        self._flusher: asyncio.Task | None = None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # Built inside a coroutine: start interval flushing now rather than on first use.
+            self._ensure_flusher()
+
+    async def __aenter__(self) -> 'AsyncExperimentClient':
+        self._ensure_flusher()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def _send(
+        self, method: str, path: str, payload=None, compress: bool = False, content_type: str = 'application/json'
+    ) -> HttpResponse:
+        url, data, headers = self._prepare(path, payload, compress, content_type)
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.transport.request(method, url, body=data, headers=headers, timeout=self.timeout)
+            except TransportError as exc:
+                await self._sleep(self._retry_delay(attempt, error=exc))
+                continue
+            if response.status < 400:
+                return response
+            await self._sleep(self._retry_delay(attempt, response=response))
+        raise RuntimeError('Request failed without a response')
+
+    async def _request(
+        self, method: str, path: str, payload: dict | list | None = None, compress: bool = False
+    ) -> dict | list:
+        return self._decode((await self._send(method, path, payload, compress=compress)).body)
+
+    async def _request_batch(self, method: str, path: str, payload: list[dict]) -> BatchIngestResult:
+        payload, content_type = self._batch_body(payload)
+        response = await self._send(method, path, payload, compress=True, content_type=content_type)
+        return self._batch_result(response.body)
+
+    async def _load_assignment(
+        self, cache_key: tuple, experiment_id: str, unit_id: str, attributes: dict | None, stale: Assignment | None
+    ) -> Assignment:
+        try:
+            payload = self._assignment_payload(experiment_id, unit_id, attributes)
+            assignment = self._assignment_from(await self._request('POST', '/assignments', payload))
+        except RuntimeError:
+            if stale is not None:
+                # A failed background refresh keeps the stale entry serving until its window closes.
+                logger.debug('Litmus background assignment refresh failed', exc_info=True)
+                return stale
+            if not self.fail_safe_enabled:
+                raise
+            assignment = self._fallback_assignment(experiment_id, unit_id)
+            self._assignment_cache.put(cache_key, assignment, fallback=True)
+            return assignment
+        self._assignment_cache.put(cache_key, assignment)
+        return assignment
+
+    def _start_load(
+        self, cache_key: tuple, experiment_id: str, unit_id: str, attributes: dict | None, stale: Assignment | None
+    ) -> asyncio.Future:
+        pending = asyncio.ensure_future(self._load_assignment(cache_key, experiment_id, unit_id, attributes, stale))
+        self._inflight[cache_key] = pending
+        pending.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        return pending
+
+    async def get_variant(self, experiment_id: str, unit_id: str, attributes: dict | None = None) -> Assignment:
+        cache_key = self._cache_key(experiment_id, unit_id, attributes)
+        cached, state = self._assignment_cache.get(cache_key)
+        if cached is not None:
+            # Stale entries are served as-is; the in-flight map doubles as the one-refresh-per-key guard.
+            if state == STALE and cache_key not in self._inflight:
+                self._start_load(cache_key, experiment_id, unit_id, attributes, cached)
+            return cached
+        pending = self._inflight.get(cache_key)
+        if pending is None:
+            pending = self._start_load(cache_key, experiment_id, unit_id, attributes, None)
+        else:
+            self._coalesced += 1
+        # Shielded so one caller being cancelled does not cancel the request the others are awaiting.
+        return await asyncio.shield(pending)
+
+    async def get_variants(
+        self, experiment_id: str, unit_ids: list[str], attributes: dict | None = None
+    ) -> list[Assignment]:
+        """Assign many units concurrently; the transport's per-host limit bounds the fan-out."""
+        return list(await asyncio.gather(*(self.get_variant(experiment_id, unit_id, attributes) for unit_id in unit_ids)))
+
+    def _ensure_flusher(self) -> None:
+        if not self.background_flush or self._flusher is not None:
+            return
+        self._wake = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._flusher = asyncio.get_running_loop().create_task(self._run_flusher())
+
+    @staticmethod
+    async def _wait(event: asyncio.Event, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_flusher(self) -> None:
+        # Stopped through _stopping rather than Task.cancel(): wait_for can swallow a cancellation that
+        # races with the event being set, which would leave aclose() waiting on a live loop.
+        while not self._stopping.is_set():
+            await self._wait(self._wake, self.flush_interval_seconds)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            if not await self._flush_quietly():
+                # Back off for a whole interval so a full buffer cannot spin against a failing backend.
+                await self._wait(self._stopping, self.flush_interval_seconds)
+
+    async def _flush_quietly(self) -> bool:
+        try:
+            await self.flush()
+        except RuntimeError:
+            self._record_failed_flush()
+            return False
+        return True
+
+    async def _batch_ready(self, flush) -> None:
+        if self._flusher is not None:
+            self._wake.set()
+        else:
+            await flush()
+
+    async def log_exposure(
+        self,
+        experiment_id: str,
+        unit_id: str,
+        variant_key: str,
+        ts: str | None = None,
+        context: dict | None = None,
+    ) -> None:
+        self._ensure_flusher()
+        if self._queue_exposure(experiment_id, unit_id, variant_key, ts, context):
+            await self._batch_ready(self.flush_exposures)
+
+    async def log_metric(
+        self,
+        experiment_id: str,
+        unit_id: str,
+        variant_key: str,
+        metric_name: str,
+        value: float,
+        ts: str | None = None,
+        context: dict | None = None,
+    ) -> None:
+        self._ensure_flusher()
+        if self._queue_metric(experiment_id, unit_id, variant_key, metric_name, value, ts, context):
+            await self._batch_ready(self.flush_metrics)
+
+    async def _replay_spool(self, path: str, results: list[BatchIngestResult]) -> None:
+        while True:
+            last_id, batch = await asyncio.to_thread(self._spool.peek, path, self.replay_batch_items)
+            if not batch:
+                return
+            # Spooled events keep their idempotency keys, so a replay cut short is safe to repeat.
+            results.append(await self._request_batch('POST', path, batch))
+            await asyncio.to_thread(self._spool.ack, path, last_id)
+            self._record_sent(len(batch))
+
+    async def _flush_buffer(self, buffer: EventBuffer, path: str) -> BatchIngestResult:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        results: list[BatchIngestResult] = []
+        async with self._flush_lock:
+            try:
+                if self._spool is not None and await asyncio.to_thread(self._spool.pending, path):
+                    # Spooled events are older than anything in memory, so they go first.
+                    await self._replay_spool(path, results)
+                for batch in self._batches(buffer):
+                    try:
+                        results.append(await self._request_batch('POST', path, batch))
+                    except BaseException:
+                        # Includes cancellation, so a flush interrupted by shutdown keeps its events.
+                        buffer.requeue(batch)
+                        raise
+                    self._record_sent(len(batch))
+            except RuntimeError:
+                if self._spool is not None:
+                    await asyncio.to_thread(self._spill_queue, path, buffer)
+                raise
+        return self._total(results)
+
+    async def flush_exposures(self) -> BatchIngestResult:
+        return await self._flush_buffer(self._exposure_buffer, EXPOSURE_PATH)
+
+    async def flush_metrics(self) -> BatchIngestResult:
+        return await self._flush_buffer(self._metric_buffer, METRIC_PATH)
+
+    async def flush(self) -> dict[str, int]:
+        exposure_result = await self.flush_exposures()
+        metric_result = await self.flush_metrics()
+        return {'exposure': exposure_result.ingested, 'metric': metric_result.ingested}
+
+    def _extra_stats(self) -> dict[str, int]:
+        return {'coalesced': self._coalesced}
+
+    async def aclose(self) -> None:
+        """Stop the flush task, deliver what is still queued and release pooled connections."""
+        if self._flusher is not None:
+            self._stopping.set()
+            self._wake.set()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+            await self._flush_quietly()
+        # Let background refreshes finish before their connections go away.
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        if self._spool is not None:
+            await asyncio.to_thread(self._spool_queues)
+        await self.transport.aclose()
+
+    async def create_experiment(self, payload: dict) -> Experiment:
+        return Experiment.from_dict(await self._request('POST', '/experiments', payload))
+
+    async def list_experiments(self) -> list[Experiment]:
+        return [Experiment.from_dict(item) for item in await self._request('GET', '/experiments')]
+
+    async def get_experiment_report(self, experiment_id: str) -> ExperimentReport:
+        return ExperimentReport.from_dict(await self._request('GET', f'/experiments/{experiment_id}/report'))
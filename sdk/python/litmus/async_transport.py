@@ -0,0 +1,225 @@
+import asyncio
+import gzip
+import ssl
+from urllib.parse import urlsplit
+
+from litmus.transport import HttpResponse, TransportError
+
+
+class _AsyncConnection:
+    __slots__ = ('reader', 'writer')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _read_response(
+    reader: asyncio.StreamReader, status_line: bytes
+) -> tuple[int, dict[str, str], bytes, bool]:
+    while True:
+        version, status, *_ = status_line.decode('latin-1').split(' ', 2)
+        status_code = int(status)
+        headers = await _read_headers(reader)
+        if not 100 <= status_code < 200 or status_code == 101:
+            break
+        # Interim responses (100 Continue, 103 Early Hints) have no body and precede the final response.
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+    # A 101 switches protocols, so whatever follows on the stream is not HTTP/1.1 any more.
+    will_close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0' or status_code == 101
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Trailers, if any, end with an empty line.
+                await _read_headers(reader)
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    elif status_code in (101, 204, 304):
+        body = b''
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        will_close = True
+    return status_code, headers, body, will_close
+
+
+class _AsyncHostPool:
+    def __init__(self, scheme: str, host: str, port: int | None, max_connections: int) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port or (443 if scheme == 'https' else 80)
+        self.slots = asyncio.Semaphore(max_connections)
+        self.idle: list[_AsyncConnection] = []
+
+    async def connect(self) -> _AsyncConnection:
+        context = ssl.create_default_context() if self.scheme == 'https' else None
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+        return _AsyncConnection(reader, writer)
+
+    def close(self) -> None:
+        idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+
+class AsyncPooledTransport:
+    """Keep-alive HTTP/1.1 over asyncio streams, pooled per host; the async twin of PooledTransport.
+
+    Pools are created on first use and bound to the running event loop.
+    """
+
+    def __init__(self, max_connections_per_host: int = 10) -> None:
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self._pools: dict[tuple[str, str, int | None], _AsyncHostPool] = {}
+
+    def _pool(self, scheme: str, host: str, port: int | None) -> _AsyncHostPool:
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _AsyncHostPool(scheme, host, port, self.max_connections_per_host)
+        return pool
+
+    async def _exchange(
+        self, pool: _AsyncHostPool, method: str, target: str, body: bytes | None, headers: dict[str, str]
+    ) -> HttpResponse:
+        while True:
+            reused = bool(pool.idle)
+            if reused:
+                connection = pool.idle.pop()
+            else:
+                try:
+                    connection = await pool.connect()
+                except OSError as exc:
+                    raise TransportError(str(exc) or exc.__class__.__name__) from exc
+            lines = [f'{method} {target} HTTP/1.1', f'Host: {pool.host}:{pool.port}']
+            lines += [f'{name}: {value}' for name, value in headers.items()]
+            lines.append(f'Content-Length: {len(body or b"")}')
+            received = False
+            try:
+                connection.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+                await connection.writer.drain()
+                status_line = await connection.reader.readline()
+                if not status_line:
+                    raise ConnectionResetError('Connection closed before a response was received')
+                received = True
+                status, response_headers, payload, will_close = await _read_response(connection.reader, status_line)
+            except asyncio.CancelledError:
+                # Timed out mid-exchange: the stream position is unknown, so the connection cannot be reused.
+                connection.close()
+                raise
+            except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+                connection.close()
+                # Only a keep-alive connection the server closed while it sat idle is safe to resend on:
+                # it fails before a single response byte. Anything else may have reached the server.
+                if reused and not received and isinstance(exc, (ConnectionResetError, BrokenPipeError)):
+                    continue
+                raise TransportError(str(exc) or exc.__class__.__name__) from exc
+            if will_close:
+                connection.close()
+            else:
+                pool.idle.append(connection)
+            if response_headers.get('content-encoding') == 'gzip':
+                payload = gzip.decompress(payload)
+            return HttpResponse(status=status, body=payload, headers=response_headers)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10,
+    ) -> HttpResponse:
+        parts = urlsplit(url)
+        target = parts.path or '/'
+        if parts.query:
+            target = f'{target}?{parts.query}'
+        pool = self._pool(parts.scheme, parts.hostname or 'localhost', parts.port)
+        headers = {'Accept-Encoding': 'gzip', **(headers or {})}
+        try:
+            await asyncio.wait_for(pool.slots.acquire(), timeout)
+        except asyncio.TimeoutError as exc:
+            raise TransportError(f'No free connection to {pool.host} within {timeout}s') from exc
+        try:
+            return await asyncio.wait_for(self._exchange(pool, method, target, body, headers), timeout)
+        except asyncio.TimeoutError as exc:
+            raise TransportError(f'Request to {pool.host} timed out after {timeout}s') from exc
+        finally:
+            pool.slots.release()
+
+    async def aclose(self) -> None:
+        pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+class AsyncHttpxTransport:
+    """Optional async transport backed by ``httpx.AsyncClient`` (``pip install httpx``)."""
+
+    def __init__(self, max_connections_per_host: int = 10) -> None:
+        try:
+            import httpx
+        except ImportError as exc:  # pragma: no cover - depends on the environment
+            raise ImportError("AsyncHttpxTransport requires httpx; install it or use transport='stdlib'") from exc
+        self._httpx = httpx
+        self._limits = httpx.Limits(
+            max_connections=max(1, max_connections_per_host),
+            max_keepalive_connections=max(1, max_connections_per_host),
+        )
+        self._clients: dict[str, object] = {}
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10,
+    ) -> HttpResponse:
+        parts = urlsplit(url)
+        origin = f'{parts.scheme}://{parts.netloc}'
+        client = self._clients.get(origin)
+        if client is None:
+            client = self._clients[origin] = self._httpx.AsyncClient(limits=self._limits)
+        try:
+            response = await client.request(method, url, content=body, headers=headers, timeout=timeout)
+        except self._httpx.HTTPError as exc:
+            raise TransportError(str(exc) or exc.__class__.__name__) from exc
+        return HttpResponse(
+            status=response.status_code,
+            body=response.content,
+            headers={name.lower(): value for name, value in response.headers.items()},
+        )
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+
+def build_async_transport(backend: str = 'stdlib', max_connections_per_host: int = 10):
+    if backend == 'httpx':
+        return AsyncHttpxTransport(max_connections_per_host)
+    if backend == 'stdlib':
+        return AsyncPooledTransport(max_connections_per_host)
+    raise ValueError(f"Unknown transport backend: {backend!r} (expected 'stdlib' or 'httpx')")
@@ -0,0 +1,77 @@
+import threading
+from collections import deque
+from collections.abc import Callable
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'spill')
+
+
+class EventBuffer:
+    """Thread-safe bounded queue of pending events for one ingestion endpoint.
+
+    When full, ``overflow_policy`` decides what gives: ``drop_oldest`` keeps the freshest events,
+    ``drop_newest`` keeps what is already queued, and ``spill`` hands the overflow to ``spill_handler``
+    (dropping it if there is none).
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        overflow_policy: str = 'drop_oldest',
+        spill_handler: Callable[[list[dict]], None] | None = None,
+    ) -> None:
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'overflow_policy must be one of {OVERFLOW_POLICIES}, got {overflow_policy!r}')
+        self.max_size = max(1, max_size)
+        self.overflow_policy = overflow_policy
+        self.spill_handler = spill_handler
+        self.dropped = 0
+        self.spilled = 0
+        self._items: deque[dict] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _overflow(self, items: list[dict]) -> None:
+        if not items:
+            return
+        spill = self.overflow_policy == 'spill' and self.spill_handler is not None
+        if spill:
+            self.spill_handler(items)
+        with self._lock:
+            if spill:
+                self.spilled += len(items)
+            else:
+                self.dropped += len(items)
+
+    def append(self, item: dict) -> int:
+        """Queue one event and return the queue length afterwards."""
+        overflow = []
+        with self._lock:
+            if len(self._items) >= self.max_size:
+                if self.overflow_policy == 'drop_oldest':
+                    overflow.append(self._items.popleft())
+                else:
+                    overflow.append(item)
+                    item = None
+            if item is not None:
+                self._items.append(item)
+            size = len(self._items)
+        # Spilling may do I/O; never while holding the lock producers append under.
+        self._overflow(overflow)
+        return size
+
+    def take(self, limit: int) -> list[dict]:
+        with self._lock:
+            return [self._items.popleft() for _ in range(min(limit, len(self._items)))]
+
+    def requeue(self, items: list[dict]) -> None:
+        """Put a failed batch back at the front, oldest first, without exceeding the bound."""
+        with self._lock:
+            room = max(0, self.max_size - len(self._items))
+            if self.overflow_policy == 'drop_oldest':
+                overflow, kept = items[: len(items) - room], items[len(items) - room :]
+            else:
+                kept, overflow = items[:room], items[room:]
+            self._items.extendleft(reversed(kept))
+        self._overflow(overflow)
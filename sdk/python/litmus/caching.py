@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from litmus.models import Assignment
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+
+def attributes_key(attributes: dict | None):
+    """Hashable identity of targeting attributes, without serializing them on every lookup.
+
+    The value's type is part of the key so ``True`` and ``1`` (equal and equally hashed in Python, but
+    different JSON) do not share an entry. Unhashable values (lists, nested dicts) fall back to a
+    canonical JSON string.
+    """
+    if not attributes:
+        return ()
+    try:
+        return frozenset((name, value.__class__, value) for name, value in attributes.items())
+    except TypeError:
+        return json.dumps(attributes, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class AssignmentCache:
+    """Size-bounded LRU of assignments with a TTL, a stale window and short-lived fallback entries.
+
+    An entry is fresh for ``ttl_seconds``; for ``stale_seconds`` after that it may still be served while
+    the client refreshes it in the background. Fail-safe assignments are cached for only
+    ``fallback_ttl_seconds`` and never served stale, so an outage is not hammered per call but recovery
+    is picked up quickly. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 30,
+        stale_seconds: float = 30,
+        fallback_ttl_seconds: float = 5,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = max(0.0, stale_seconds)
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (fresh_until, serve_until, assignment)
+        self._entries: OrderedDict[tuple, tuple[float, float, Assignment]] = OrderedDict()
+        self._refreshing: set[tuple] = set()
+        self._lock = threading.Lock()
+        self._clock = time.monotonic
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> tuple[Assignment | None, str | None]:
+        """Return ``(assignment, FRESH | STALE)``, or ``(None, None)`` on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if entry[0] > now:
+                self.hits += 1
+                return entry[2], FRESH
+            self.stale_hits += 1
+            return entry[2], STALE
+
+    def put(self, key: tuple, assignment: Assignment, fallback: bool = False) -> None:
+        now = self._clock()
+        if fallback:
+            fresh_until = serve_until = now + self.fallback_ttl_seconds
+        else:
+            fresh_until = now + self.ttl_seconds
+            serve_until = fresh_until + self.stale_seconds
+        with self._lock:
+            self._entries[key] = (fresh_until, serve_until, assignment)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def begin_refresh(self, key: tuple) -> bool:
+        """Claim the background refresh of ``key``; False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: tuple) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'cache_hits': self.hits,
+                'cache_stale_hits': self.stale_hits,
+                'cache_misses': self.misses,
+                'cache_evictions': self.evictions,
+                'cache_entries': len(self._entries),
+            }
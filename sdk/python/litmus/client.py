@@ -1,11 +1,128 @@
+import atexit
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import gzip
 import json
+import logging
+import random
+import threading
 import time
-from urllib import error, request
+import uuid
+import weakref
 
+from litmus.buffering import EventBuffer
+from litmus.caching import STALE, AssignmentCache, attributes_key
 from litmus.models import Assignment, BatchIngestResult, Experiment, ExperimentReport
+from litmus.spool import EventSpool
+from litmus.transport import HttpResponse, TransportError, build_transport
 
+logger = logging.getLogger('litmus')
+
+EXPOSURE_PATH = '/events/exposure'
+METRIC_PATH = '/events/metric'
+
+# 'columnar' sends batches grouped by experiment/variant(/metric) with per-event fields as parallel arrays.
+WIRE_FORMATS = ('json', 'columnar')
+COLUMNAR_CONTENT_TYPE = 'application/vnd.litmus.columnar+json'
+
+
+def backoff_delay(attempt: int, retry_after: str | None, base_seconds: float, max_seconds: float) -> float | None:
+    """Delay before the next attempt, or None when the server asked us to wait longer than we will."""
+    if retry_after is not None:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            delay = None
+        if delay is not None:
+            return delay if delay <= max_seconds else None
+    # Full jitter keeps a fleet of clients from retrying in lockstep after a shared failure.
+    return random.uniform(0, min(max_seconds, base_seconds * (2**attempt)))
+
+
+def encode_json_body(payload, compress: bool, gzip_min_bytes: int) -> tuple[bytes, dict[str, str]]:
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    if compress and len(data) >= gzip_min_bytes:
+        return gzip.compress(data, compresslevel=5), {'Content-Encoding': 'gzip'}
+    return data, {}
+
+
+def exposure_event(experiment_id: str, unit_id: str, variant_key: str, ts: str | None, context: dict | None) -> dict:
+    payload = {
+        'experiment_id': experiment_id,
+        'unit_id': unit_id,
+        'variant_key': variant_key,
+        'context': context or {},
+        # Lets the backend drop retried deliveries of the same event.
+        'idempotency_key': uuid.uuid4().hex,
+    }
+    if ts is not None:
+        payload['ts'] = ts
+    return payload
+
+
+def metric_event(
+    experiment_id: str,
+    unit_id: str,
+    variant_key: str,
+    metric_name: str,
+    value: float,
+    ts: str | None,
+    context: dict | None,
+) -> dict:
+    payload = {
+        'experiment_id': experiment_id,
+        'unit_id': unit_id,
+        'variant_key': variant_key,
+        'metric_name': metric_name,
+        'value': value,
+        'context': context or {},
+        # Lets the backend drop retried deliveries of the same event.
+        'idempotency_key': uuid.uuid4().hex,
+    }
+    if ts is not None:
+        payload['ts'] = ts
+    return payload
+
+
+def columnar_batch(events: list[dict]) -> dict:
+    """Regroup exposure or metric events into the backend's columnar batch layout."""
+    groups: dict[tuple, dict] = {}
+    for event in events:
+        metric_name = event.get('metric_name')
+        key = (event['experiment_id'], event['variant_key'], metric_name, event.get('period', 'post'))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'experiment_id': event['experiment_id'],
+                'variant_key': event['variant_key'],
+                'unit_ids': [],
+                'ts': [],
+                'contexts': [],
+                'idempotency_keys': [],
+            }
+            if metric_name is not None:
+                group.update(metric_name=metric_name, period=event.get('period', 'post'), values=[])
+        group['unit_ids'].append(event['unit_id'])
+        group['ts'].append(event.get('ts'))
+        group['contexts'].append(event.get('context') or None)
+        group['idempotency_keys'].append(event.get('idempotency_key'))
+        if metric_name is not None:
+            group['values'].append(event['value'])
+    for group in groups.values():
+        # Optional columns that carry nothing are left out rather than sent as arrays of nulls.
+        for column in ('ts', 'contexts', 'idempotency_keys'):
+            if all(value is None for value in group[column]):
+                del group[column]
+    return {'groups': list(groups.values())}
+
+
+class BaseExperimentClient:
+    """Configuration and the I/O-free half of a Litmus client, shared by the sync and asyncio clients.
+
+    Request building, the retry policy, batch encoding, flush planning, spooling and stats live here.
+    ExperimentClient and AsyncExperimentClient add only the transport calls and how they wait on them.
+    """
 
-class ExperimentClient:
     def __init__(
         self,
         base_url: str = 'http://localhost:8000',
@@ -17,6 +134,24 @@ class ExperimentClient:
         fail_safe_variant_key: str = 'control',
         fail_safe_config_json: dict | None = None,
         batch_size: int = 25,
+        transport=None,
+        max_connections_per_host: int = 10,
+        gzip_min_bytes: int = 1024,
+        backoff_base_seconds: float = 0.1,
+        backoff_max_seconds: float = 5.0,
+        background_flush: bool = False,
+        flush_interval_seconds: float = 5.0,
+        max_queue_size: int = 10_000,
+        max_batch_items: int = 500,
+        overflow_policy: str = 'drop_oldest',
+        spill_handler=None,
+        cache_max_entries: int = 10_000,
+        stale_while_revalidate_seconds: float = 30,
+        fallback_cache_ttl_seconds: float = 5,
+        spool_path: str | None = None,
+        spool_max_bytes: int = 64 * 1024 * 1024,
+        replay_batch_items: int = 5000,
+        wire_format: str = 'json',
     ):
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
@@ -27,15 +162,37 @@ class ExperimentClient:
         self.fail_safe_variant_key = fail_safe_variant_key
         self.fail_safe_config_json = fail_safe_config_json or {}
         self.batch_size = max(1, batch_size)
-        self._assignment_cache: dict[tuple[str, str, str], tuple[float, Assignment]] = {}
-        self._exposure_buffer: list[dict] = []
-        self._metric_buffer: list[dict] = []
+        if wire_format not in WIRE_FORMATS:
+            raise ValueError(f'wire_format must be one of {WIRE_FORMATS}, got {wire_format!r}')
+        self.wire_format = wire_format
+        self._assignment_cache = AssignmentCache(
+            cache_max_entries, cache_ttl_seconds, stale_while_revalidate_seconds, fallback_cache_ttl_seconds
+        )
+        self.max_batch_items = max(1, max_batch_items)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.background_flush = background_flush
+        self.replay_batch_items = max(1, replay_batch_items)
+        self._spool = EventSpool(spool_path, spool_max_bytes) if spool_path else None
+        # Overflow spills write to the spool inline; they are rare and a few-row SQLite insert is cheap.
+        self._exposure_buffer = EventBuffer(
+            max_queue_size, overflow_policy, spill_handler or self._spool_handler(EXPOSURE_PATH)
+        )
+        self._metric_buffer = EventBuffer(max_queue_size, overflow_policy, spill_handler or self._spool_handler(METRIC_PATH))
+        self._stats_lock = threading.Lock()
+        self._sent = 0
+        self._failed_flushes = 0
+        # 'stdlib' (keep-alive connection pool), 'httpx', or any object with the transport interface.
+        if transport is None or isinstance(transport, str):
+            transport = self._build_transport(transport or 'stdlib', max_connections_per_host)
+        self.transport = transport
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.gzip_min_bytes = gzip_min_bytes
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
 
     @staticmethod
-    def _stable_attributes(attributes: dict | None) -> str:
-        if attributes is None:
-            return '{}'
-        return json.dumps(attributes, sort_keys=True, separators=(',', ':'))
+    def _build_transport(backend: str, max_connections_per_host: int):
+        raise NotImplementedError
 
     def _headers(self) -> dict[str, str]:
         headers = {'Content-Type': 'application/json'}
@@ -43,42 +200,63 @@ class ExperimentClient:
             headers['Authorization'] = f'Bearer {self.api_key}'
         return headers
 
-    def _request(self, method: str, path: str, payload: dict | None = None) -> dict | list:
+    def _prepare(
+        self, path: str, payload, compress: bool, content_type: str
+    ) -> tuple[str, bytes | None, dict[str, str]]:
         url = f'{self.base_url}/api/v1{path}'
         data = None
-        headers = self._headers()
+        headers = {**self._headers(), 'Content-Type': content_type}
         if payload is not None:
-            data = json.dumps(payload).encode('utf-8')
+            data, encoding_headers = encode_json_body(payload, compress, self.gzip_min_bytes)
+            headers.update(encoding_headers)
+        return url, data, headers
 
-        last_error = None
-        for attempt in range(self.retries + 1):
-            req = request.Request(url=url, data=data, method=method, headers=headers)
-            try:
-                with request.urlopen(req, timeout=self.timeout) as resp:
-                    body = resp.read().decode('utf-8')
-                    return json.loads(body) if body else {}
-            except error.HTTPError as exc:
-                detail = exc.read().decode('utf-8')
-                if exc.code >= 500 and attempt < self.retries:
-                    last_error = RuntimeError(f'HTTP {exc.code}: {detail}')
-                    continue
-                raise RuntimeError(f'HTTP {exc.code}: {detail}') from exc
-            except error.URLError as exc:
-                if attempt < self.retries:
-                    last_error = RuntimeError(f'Connection error: {exc.reason}')
-                    continue
-                raise RuntimeError(f'Connection error: {exc.reason}') from exc
-
-        if last_error is not None:
-            raise last_error
-        raise RuntimeError('Request failed without a response')
+    def _retry_delay(
+        self, attempt: int, response: HttpResponse | None = None, error: TransportError | None = None
+    ) -> float:
+        """Delay before retrying a failed attempt; raises RuntimeError once the failure is final."""
+        if error is not None:
+            if attempt < self.retries:
+                return backoff_delay(attempt, None, self.backoff_base_seconds, self.backoff_max_seconds)
+            raise RuntimeError(f'Connection error: {error}') from error
+        if response.status == 429 or response.status >= 500:
+            delay = backoff_delay(
+                attempt, response.header('Retry-After'), self.backoff_base_seconds, self.backoff_max_seconds
+            )
+            if delay is not None and attempt < self.retries:
+                return delay
+        raise RuntimeError(f'HTTP {response.status}: {response.body.decode("utf-8", errors="replace")}')
 
-    def _request_batch(self, method: str, path: str, payload: list[dict]) -> BatchIngestResult:
-        data = self._request(method, path, payload)
+    @staticmethod
+    def _decode(body: bytes) -> dict | list:
+        return json.loads(body) if body else {}
+
+    def _batch_body(self, payload: list[dict]) -> tuple[dict | list, str]:
+        if self.wire_format == 'columnar':
+            return columnar_batch(payload), COLUMNAR_CONTENT_TYPE
+        return payload, 'application/json'
+
+    @classmethod
+    def _batch_result(cls, body: bytes) -> BatchIngestResult:
+        data = cls._decode(body)
         if not isinstance(data, dict):
             raise RuntimeError('Expected object response from batch endpoint')
         return BatchIngestResult.from_dict(data)
 
+    @staticmethod
+    def _cache_key(experiment_id: str, unit_id: str, attributes: dict | None) -> tuple:
+        return experiment_id, unit_id, attributes_key(attributes)
+
+    @staticmethod
+    def _assignment_payload(experiment_id: str, unit_id: str, attributes: dict | None) -> dict:
+        return {'experiment_id': experiment_id, 'unit_id': unit_id, 'attributes': attributes or {}}
+
+    @staticmethod
+    def _assignment_from(response: dict | list) -> Assignment:
+        if not isinstance(response, dict):
+            raise RuntimeError('Unexpected assignment response shape')
+        return Assignment.from_dict(response)
+
     def _fallback_assignment(self, experiment_id: str, unit_id: str) -> Assignment:
         return Assignment(
             experiment_id=experiment_id,
@@ -89,28 +267,221 @@ class ExperimentClient:
             experiment_version=0,
         )
 
+    def _queue_exposure(
+        self, experiment_id: str, unit_id: str, variant_key: str, ts: str | None, context: dict | None
+    ) -> bool:
+        """Buffer one exposure; True once a full batch is waiting."""
+        payload = exposure_event(experiment_id, unit_id, variant_key, ts, context)
+        return self._exposure_buffer.append(payload) >= self.batch_size
+
+    def _queue_metric(
+        self,
+        experiment_id: str,
+        unit_id: str,
+        variant_key: str,
+        metric_name: str,
+        value: float,
+        ts: str | None,
+        context: dict | None,
+    ) -> bool:
+        payload = metric_event(experiment_id, unit_id, variant_key, metric_name, value, ts, context)
+        return self._metric_buffer.append(payload) >= self.batch_size
+
+    def _spool_handler(self, path: str):
+        if self._spool is None:
+            return None
+        return functools.partial(self._spool.append, path)
+
+    def _batches(self, buffer: EventBuffer):
+        # Bounded by what is queued now so a busy producer cannot keep one flush going forever.
+        remaining = len(buffer)
+        while remaining > 0:
+            batch = buffer.take(min(remaining, self.max_batch_items))
+            if not batch:
+                return
+            remaining -= len(batch)
+            yield batch
+
+    def _spill_queue(self, path: str, buffer: EventBuffer) -> None:
+        # The backend is unavailable: keep memory flat and survive a restart by moving the queue to
+        # disk; the next successful flush replays it.
+        self._spool.append(path, buffer.take(len(buffer)))
+
+    def _spool_queues(self) -> None:
+        # Whatever is still in memory would die with the process; the spool replays it next run.
+        spool, self._spool = self._spool, None
+        for path, buffer in ((EXPOSURE_PATH, self._exposure_buffer), (METRIC_PATH, self._metric_buffer)):
+            spool.append(path, buffer.take(len(buffer)))
+        spool.close()
+
+    def _record_sent(self, count: int) -> None:
+        with self._stats_lock:
+            self._sent += count
+
+    def _record_failed_flush(self) -> None:
+        with self._stats_lock:
+            self._failed_flushes += 1
+        logger.warning('Litmus background flush failed; events stay queued', exc_info=True)
+
+    @staticmethod
+    def _total(results: list[BatchIngestResult]) -> BatchIngestResult:
+        return BatchIngestResult(
+            ingested=sum(result.ingested for result in results),
+            duplicates=sum(result.duplicates for result in results),
+        )
+
+    def _extra_stats(self) -> dict[str, int]:
+        return {}
+
+    def stats(self) -> dict[str, int]:
+        buffers = (self._exposure_buffer, self._metric_buffer)
+        spool = self._spool.stats() if self._spool is not None else {}
+        with self._stats_lock:
+            return {
+                'sent': self._sent,
+                'dropped': sum(buffer.dropped for buffer in buffers),
+                'spilled': sum(buffer.spilled for buffer in buffers),
+                'queued': sum(len(buffer) for buffer in buffers),
+                'failed_flushes': self._failed_flushes,
+                **self._extra_stats(),
+                **self._assignment_cache.stats(),
+                **spool,
+            }
+
+
+def _close_at_exit(client_ref: weakref.ref) -> None:
+    client = client_ref()
+    if client is not None:
+        client.close()
+
+
+class ExperimentClient(BaseExperimentClient):
+    _build_transport = staticmethod(build_transport)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._refresher: ThreadPoolExecutor | None = None
+        self._flush_lock = threading.Lock()
+        self._sleep = time.sleep
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._atexit_hook = None
+        if self.background_flush:
+            self._flusher = threading.Thread(target=self._run_flusher, name='litmus-flusher', daemon=True)
+            self._flusher.start()
+            # A partial per client, so unregistering one client leaves the others' hooks in place.
+            self._atexit_hook = functools.partial(_close_at_exit, weakref.ref(self))
+            atexit.register(self._atexit_hook)
+
+    def _send(
+        self, method: str, path: str, payload=None, compress: bool = False, content_type: str = 'application/json'
+    ) -> HttpResponse:
+        url, data, headers = self._prepare(path, payload, compress, content_type)
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.transport.request(method, url, body=data, headers=headers, timeout=self.timeout)
+            except TransportError as exc:
+                self._sleep(self._retry_delay(attempt, error=exc))
+                continue
+            if response.status < 400:
+                return response
+            self._sleep(self._retry_delay(attempt, response=response))
+        raise RuntimeError('Request failed without a response')
+
+    def _request(self, method: str, path: str, payload: dict | list | None = None, compress: bool = False) -> dict | list:
+        return self._decode(self._send(method, path, payload, compress=compress).body)
+
+    def _request_batch(self, method: str, path: str, payload: list[dict]) -> BatchIngestResult:
+        payload, content_type = self._batch_body(payload)
+        return self._batch_result(self._send(method, path, payload, compress=True, content_type=content_type).body)
+
+    def _run_flusher(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            if not self._flush_quietly():
+                # Back off for a whole interval so a full buffer cannot spin against a failing backend.
+                self._stopping.wait(self.flush_interval_seconds)
+
+    def _flush_quietly(self) -> bool:
+        try:
+            self.flush()
+        except RuntimeError:
+            self._record_failed_flush()
+            return False
+        return True
+
+    def close(self) -> None:
+        """Stop the background flusher, deliver what is still queued and release pooled connections."""
+        if self._flusher is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._flusher.join(timeout=self.timeout)
+            self._flusher = None
+            self._flush_quietly()
+        with self._stats_lock:
+            refresher, self._refresher = self._refresher, None
+        if refresher is not None:
+            refresher.shutdown(wait=False, cancel_futures=True)
+        if self._spool is not None:
+            with self._flush_lock:
+                self._spool_queues()
+        if self._atexit_hook is not None:
+            atexit.unregister(self._atexit_hook)
+            self._atexit_hook = None
+        self.transport.close()
+
+    def _fetch_assignment(self, experiment_id: str, unit_id: str, attributes: dict | None) -> Assignment:
+        return self._assignment_from(
+            self._request('POST', '/assignments', self._assignment_payload(experiment_id, unit_id, attributes))
+        )
+
+    def _refresh_assignment(self, cache_key: tuple, experiment_id: str, unit_id: str, attributes: dict | None) -> None:
+        try:
+            self._assignment_cache.put(cache_key, self._fetch_assignment(experiment_id, unit_id, attributes))
+        except RuntimeError:
+            # The stale entry keeps serving until its window closes; the next miss falls back as usual.
+            logger.debug('Litmus background assignment refresh failed', exc_info=True)
+        finally:
+            self._assignment_cache.end_refresh(cache_key)
+
     def get_variant(self, experiment_id: str, unit_id: str, attributes: dict | None = None) -> Assignment:
-        cache_key = (experiment_id, unit_id, self._stable_attributes(attributes))
-        now = time.time()
-        cached = self._assignment_cache.get(cache_key)
-        if cached and cached[0] > now:
-            return cached[1]
+        cache_key = self._cache_key(experiment_id, unit_id, attributes)
+        cached, state = self._assignment_cache.get(cache_key)
+        if cached is not None:
+            if state == STALE and self._assignment_cache.begin_refresh(cache_key):
+                with self._stats_lock:
+                    if self._refresher is None:
+                        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='litmus-refresh')
+                    refresher = self._refresher
+                refresher.submit(self._refresh_assignment, cache_key, experiment_id, unit_id, attributes)
+            return cached
         try:
-            response = self._request(
-                'POST',
-                '/assignments',
-                {'experiment_id': experiment_id, 'unit_id': unit_id, 'attributes': attributes or {}},
-            )
-            if not isinstance(response, dict):
-                raise RuntimeError('Unexpected assignment response shape')
-            assignment = Assignment.from_dict(response)
+            assignment = self._fetch_assignment(experiment_id, unit_id, attributes)
         except RuntimeError:
             if not self.fail_safe_enabled:
                 raise
             assignment = self._fallback_assignment(experiment_id, unit_id)
-        self._assignment_cache[cache_key] = (now + self.cache_ttl_seconds, assignment)
+            self._assignment_cache.put(cache_key, assignment, fallback=True)
+            return assignment
+        self._assignment_cache.put(cache_key, assignment)
         return assignment
 
+    def get_variants(self, experiment_id: str, unit_ids: list[str], attributes: dict | None = None) -> list[Assignment]:
+        """Assign many units, fetching cache misses concurrently within the per-host connection limit."""
+        unique = list(dict.fromkeys(unit_ids))
+        if len(unique) <= 1:
+            assignments = {unit_id: self.get_variant(experiment_id, unit_id, attributes) for unit_id in unique}
+        else:
+            workers = min(len(unique), self.max_connections_per_host)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='litmus-assign') as pool:
+                fetched = pool.map(lambda unit_id: self.get_variant(experiment_id, unit_id, attributes), unique)
+                assignments = dict(zip(unique, fetched))
+        return [assignments[unit_id] for unit_id in unit_ids]
+
     def log_exposure(
         self,
         experiment_id: str,
@@ -119,17 +490,8 @@ class ExperimentClient:
         ts: str | None = None,
         context: dict | None = None,
     ) -> None:
-        payload = {
-            'experiment_id': experiment_id,
-            'unit_id': unit_id,
-            'variant_key': variant_key,
-            'context': context or {},
-        }
-        if ts is not None:
-            payload['ts'] = ts
-        self._exposure_buffer.append(payload)
-        if len(self._exposure_buffer) >= self.batch_size:
-            self.flush_exposures()
+        if self._queue_exposure(experiment_id, unit_id, variant_key, ts, context):
+            self._batch_ready(self.flush_exposures)
 
     def log_metric(
         self,
@@ -141,35 +503,51 @@ class ExperimentClient:
         ts: str | None = None,
         context: dict | None = None,
     ) -> None:
-        payload = {
-            'experiment_id': experiment_id,
-            'unit_id': unit_id,
-            'variant_key': variant_key,
-            'metric_name': metric_name,
-            'value': value,
-            'context': context or {},
-        }
-        if ts is not None:
-            payload['ts'] = ts
-        self._metric_buffer.append(payload)
-        if len(self._metric_buffer) >= self.batch_size:
-            self.flush_metrics()
+        if self._queue_metric(experiment_id, unit_id, variant_key, metric_name, value, ts, context):
+            self._batch_ready(self.flush_metrics)
+
+    def _batch_ready(self, flush) -> None:
+        if self._flusher is not None:
+            self._wake.set()
+        else:
+            flush()
+
+    def _replay_spool(self, path: str, results: list[BatchIngestResult]) -> None:
+        while True:
+            last_id, batch = self._spool.peek(path, self.replay_batch_items)
+            if not batch:
+                return
+            # Spooled events keep their idempotency keys, so a replay cut short is safe to repeat.
+            results.append(self._request_batch('POST', path, batch))
+            self._spool.ack(path, last_id)
+            self._record_sent(len(batch))
+
+    def _flush_buffer(self, buffer: EventBuffer, path: str) -> BatchIngestResult:
+        results: list[BatchIngestResult] = []
+        # Serialized so concurrent flushes cannot reorder batches.
+        with self._flush_lock:
+            try:
+                if self._spool is not None and self._spool.pending(path):
+                    # Spooled events are older than anything in memory, so they go first.
+                    self._replay_spool(path, results)
+                for batch in self._batches(buffer):
+                    try:
+                        results.append(self._request_batch('POST', path, batch))
+                    except RuntimeError:
+                        buffer.requeue(batch)
+                        raise
+                    self._record_sent(len(batch))
+            except RuntimeError:
+                if self._spool is not None:
+                    self._spill_queue(path, buffer)
+                raise
+        return self._total(results)
 
     def flush_exposures(self) -> BatchIngestResult:
-        if not self._exposure_buffer:
-            return BatchIngestResult(ingested=0)
-        payload = list(self._exposure_buffer)
-        result = self._request_batch('POST', '/events/exposure', payload)
-        self._exposure_buffer.clear()
-        return result
+        return self._flush_buffer(self._exposure_buffer, EXPOSURE_PATH)
 
     def flush_metrics(self) -> BatchIngestResult:
-        if not self._metric_buffer:
-            return BatchIngestResult(ingested=0)
-        payload = list(self._metric_buffer)
-        result = self._request_batch('POST', '/events/metric', payload)
-        self._metric_buffer.clear()
-        return result
+        return self._flush_buffer(self._metric_buffer, METRIC_PATH)
 
     def flush(self) -> dict[str, int]:
         exposure_result = self.flush_exposures()
@@ -189,10 +567,7 @@ class ExperimentClient:
         return ExperimentReport.from_dict(data)
 
     def export_report(self, experiment_id: str, fmt: str = 'json') -> str:
-        url = f'{self.base_url}/api/v1/experiments/{experiment_id}/export?format={fmt}'
-        req = request.Request(url=url, method='GET')
-        with request.urlopen(req, timeout=self.timeout) as resp:
-            return resp.read().decode('utf-8')
+        return self._send('GET', f'/experiments/{experiment_id}/export?format={fmt}').body.decode('utf-8')
 
     def override_decision(self, experiment_id: str, status: str, reason: str | None = None, actor: str = 'sdk.user') -> Experiment:
         data = self._request(
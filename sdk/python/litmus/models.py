@@ -62,7 +62,8 @@ class Assignment:
 @dataclass
 class BatchIngestResult:
     ingested: int
+    duplicates: int = 0
 
     @staticmethod
     def from_dict(payload: dict[str, Any]) -> 'BatchIngestResult':
-        return BatchIngestResult(ingested=payload.get('ingested', 0))
+        return BatchIngestResult(ingested=payload.get('ingested', 0), duplicates=payload.get('duplicates', 0))
@@ -0,0 +1,114 @@
+import json
+import sqlite3
+import threading
+
+
+class EventSpool:
+    """Durable on-disk queue (one SQLite file) for events the backend could not take.
+
+    Events are kept per ingestion path in arrival order and replayed oldest first. The payload total is
+    capped at ``max_bytes``; past it the oldest events are evicted, so an outage of any length costs a
+    bounded amount of disk and the freshest data survives. Thread-safe; one spool file per process.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max(1, max_bytes)
+        self.spooled = 0
+        self.evicted = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS spooled_events ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, payload TEXT NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS ix_spooled_events_path_id ON spooled_events (path, id)')
+        self._size_bytes, self._count = self._db.execute(
+            'SELECT COALESCE(SUM(LENGTH(payload)), 0), COUNT(*) FROM spooled_events'
+        ).fetchone()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def pending(self, path: str) -> bool:
+        with self._lock:
+            if not self._count:
+                return False
+            return self._db.execute('SELECT 1 FROM spooled_events WHERE path = ? LIMIT 1', (path,)).fetchone() is not None
+
+    def append(self, path: str, items: list[dict]) -> None:
+        if not items:
+            return
+        rows = [(path, json.dumps(item, separators=(',', ':'))) for item in items]
+        added = sum(len(payload) for _, payload in rows)
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.executemany('INSERT INTO spooled_events (path, payload) VALUES (?, ?)', rows)
+                self._size_bytes += added
+                self._count += len(rows)
+                self._evict_oldest()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                self._size_bytes, self._count = self._db.execute(
+                    'SELECT COALESCE(SUM(LENGTH(payload)), 0), COUNT(*) FROM spooled_events'
+                ).fetchone()
+                raise
+            self.spooled += len(rows)
+
+    def _evict_oldest(self) -> None:
+        while self._size_bytes > self.max_bytes and self._count:
+            # Evict in chunks; a single over-cap append usually needs only one round.
+            rows = self._db.execute(
+                'SELECT id, LENGTH(payload) FROM spooled_events ORDER BY id LIMIT ?', (max(1, self._count // 10),)
+            ).fetchall()
+            excess = self._size_bytes - self.max_bytes
+            cut = 0
+            freed = 0
+            for _, size in rows:
+                freed += size
+                cut += 1
+                if freed >= excess:
+                    break
+            self._db.execute('DELETE FROM spooled_events WHERE id <= ?', (rows[cut - 1][0],))
+            self._size_bytes -= freed
+            self._count -= cut
+            self.evicted += cut
+
+    def peek(self, path: str, limit: int) -> tuple[int, list[dict]]:
+        """Oldest ``limit`` events for ``path`` and the id to ``ack`` once they are delivered (0 if none)."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT id, payload FROM spooled_events WHERE path = ? ORDER BY id LIMIT ?', (path, limit)
+            ).fetchall()
+        if not rows:
+            return 0, []
+        return rows[-1][0], [json.loads(payload) for _, payload in rows]
+
+    def ack(self, path: str, up_to_id: int) -> None:
+        with self._lock:
+            size, count = self._db.execute(
+                'SELECT COALESCE(SUM(LENGTH(payload)), 0), COUNT(*) FROM spooled_events WHERE path = ? AND id <= ?',
+                (path, up_to_id),
+            ).fetchone()
+            self._db.execute('DELETE FROM spooled_events WHERE path = ? AND id <= ?', (path, up_to_id))
+            self._size_bytes -= size
+            self._count -= count
+            self.replayed += count
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'spool_events': self._count,
+                'spool_bytes': self._size_bytes,
+                'spool_evicted': self.evicted,
+                'spool_replayed': self.replayed,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
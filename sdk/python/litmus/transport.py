@@ -0,0 +1,181 @@
+import gzip
+import http.client
+import threading
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+
+class TransportError(Exception):
+    """The request never produced an HTTP response (connect, send or read failed)."""
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    body: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+
+    def header(self, name: str) -> str | None:
+        return self.headers.get(name.lower())
+
+
+class _HostPool:
+    def __init__(self, scheme: str, host: str, port: int | None, max_connections: int) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=timeout)
+
+    def acquire(self, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        if not self._slots.acquire(timeout=timeout):
+            raise TransportError(f'No free connection to {self.host} within {timeout}s')
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            return self._connect(timeout), False
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection, True
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool) -> None:
+        if reusable:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class PooledTransport:
+    """Keep-alive HTTP/1.1 connections from the standard library, pooled per host.
+
+    At most ``max_connections_per_host`` requests run against one host at a time; further callers wait
+    up to the request timeout for a connection to be returned.
+    """
+
+    def __init__(self, max_connections_per_host: int = 10) -> None:
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self._pools: dict[tuple[str, str, int | None], _HostPool] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, scheme: str, host: str, port: int | None) -> _HostPool:
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _HostPool(scheme, host, port, self.max_connections_per_host)
+            return pool
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10,
+    ) -> HttpResponse:
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        pool = self._pool(parts.scheme, parts.hostname or 'localhost', parts.port)
+        headers = {'Accept-Encoding': 'gzip', **(headers or {})}
+        while True:
+            connection, reused = pool.acquire(timeout)
+            response = None
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as exc:
+                pool.release(connection, reusable=False)
+                # Only a keep-alive connection the server closed while it sat idle is safe to resend on:
+                # it fails before a single response byte (RemoteDisconnected is a ConnectionResetError).
+                # Timeouts and mid-response failures may have reached the server and must surface.
+                if reused and response is None and isinstance(exc, (ConnectionResetError, BrokenPipeError)):
+                    continue
+                raise TransportError(str(exc) or exc.__class__.__name__) from exc
+            pool.release(connection, reusable=not response.will_close)
+            response_headers = {name.lower(): value for name, value in response.getheaders()}
+            if response_headers.get('content-encoding') == 'gzip':
+                payload = gzip.decompress(payload)
+            return HttpResponse(status=response.status, body=payload, headers=response_headers)
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+class HttpxTransport:
+    """Optional transport backed by ``httpx`` (``pip install httpx``), with the same per-host limits."""
+
+    def __init__(self, max_connections_per_host: int = 10) -> None:
+        try:
+            import httpx
+        except ImportError as exc:  # pragma: no cover - depends on the environment
+            raise ImportError("HttpxTransport requires httpx; install it or use transport='stdlib'") from exc
+        self._httpx = httpx
+        # httpx limits connections per client; a client is created lazily per host to keep limits per host.
+        self._limits = httpx.Limits(
+            max_connections=max(1, max_connections_per_host),
+            max_keepalive_connections=max(1, max_connections_per_host),
+        )
+        self._clients: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, origin: str):
+        with self._lock:
+            client = self._clients.get(origin)
+            if client is None:
+                client = self._clients[origin] = self._httpx.Client(limits=self._limits)
+            return client
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10,
+    ) -> HttpResponse:
+        parts = urlsplit(url)
+        try:
+            response = self._client(f'{parts.scheme}://{parts.netloc}').request(
+                method, url, content=body, headers=headers, timeout=timeout
+            )
+        except self._httpx.HTTPError as exc:
+            raise TransportError(str(exc) or exc.__class__.__name__) from exc
+        return HttpResponse(
+            status=response.status_code,
+            body=response.content,
+            headers={name.lower(): value for name, value in response.headers.items()},
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+
+def build_transport(backend: str = 'stdlib', max_connections_per_host: int = 10):
+    if backend == 'httpx':
+        return HttpxTransport(max_connections_per_host)
+    if backend == 'stdlib':
+        return PooledTransport(max_connections_per_host)
+    raise ValueError(f"Unknown transport backend: {backend!r} (expected 'stdlib' or 'httpx')")
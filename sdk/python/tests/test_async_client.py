@@ -0,0 +1,261 @@
+import asyncio
+import json
+
+from litmus.async_client import AsyncExperimentClient
+from litmus.async_transport import AsyncPooledTransport
+from litmus.transport import HttpResponse, TransportError
+
+ASSIGNMENT = (
+    '{"experiment_id":"exp-1","assignment_id":"asg-1","unit_id":"%s","variant_key":"treatment",'
+    '"config_json":{},"experiment_version":1}'
+)
+
+
+class _FakeAsyncTransport:
+    def __init__(self, respond, delay: float = 0.0):
+        self.respond = respond
+        self.delay = delay
+        self.requests = []
+
+    async def request(self, method, url, body=None, headers=None, timeout=10):
+        self.requests.append({'method': method, 'url': url, 'body': body, 'headers': headers or {}})
+        await asyncio.sleep(self.delay)
+        response = self.respond(method, url, body)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def aclose(self):
+        return None
+
+
+def _assignment_for(method, url, body):
+    unit_id = json.loads(body)['unit_id']
+    return HttpResponse(status=200, body=(ASSIGNMENT % unit_id).encode())
+
+
+def test_concurrent_get_variant_calls_share_one_request():
+    async def scenario():
+        transport = _FakeAsyncTransport(_assignment_for, delay=0.01)
+        client = AsyncExperimentClient(base_url='http://test', transport=transport)
+        results = await asyncio.gather(*(client.get_variant('exp-1', 'unit-1') for _ in range(10)))
+        assert {result.assignment_id for result in results} == {'asg-1'}
+        assert len(transport.requests) == 1
+        assert client.stats()['coalesced'] == 9
+
+        batch = await client.get_variants('exp-1', ['unit-2', 'unit-3', 'unit-1'])
+        assert [assignment.unit_id for assignment in batch] == ['unit-2', 'unit-3', 'unit-1']
+        assert len(transport.requests) == 3
+
+    asyncio.run(scenario())
+
+
+def test_get_variant_falls_back_when_backend_unreachable():
+    async def scenario():
+        transport = _FakeAsyncTransport(lambda *args: TransportError('connection refused'))
+        client = AsyncExperimentClient(base_url='http://test', transport=transport, retries=1)
+        client._sleep = lambda seconds: asyncio.sleep(0)
+        assignment = await client.get_variant('exp-1', 'unit-1')
+        assert assignment.variant_key == 'control'
+        assert len(transport.requests) == 2
+
+    asyncio.run(scenario())
+
+
+def test_background_flush_task_delivers_on_size_and_on_close():
+    async def scenario():
+        transport = _FakeAsyncTransport(lambda *args: HttpResponse(status=200, body=b'{"ingested": 2}'))
+        async with AsyncExperimentClient(
+            base_url='http://test', transport=transport, batch_size=2, background_flush=True, flush_interval_seconds=60
+        ) as client:
+            await client.log_exposure('exp-1', 'unit-1', 'control')
+            await client.log_exposure('exp-1', 'unit-2', 'control')
+            for _ in range(100):
+                if client.stats()['sent'] == 2:
+                    break
+                await asyncio.sleep(0.01)
+            assert len(transport.requests) == 1
+            await client.log_metric('exp-1', 'unit-1', 'control', 'gmv', 1.0)
+        assert transport.requests[-1]['url'].endswith('/api/v1/events/metric')
+        assert client.stats()['sent'] == 3
+
+    asyncio.run(scenario())
+
+
+def test_async_pooled_transport_reuses_keep_alive_connections():
+    async def scenario():
+        connections = 0
+
+        async def handle(reader, writer):
+            nonlocal connections
+            connections += 1
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                await reader.readexactly(length)
+                body = b'{"ingested": 1}'
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+                await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        transport = AsyncPooledTransport(max_connections_per_host=2)
+        try:
+            for _ in range(5):
+                response = await transport.request('POST', f'http://127.0.0.1:{port}/api/v1/events/exposure', b'[]')
+                assert response.status == 200 and json.loads(response.body) == {'ingested': 1}
+        finally:
+            await transport.aclose()
+            server.close()
+            await server.wait_closed()
+        assert connections == 1
+
+    asyncio.run(scenario())
+
+
+def test_async_pooled_transport_frames_every_response_shape():
+    # (raw response, whether the server closes the connection after it)
+    responses = [
+        (
+            b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+            b'5\r\nhello\r\n6;ext=1\r\n world\r\n0\r\nX-Trailer: done\r\n\r\n',
+            False,
+        ),
+        (
+            b'HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 103 Early Hints\r\nLink: </app.css>\r\n\r\n'
+            b'HTTP/1.1 202 Accepted\r\nContent-Length: 7\r\n\r\ninterim',
+            False,
+        ),
+        (b'HTTP/1.1 200 OK\r\nConnection: close\r\nContent-Length: 5\r\n\r\nclose', True),
+        (b'HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n\r\nuntil eof', True),
+        (b'HTTP/1.1 204 No Content\r\n\r\n', False),
+        (b'HTTP/1.1 200 OK\r\nContent-Length: 4\r\n\r\nlast', False),
+    ]
+
+    async def scenario():
+        connections = 0
+
+        async def handle(reader, writer):
+            nonlocal connections
+            connections += 1
+            while await reader.readline():
+                length = 0
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                await reader.readexactly(length)
+                raw, close = responses.pop(0)
+                writer.write(raw)
+                await writer.drain()
+                if close:
+                    break
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        transport = AsyncPooledTransport(max_connections_per_host=1)
+        received = []
+        try:
+            for _ in range(6):
+                response = await transport.request('POST', f'http://127.0.0.1:{port}/api/v1/events/exposure', b'[]')
+                received.append((response.status, response.body))
+        finally:
+            await transport.aclose()
+            server.close()
+            await server.wait_closed()
+
+        assert received == [
+            (200, b'hello world'),
+            (202, b'interim'),
+            (200, b'close'),
+            (200, b'until eof'),
+            (204, b''),
+            (200, b'last'),
+        ]
+        # Chunked, interim and no-content responses keep the connection; close and read-until-EOF end it.
+        assert connections == 3
+
+    asyncio.run(scenario())
+
+
+def test_interval_flush_runs_without_context_manager():
+    async def scenario():
+        transport = _FakeAsyncTransport(lambda *args: HttpResponse(status=200, body=b'{"ingested": 1}'))
+        client = AsyncExperimentClient(
+            base_url='http://test', transport=transport, batch_size=100, background_flush=True, flush_interval_seconds=0.05
+        )
+        await client.log_exposure('exp-1', 'unit-1', 'control')
+        for _ in range(100):
+            if client.stats()['sent'] == 1:
+                break
+            await asyncio.sleep(0.01)
+        assert client.stats()['queued'] == 0 and len(transport.requests) == 1
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_stale_assignment_refreshes_in_background_and_fallbacks_expire_quickly():
+    async def scenario():
+        outage = [False]
+        served = []
+
+        def respond(method, url, body):
+            if outage[0]:
+                return TransportError('connection refused')
+            served.append(1)
+            return HttpResponse(status=200, body=(ASSIGNMENT % json.loads(body)['unit_id']).encode())
+
+        transport = _FakeAsyncTransport(respond)
+        client = AsyncExperimentClient(
+            base_url='http://test', transport=transport, retries=0, cache_ttl_seconds=10, fallback_cache_ttl_seconds=5
+        )
+        now = [0.0]
+        client._assignment_cache._clock = lambda: now[0]
+        await client.get_variant('exp-1', 'unit-1')
+
+        now[0] = 15.0
+        assert (await client.get_variant('exp-1', 'unit-1')).variant_key == 'treatment'
+        await asyncio.gather(*client._inflight.values())
+        assert len(served) == 2
+
+        outage[0] = True
+        assert (await client.get_variant('exp-1', 'unit-2')).variant_key == 'control'
+        assert (await client.get_variant('exp-1', 'unit-2')).variant_key == 'control'
+        assert len(transport.requests) == 3
+
+        outage[0] = False
+        now[0] = 21.0
+        assert (await client.get_variant('exp-1', 'unit-2')).variant_key == 'treatment'
+        assert client.stats()['cache_stale_hits'] == 1
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_unsent_events_survive_a_restart_through_the_spool(tmp_path):
+    spool_path = str(tmp_path / 'spool.db')
+
+    async def scenario():
+        down = _FakeAsyncTransport(lambda *args: TransportError('connection refused'))
+        client = AsyncExperimentClient(base_url='http://test', transport=down, batch_size=100, spool_path=spool_path)
+        await client.log_metric('exp-1', 'unit-1', 'control', 'gmv', 3.0)
+        await client.aclose()
+
+        up = _FakeAsyncTransport(lambda *args: HttpResponse(status=200, body=b'{"ingested": 1}'))
+        restarted = AsyncExperimentClient(base_url='http://test', transport=up, spool_path=spool_path)
+        assert restarted.stats()['spool_events'] == 1
+        assert (await restarted.flush())['metric'] == 1
+        assert json.loads(up.requests[0]['body'])[0]['metric_name'] == 'gmv'
+        assert restarted.stats()['spool_events'] == 0
+        await restarted.aclose()
+
+    asyncio.run(scenario())
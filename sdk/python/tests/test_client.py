@@ -1,51 +1,64 @@
+import gzip
 import json
-from urllib import error
-from unittest.mock import patch
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
+import pytest
+
+from litmus.buffering import EventBuffer
+from litmus.caching import AssignmentCache, attributes_key
 from litmus.client import ExperimentClient, LitmusClient
 from litmus.models import Assignment
+from litmus.spool import EventSpool
+from litmus.transport import HttpResponse, PooledTransport, TransportError
 
 
-class _FakeResponse:
-    def __init__(self, payload: str):
-        self._payload = payload.encode('utf-8')
+class _FakeTransport:
+    """Replays canned responses (or raises queued errors) and records every request."""
 
-    def read(self):
-        return self._payload
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
 
-    def __enter__(self):
-        return self
+    def request(self, method, url, body=None, headers=None, timeout=10):
+        self.requests.append({'method': method, 'url': url, 'body': body, 'headers': headers or {}})
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
 
-    def __exit__(self, exc_type, exc, tb):
-        return False
+    def close(self):
+        return None
 
+    @property
+    def call_count(self):
+        return len(self.requests)
 
-class _HttpErrorResponse:
-    def __init__(self, detail: str):
-        self._detail = detail.encode('utf-8')
 
-    def read(self):
-        return self._detail
+def _ok(payload: str) -> HttpResponse:
+    return HttpResponse(status=200, body=payload.encode('utf-8'))
 
-    def close(self):
-        return None
+
+def _client(transport, **kwargs):
+    client = ExperimentClient(base_url='http://test', transport=transport, **kwargs)
+    client._sleep = lambda seconds: None
+    return client
 
 
 def test_create_experiment_maps_response_to_model():
-    client = LitmusClient(base_url='http://test')
     payload = '{"id":"exp-1","name":"Demo","status":"running","sample_size_required":1000}'
+    client = LitmusClient(base_url='http://test', transport=_FakeTransport(_ok(payload)))
 
-    with patch('litmus.client.request.urlopen', return_value=_FakeResponse(payload)):
-        experiment = client.create_experiment({'name': 'Demo'})
+    experiment = client.create_experiment({'name': 'Demo'})
 
     assert experiment.id == 'exp-1'
     assert experiment.status == 'running'
 
 
 def test_export_report_returns_raw_body():
-    client = LitmusClient(base_url='http://test')
-    with patch('litmus.client.request.urlopen', return_value=_FakeResponse('header\\nvalue')):
-        content = client.export_report('exp-1', fmt='csv')
+    client = LitmusClient(base_url='http://test', transport=_FakeTransport(_ok('header\\nvalue')))
+    content = client.export_report('exp-1', fmt='csv')
     assert 'header' in content
 
 
@@ -66,94 +79,408 @@ def test_assignment_model_from_dict():
 
 
 def test_get_variant_uses_cache_for_repeat_lookup():
-    client = ExperimentClient(base_url='http://test', cache_ttl_seconds=120)
     payload = (
         '{"experiment_id":"exp-1","assignment_id":"asg-1","unit_id":"store-1","variant_key":"treatment",'
         '"config_json":{"model":"v2"},"experiment_version":2}'
     )
-    with patch('litmus.client.request.urlopen', return_value=_FakeResponse(payload)) as mocked:
-        first = client.get_variant('exp-1', 'store-1', {'country': 'CA'})
-        second = client.get_variant('exp-1', 'store-1', {'country': 'CA'})
+    mocked = _FakeTransport(_ok(payload))
+    client = _client(mocked, cache_ttl_seconds=120)
+    first = client.get_variant('exp-1', 'store-1', {'country': 'CA'})
+    second = client.get_variant('exp-1', 'store-1', {'country': 'CA'})
     assert first.assignment_id == second.assignment_id
     assert mocked.call_count == 1
 
 
+def test_get_variants_fetches_distinct_misses_concurrently_in_request_order():
+    class _AssigningTransport(_FakeTransport):
+        def __init__(self):
+            super().__init__()
+            self.lock = threading.Lock()
+            self.active = self.peak = 0
+
+        def request(self, method, url, body=None, headers=None, timeout=10):
+            with self.lock:
+                self.requests.append({'method': method, 'url': url, 'body': body})
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.02)
+            with self.lock:
+                self.active -= 1
+            unit_id = json.loads(body)['unit_id']
+            return _ok(
+                json.dumps(
+                    {
+                        'experiment_id': 'exp-1',
+                        'assignment_id': f'asg-{unit_id}',
+                        'unit_id': unit_id,
+                        'variant_key': 'treatment',
+                        'config_json': {},
+                        'experiment_version': 1,
+                    }
+                )
+            )
+
+    transport = _AssigningTransport()
+    client = _client(transport, max_connections_per_host=3)
+    client.get_variant('exp-1', 'unit-0')
+
+    unit_ids = ['unit-3', 'unit-0', 'unit-1', 'unit-3', 'unit-2', 'unit-4']
+    assignments = client.get_variants('exp-1', unit_ids)
+
+    assert [assignment.unit_id for assignment in assignments] == unit_ids
+    assert transport.call_count == 5
+    assert 1 < transport.peak <= 3
+
+
 def test_get_variant_falls_back_to_control_when_backend_unavailable():
-    client = ExperimentClient(
-        base_url='http://test',
+    client = _client(
+        _FakeTransport(TransportError('connection refused')),
         fail_safe_enabled=True,
         fail_safe_variant_key='control',
         fail_safe_config_json={'reason': 'backend-unavailable'},
     )
-    with patch(
-        'litmus.client.request.urlopen',
-        side_effect=error.URLError('connection refused'),
-    ):
-        assignment = client.get_variant('exp-2', 'user-9', {'country': 'US'})
+    assignment = client.get_variant('exp-2', 'user-9', {'country': 'US'})
 
     assert assignment.variant_key == 'control'
     assert assignment.config_json['reason'] == 'backend-unavailable'
     assert assignment.experiment_version == 0
 
 
-def test_get_variant_retries_on_server_error_then_succeeds():
-    client = ExperimentClient(base_url='http://test', retries=1, fail_safe_enabled=False)
-    server_error = error.HTTPError(
-        url='http://test/api/v1/assignments',
-        code=503,
-        msg='Service Unavailable',
-        hdrs=None,
-        fp=_HttpErrorResponse('unavailable'),
+def test_assignment_cache_evicts_least_recently_used_entries():
+    cache = AssignmentCache(max_entries=2)
+    assignments = {unit: Assignment('exp-1', f'asg-{unit}', unit, 'control', {}, 1) for unit in 'abc'}
+    cache.put(('exp-1', 'a', ()), assignments['a'])
+    cache.put(('exp-1', 'b', ()), assignments['b'])
+    assert cache.get(('exp-1', 'a', ()))[1] == 'fresh'
+    cache.put(('exp-1', 'c', ()), assignments['c'])
+
+    assert cache.get(('exp-1', 'b', ())) == (None, None)
+    assert cache.get(('exp-1', 'a', ()))[0] is assignments['a']
+    assert cache.stats()['cache_evictions'] == 1
+    assert cache.stats()['cache_entries'] == 2
+
+
+def test_attributes_key_ignores_order_but_not_value_types():
+    assert attributes_key({'country': 'CA', 'tier': 1}) == attributes_key({'tier': 1, 'country': 'CA'})
+    assert attributes_key({'beta': True}) != attributes_key({'beta': 1})
+    assert attributes_key(None) == attributes_key({})
+    assert attributes_key({'tags': ['a']}) == attributes_key({'tags': ['a']})
+
+
+def test_stale_assignment_is_served_while_refreshing_in_background():
+    payload = (
+        '{"experiment_id":"exp-1","assignment_id":"asg-%d","unit_id":"store-1","variant_key":"treatment",'
+        '"config_json":{},"experiment_version":%d}'
+    )
+    transport = _FakeTransport(_ok(payload % (1, 1)), _ok(payload % (2, 2)))
+    client = _client(transport, cache_ttl_seconds=10, stale_while_revalidate_seconds=60)
+    now = [0.0]
+    client._assignment_cache._clock = lambda: now[0]
+    assert client.get_variant('exp-1', 'store-1').assignment_id == 'asg-1'
+
+    now[0] = 30.0
+    assert client.get_variant('exp-1', 'store-1').assignment_id == 'asg-1'
+    client._refresher.shutdown(wait=True)
+
+    assert client.get_variant('exp-1', 'store-1').assignment_id == 'asg-2'
+    assert transport.call_count == 2
+    stats = client.stats()
+    assert (stats['cache_hits'], stats['cache_stale_hits'], stats['cache_misses']) == (1, 1, 1)
+
+
+def test_fallback_assignment_is_cached_briefly():
+    payload = (
+        '{"experiment_id":"exp-1","assignment_id":"asg-1","unit_id":"store-1","variant_key":"treatment",'
+        '"config_json":{},"experiment_version":1}'
     )
+    transport = _FakeTransport(TransportError('connection refused'), _ok(payload))
+    client = _client(transport, retries=0, cache_ttl_seconds=300, fallback_cache_ttl_seconds=5)
+    now = [0.0]
+    client._assignment_cache._clock = lambda: now[0]
+
+    assert client.get_variant('exp-1', 'store-1').variant_key == 'control'
+    assert client.get_variant('exp-1', 'store-1').variant_key == 'control'
+    assert transport.call_count == 1
+
+    now[0] = 6.0
+    assert client.get_variant('exp-1', 'store-1').assignment_id == 'asg-1'
+
+def test_get_variant_retries_on_server_error_then_succeeds():
+    server_error = HttpResponse(status=503, body=b'unavailable')
     success_payload = (
         '{"experiment_id":"exp-1","assignment_id":"asg-2","unit_id":"store-9","variant_key":"control",'
         '"config_json":{},"experiment_version":3}'
     )
-    with patch('litmus.client.request.urlopen', side_effect=[server_error, _FakeResponse(success_payload)]) as mocked:
-        assignment = client.get_variant('exp-1', 'store-9')
+    mocked = _FakeTransport(server_error, _ok(success_payload))
+    client = _client(mocked, retries=1, fail_safe_enabled=False)
+    assignment = client.get_variant('exp-1', 'store-9')
 
     assert assignment.assignment_id == 'asg-2'
     assert mocked.call_count == 2
 
 
 def test_log_exposure_flushes_on_batch_threshold():
-    client = ExperimentClient(base_url='http://test', batch_size=2)
-    requests_seen = []
-
-    def _capture(req, timeout=None):
-        requests_seen.append((req.full_url, req.data.decode('utf-8')))
-        return _FakeResponse('{"ingested": 2}')
+    transport = _FakeTransport(_ok('{"ingested": 2}'))
+    client = _client(transport, batch_size=2)
 
-    with patch('litmus.client.request.urlopen', side_effect=_capture):
-        client.log_exposure('exp-1', 'unit-1', 'control')
-        assert len(requests_seen) == 0
-        client.log_exposure('exp-1', 'unit-2', 'treatment')
-        assert len(requests_seen) == 1
+    client.log_exposure('exp-1', 'unit-1', 'control')
+    assert transport.call_count == 0
+    client.log_exposure('exp-1', 'unit-2', 'treatment')
+    assert transport.call_count == 1
 
-    endpoint, body = requests_seen[0]
+    endpoint, body = transport.requests[0]['url'], transport.requests[0]['body']
     items = json.loads(body)
     assert endpoint.endswith('/api/v1/events/exposure')
     variant_keys = {item['variant_key'] for item in items}
     assert variant_keys == {'control', 'treatment'}
+    assert len({item['idempotency_key'] for item in items}) == 2
 
 
 def test_flush_posts_metric_batch_payload():
-    client = ExperimentClient(base_url='http://test', batch_size=10)
-    requests_seen = []
-
-    def _capture(req, timeout=None):
-        requests_seen.append((req.full_url, req.data.decode('utf-8')))
-        return _FakeResponse('{"ingested": 2}')
+    transport = _FakeTransport(_ok('{"ingested": 2}'))
+    client = _client(transport, batch_size=10)
 
-    with patch('litmus.client.request.urlopen', side_effect=_capture):
-        client.log_metric('exp-2', 'unit-7', 'control', 'gmv', 10.0)
-        client.log_metric('exp-2', 'unit-8', 'treatment', 'gmv', 12.5)
-        flushed = client.flush()
+    client.log_metric('exp-2', 'unit-7', 'control', 'gmv', 10.0)
+    client.log_metric('exp-2', 'unit-8', 'treatment', 'gmv', 12.5)
+    flushed = client.flush()
 
     assert flushed['metric'] == 2
     assert flushed['exposure'] == 0
-    assert len(requests_seen) == 1
-    endpoint, body = requests_seen[0]
+    assert transport.call_count == 1
+    endpoint, body = transport.requests[0]['url'], transport.requests[0]['body']
     items = json.loads(body)
     assert endpoint.endswith('/api/v1/events/metric')
     assert {item['metric_name'] for item in items} == {'gmv'}
+
+
+def test_retry_honors_retry_after_and_backs_off_with_jitter():
+    transport = _FakeTransport(
+        HttpResponse(status=429, body=b'slow down', headers={'retry-after': '2'}),
+        TransportError('connection reset'),
+        _ok('{"ingested": 1}'),
+    )
+    client = _client(transport, retries=2, backoff_base_seconds=0.5)
+    sleeps = []
+    client._sleep = sleeps.append
+
+    client.log_exposure('exp-1', 'unit-1', 'control')
+    client.flush()
+
+    assert transport.call_count == 3
+    assert sleeps[0] == 2.0
+    assert 0 <= sleeps[1] <= 1.0
+
+
+def test_retry_after_beyond_backoff_cap_fails_fast_to_fallback():
+    transport = _FakeTransport(HttpResponse(status=429, body=b'', headers={'retry-after': '60'}))
+    client = _client(transport, retries=3, backoff_max_seconds=5.0)
+
+    assignment = client.get_variant('exp-1', 'unit-1')
+
+    assert transport.call_count == 1
+    assert assignment.variant_key == 'control'
+
+
+def test_large_batches_are_gzip_compressed():
+    transport = _FakeTransport(_ok('{"ingested": 50}'))
+    client = _client(transport, batch_size=100, gzip_min_bytes=512)
+    for index in range(50):
+        client.log_exposure('exp-1', f'unit-{index}', 'control')
+    client.flush()
+
+    sent = transport.requests[0]
+    assert sent['headers']['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(sent['body']))) == 50
+
+
+def test_pooled_transport_reuses_keep_alive_connections():
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            body = b'{"ingested": 1}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            return None
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    transport = PooledTransport(max_connections_per_host=2)
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/api/v1/events/exposure'
+        for _ in range(5):
+            response = transport.request('POST', url, body=b'[]', headers={'Content-Type': 'application/json'})
+            assert response.status == 200
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+
+    assert len(connections) == 1
+
+
+def test_background_flusher_sends_on_size_and_reports_stats():
+    transport = _FakeTransport(_ok('{"ingested": 3}'))
+    client = _client(transport, batch_size=3, background_flush=True, flush_interval_seconds=60)
+    try:
+        for index in range(3):
+            client.log_exposure('exp-1', f'unit-{index}', 'control')
+        deadline = time.monotonic() + 5
+        while client.stats()['sent'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert transport.call_count == 1
+        assert client.stats()['queued'] == 0
+    finally:
+        client.close()
+
+
+def test_close_flushes_remaining_events_from_background_mode():
+    transport = _FakeTransport(_ok('{"ingested": 1}'))
+    client = _client(transport, batch_size=100, background_flush=True, flush_interval_seconds=60)
+    client.log_metric('exp-1', 'unit-1', 'control', 'gmv', 3.0)
+
+    client.close()
+
+    assert transport.call_count == 1
+    stats = client.stats()
+    assert [stats[name] for name in ('sent', 'dropped', 'spilled', 'queued', 'failed_flushes')] == [1, 0, 0, 0, 0]
+
+
+def test_bounded_queue_drops_or_spills_overflow():
+    buffer = EventBuffer(max_size=2, overflow_policy='drop_oldest')
+    for index in range(3):
+        buffer.append({'n': index})
+    assert [item['n'] for item in buffer.take(10)] == [1, 2]
+    assert buffer.dropped == 1
+
+    spilled = []
+    buffer = EventBuffer(max_size=1, overflow_policy='spill', spill_handler=spilled.extend)
+    buffer.append({'n': 0})
+    buffer.append({'n': 1})
+    assert spilled == [{'n': 1}] and buffer.spilled == 1
+
+
+def test_failed_flush_keeps_events_queued_in_order():
+    transport = _FakeTransport(TransportError('down'), _ok('{"ingested": 2}'))
+    client = _client(transport, retries=0, batch_size=100)
+    client.log_exposure('exp-1', 'unit-1', 'control')
+    client.log_exposure('exp-1', 'unit-2', 'control')
+
+    with pytest.raises(RuntimeError):
+        client.flush_exposures()
+    assert client.stats()['queued'] == 2
+
+    client.flush_exposures()
+    units = [item['unit_id'] for item in json.loads(transport.requests[-1]['body'])]
+    assert units == ['unit-1', 'unit-2']
+
+
+def test_pooled_transport_does_not_resend_after_a_read_timeout():
+    attempts = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            attempts.append(self.path)
+            if len(attempts) > 1:
+                time.sleep(0.5)
+            body = b'{}'
+            try:
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client already gave up on the slow response.
+                self.close_connection = True
+
+        def log_message(self, *args):
+            return None
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport = PooledTransport(max_connections_per_host=1)
+    url = f'http://127.0.0.1:{server.server_address[1]}/api/v1/assignments'
+    try:
+        transport.request('POST', url, body=b'{}', timeout=2)
+        with pytest.raises(TransportError):
+            transport.request('POST', url, body=b'{}', timeout=0.1)
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+
+    assert len(attempts) == 2
+
+
+def test_spool_persists_events_and_evicts_oldest_over_the_cap(tmp_path):
+    path = str(tmp_path / 'spool.db')
+    spool = EventSpool(path, max_bytes=10_000)
+    spool.append('/events/exposure', [{'unit_id': f'unit-{index}', 'pad': 'x' * 80} for index in range(200)])
+    assert 0 < len(spool) < 200
+    assert spool.stats()['spool_bytes'] <= 10_000
+    spool.close()
+
+    reopened = EventSpool(path, max_bytes=10_000)
+    last_id, batch = reopened.peek('/events/exposure', 1000)
+    assert batch[-1]['unit_id'] == 'unit-199'
+    assert int(batch[0]['unit_id'].split('-')[1]) == 200 - len(batch)
+    reopened.ack('/events/exposure', last_id)
+    assert len(reopened) == 0
+    reopened.close()
+
+
+def test_failed_flush_spools_to_disk_and_replays_oldest_first(tmp_path):
+    transport = _FakeTransport(TransportError('down'))
+    client = _client(transport, retries=0, batch_size=100, spool_path=str(tmp_path / 'spool.db'), replay_batch_items=2)
+    for index in range(3):
+        client.log_exposure('exp-1', f'unit-{index}', 'control')
+
+    with pytest.raises(RuntimeError):
+        client.flush_exposures()
+    assert client.stats()['queued'] == 0
+    assert client.stats()['spool_events'] == 3
+
+    transport.responses = [_ok('{"ingested": 2}'), _ok('{"ingested": 1}'), _ok('{"ingested": 1}')]
+    client.log_exposure('exp-1', 'unit-3', 'control')
+    assert client.flush_exposures().ingested == 4
+
+    sent = [[event['unit_id'] for event in json.loads(request['body'])] for request in transport.requests[1:]]
+    assert sent == [['unit-0', 'unit-1'], ['unit-2'], ['unit-3']]
+    assert client.stats()['spool_replayed'] == 3
+    client.close()
+
+
+def test_columnar_wire_format_groups_repeated_fields():
+    transport = _FakeTransport(_ok('{"ingested": 3}'))
+    client = _client(transport, batch_size=100, wire_format='columnar')
+    client.log_metric('exp-1', 'unit-1', 'control', 'gmv', 3.0)
+    client.log_metric('exp-1', 'unit-2', 'treatment', 'gmv', 4.0)
+    client.log_metric('exp-1', 'unit-3', 'control', 'gmv', 5.0, ts='2026-01-01T00:00:00Z')
+
+    assert client.flush_metrics().ingested == 3
+    request = transport.requests[0]
+    assert request['headers']['Content-Type'] == 'application/vnd.litmus.columnar+json'
+    groups = json.loads(request['body'])['groups']
+    assert [(group['variant_key'], group['unit_ids'], group['values']) for group in groups] == [
+        ('control', ['unit-1', 'unit-3'], [3.0, 5.0]),
+        ('treatment', ['unit-2'], [4.0]),
+    ]
+    assert groups[0]['ts'] == [None, '2026-01-01T00:00:00Z']
+    assert 'ts' not in groups[1] and 'contexts' not in groups[1]
+    assert len(groups[1]['idempotency_keys']) == 1